@@ -1,3 +1,31 @@
-from .phonetic_addition import *
-from .processing import *
-from .rule import *
\ No newline at end of file
+"""
+Obfuscation rule classes, imported lazily (PEP 562) so that `import augment_funtions`
+does not load a rule module or its dependencies until a class is first used.
+"""
+
+import importlib
+
+_EXPORTS = {
+    "PhoneticAddition": ".phonetic_addition",
+    "Processing": ".processing",
+    "SyntaticObfuscation": ".rule",
+    "IconicObfuscation": ".rule",
+    "TransliterationalObfuscation": ".rule",
+    "SymbolAddition": ".rule",
+    "Normalizer": ".normalizer",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
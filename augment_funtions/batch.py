@@ -0,0 +1,80 @@
+"""
+Batched rule API
+규칙을 여러 어절/문장에 한 번에 적용하기 위한 모듈
+
+Every rule in Augmentation.MAP is decorated with @batched. Calling the rule
+works as before (one string in, one string out); `rule.batch(texts, rng)`
+applies it to a whole list of texts with the given generator and also
+returns a changed-mask, so the engine can push a shard through one rule at
+a time.
+
+A rule can also register a whole-batch implementation with
+`@rule.vectorize`. It is used by `batch` for large enough batches when the
+generator is a RuleRNG, and must give the same output as the per-text loop.
+Rules whose batch path has no fixed setup cost (e.g. concurrent LLM requests)
+register with `@rule.vectorize(min_chars=0)`.
+"""
+
+import functools
+from typing import List, Sequence, Tuple
+
+from .rng import RuleRNG
+
+# 이보다 짧은 batch는 NumPy 변환 비용이 더 커서 글자 단위 loop를 쓴다
+VECTORIZE_MIN_CHARS = 96
+
+
+class BoundRule:
+    __slots__ = ("func", "owner", "vectorized", "min_chars")
+
+    def __init__(self, func, owner, vectorized=None, min_chars=VECTORIZE_MIN_CHARS):
+        self.func = func
+        self.owner = owner
+        self.vectorized = vectorized
+        self.min_chars = min_chars
+
+    def __call__(self, *args, **kwargs):
+        return self.func(self.owner, *args, **kwargs)
+
+    def batch(self, texts: Sequence, rng=None) -> Tuple[List, List[bool]]:
+        """
+        texts 각각에 rule을 적용한 결과와 바뀌었는지 여부(changed-mask)를 돌려준다.
+        rng가 주어지면 batch 동안 rule 객체의 rng로 사용한다.
+        """
+        owner = self.owner
+        previous = owner.rng
+        if rng is not None:
+            owner.rng = rng
+        try:
+            if self.vectorized is not None and isinstance(owner.rng, RuleRNG) and sum(map(len, texts)) >= self.min_chars:
+                outputs = self.vectorized(owner, texts)
+            else:
+                outputs = [self.func(owner, text) for text in texts]
+        finally:
+            owner.rng = previous
+        changed = [output != text for output, text in zip(outputs, texts)]
+        return outputs, changed
+
+
+class batched:
+    def __init__(self, func):
+        self.func = func
+        self.vectorized = None
+        self.min_chars = VECTORIZE_MIN_CHARS
+        functools.update_wrapper(self, func)
+
+    def vectorize(self, vectorized=None, min_chars=VECTORIZE_MIN_CHARS):
+        """
+        batch 전체를 한 번에 처리하는 구현을 등록한다. vectorized(owner, texts) -> outputs
+        min_chars: 이보다 짧은 batch는 글자 단위 loop로 처리한다 (@rule.vectorize(min_chars=0)처럼 쓴다)
+        """
+        if vectorized is None:
+            return functools.partial(self.vectorize, min_chars=min_chars)
+        self.vectorized = vectorized
+        self.min_chars = min_chars
+        return self
+
+    def __get__(self, owner, owner_type=None):
+        if owner is None:
+            return self
+        return BoundRule(self.func, owner, self.vectorized, self.min_chars)
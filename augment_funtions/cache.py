@@ -0,0 +1,170 @@
+"""
+Memoizing caches for slow rule backends
+느린 rule backend(G2P 등)의 결과 캐시 모듈
+
+- LRUCache: bounded in-memory cache of one process.
+- DiskCache: optional sqlite file shared by every worker process. WAL mode lets
+  readers and one writer work at the same time, and the connection is reopened
+  after a fork.
+- MemoCache: wraps a function with both layers and an optional precomputed
+  table (see preload). Keys are namespaced by a version string, so a new
+  backend version never reads old entries. Hit/miss counters are exposed
+  through counts(). A call that raises stores nothing, so failures are
+  retried on the next call.
+"""
+
+import hashlib
+import os
+import sqlite3
+import sys
+from collections import OrderedDict
+from typing import Callable, Dict, Iterator, Optional, Tuple
+
+
+class LRUCache:
+    def __init__(self, maxsize: int = 100000):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        try:
+            self._data.move_to_end(key)
+        except KeyError:
+            return default
+        return self._data[key]
+
+    def put(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+
+class DiskCache:
+    def __init__(self, path: str, timeout: float = 30.0):
+        self.path = path
+        self.timeout = timeout
+        self._conn = None
+        self._pid = None
+
+    def _connect(self) -> sqlite3.Connection:
+        # fork된 worker는 부모의 connection을 쓰지 않고 새로 연다
+        if self._conn is None or self._pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS cache (namespace TEXT, key TEXT, value TEXT, PRIMARY KEY (namespace, key))")
+            self._conn = conn
+            self._pid = os.getpid()
+        return self._conn
+
+    def get(self, namespace: str, key: str) -> Optional[str]:
+        row = self._connect().execute("SELECT value FROM cache WHERE namespace = ? AND key = ?", (namespace, key)).fetchone()
+        return None if row is None else row[0]
+
+    def put(self, namespace: str, key: str, value: str):
+        self._connect().execute("INSERT OR IGNORE INTO cache VALUES (?, ?, ?)", (namespace, key, value))
+
+    def items(self, namespace: str) -> Iterator[Tuple[str, str]]:
+        """
+        namespace의 모든 (key, value).
+        """
+        return iter(self._connect().execute("SELECT key, value FROM cache WHERE namespace = ? ORDER BY key", (namespace,)).fetchall())
+
+    def close(self):
+        if self._conn is not None and self._pid == os.getpid():
+            self._conn.close()
+        self._conn = None
+
+    def __getstate__(self):
+        # connection은 process마다 다시 연다
+        return {"path": self.path, "timeout": self.timeout, "_conn": None, "_pid": None}
+
+
+class MemoCache:
+    def __init__(self, func: Optional[Callable[[str], str]], namespace, maxsize: int = 100000, disk: Optional[DiskCache] = None):
+        """
+        func: miss일 때 값을 계산하는 함수 (None이면 호출할 때 func를 넘긴다)
+        namespace: 문자열 또는 문자열을 돌려주는 함수 (disk를 처음 쓸 때 한 번 호출)
+        """
+        self.func = func
+        self._namespace = namespace
+        self.memory = LRUCache(maxsize)
+        self.disk = disk
+        # 생성 전에 미리 계산해 둔 결과 (LRU에서 밀려나지 않는다)
+        self.table = {}
+        self.table_hits = 0
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    @property
+    def namespace(self) -> str:
+        # backend version을 구하려면 backend를 import해야 하므로 필요할 때 정한다
+        if callable(self._namespace):
+            self._namespace = self._namespace()
+        return self._namespace
+
+    def preload(self, table: Dict[str, str]):
+        self.table.update(table)
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        저장된 값 또는 None (miss로 센다). 계산은 하지 않는다.
+        """
+        value = self.table.get(key)
+        if value is not None:
+            self.table_hits += 1
+            return value
+        value = self.memory.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+        if self.disk is not None:
+            value = self.disk.get(self.namespace, key)
+            if value is not None:
+                self.disk_hits += 1
+                self.memory.put(key, value)
+                return value
+        self.misses += 1
+        return None
+
+    def put(self, key: str, value: str):
+        self.memory.put(key, value)
+        if self.disk is not None:
+            self.disk.put(self.namespace, key, value)
+
+    def __call__(self, key: str, func: Optional[Callable[[str], str]] = None) -> str:
+        """
+        func: 이번 miss에서 self.func 대신 쓸 계산 함수. 예외가 나면 결과를 저장하지 않는다.
+        """
+        value = self.get(key)
+        if value is None:
+            value = (func or self.func)(key)
+            self.put(key, value)
+        return value
+
+    def counts(self) -> Dict[str, int]:
+        return {"table_hits": self.table_hits, "hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses}
+
+
+def module_version(func: Callable) -> str:
+    """
+    func가 정의된 module 디렉터리의 파일 내용 hash. 파일이 없으면 __version__ 또는 'unknown'.
+    """
+    module = sys.modules.get(func.__module__)
+    path = getattr(module, "__file__", None)
+    if not path:
+        return str(getattr(module, "__version__", "unknown"))
+    digest = hashlib.sha1()
+    directory = os.path.dirname(os.path.abspath(path))
+    for name in sorted(os.listdir(directory)):
+        file_path = os.path.join(directory, name)
+        if os.path.isfile(file_path) and not name.endswith(".pyc"):
+            digest.update(name.encode())
+            with open(file_path, "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:12]
@@ -0,0 +1,160 @@
+"""
+Character-level seq2seq model for rule 8-3
+8-3 (외국어 음차) LLM 출력을 흉내 내는 글자 단위 seq2seq 모델
+
+A small attention GRU encoder-decoder trained on cached 8-3 input/output pairs
+(see augment_funtions/distill.py):
+- encoder: character embedding + bidirectional GRU;
+- decoder: GRU over the previous output character, Luong (general) attention
+  over the encoder states, then a linear layer over the output characters.
+Training runs the decoder over the whole target at once (teacher forcing).
+Inference decodes greedily in batches on CPU, so the same input always gives
+the same output and no rng is drawn. CharTransliterator loads a checkpoint
+and returns the input unchanged when the decoded text has an unknown
+character or never emits the end token.
+
+torch is imported with this module, which is loaded only when the model
+backend of 8-3 is selected.
+"""
+
+from typing import Dict, List, Sequence, Tuple
+
+import torch
+from torch import nn
+
+PAD, BOS, EOS, UNK = 0, 1, 2, 3
+SPECIALS = ("<pad>", "<s>", "</s>", "<unk>")
+
+
+class Vocab:
+    def __init__(self, chars: Sequence[str]):
+        self.itos = list(SPECIALS) + sorted(set(chars) - set(SPECIALS))
+        self.stoi = {char: i for i, char in enumerate(self.itos)}
+
+    def __len__(self):
+        return len(self.itos)
+
+    @classmethod
+    def build(cls, pairs: Sequence[Tuple[str, str]]) -> "Vocab":
+        chars = set()
+        for source, target in pairs:
+            chars.update(source)
+            chars.update(target)
+        return cls(sorted(chars))
+
+    def encode(self, text: str, eos: bool = True) -> List[int]:
+        ids = [self.stoi.get(char, UNK) for char in text]
+        return ids + [EOS] if eos else ids
+
+    def decode(self, ids: Sequence[int]) -> Tuple[str, bool]:
+        """
+        EOS 앞까지의 글자와, EOS가 있었고 UNK가 없었는지 여부.
+        """
+        chars = []
+        for i in ids:
+            if i == EOS:
+                return "".join(chars), True
+            if i == UNK:
+                return "".join(chars), False
+            if i > UNK:
+                chars.append(self.itos[i])
+        return "".join(chars), False
+
+
+def pad_batch(sequences: Sequence[List[int]]) -> Tuple[torch.Tensor, torch.Tensor]:
+    lengths = torch.tensor([len(s) for s in sequences], dtype=torch.long)
+    batch = torch.full((len(sequences), int(lengths.max())), PAD, dtype=torch.long)
+    for i, s in enumerate(sequences):
+        batch[i, :len(s)] = torch.tensor(s, dtype=torch.long)
+    return batch, lengths
+
+
+class CharSeq2Seq(nn.Module):
+    def __init__(self, vocab_size: int, embedding: int = 64, hidden: int = 128, dropout: float = 0.1):
+        super().__init__()
+        self.config = {"vocab_size": vocab_size, "embedding": embedding, "hidden": hidden, "dropout": dropout}
+        self.embedding = nn.Embedding(vocab_size, embedding, padding_idx=PAD)
+        self.encoder = nn.GRU(embedding, hidden, batch_first=True, bidirectional=True)
+        self.bridge = nn.Linear(2 * hidden, 2 * hidden)
+        self.decoder = nn.GRU(embedding, 2 * hidden, batch_first=True)
+        self.attention = nn.Linear(2 * hidden, 2 * hidden, bias=False)
+        self.combine = nn.Linear(4 * hidden, 2 * hidden)
+        self.output = nn.Linear(2 * hidden, vocab_size)
+        self.dropout = nn.Dropout(dropout)
+
+    def encode(self, source: torch.Tensor, lengths: torch.Tensor):
+        packed = nn.utils.rnn.pack_padded_sequence(self.dropout(self.embedding(source)), lengths, batch_first=True, enforce_sorted=False)
+        states, final = self.encoder(packed)
+        states, _ = nn.utils.rnn.pad_packed_sequence(states, batch_first=True, total_length=source.size(1))
+        # 양방향 마지막 hidden -> decoder 초기 hidden
+        hidden = torch.tanh(self.bridge(torch.cat([final[0], final[1]], dim=-1))).unsqueeze(0)
+        return states, hidden, source != PAD
+
+    def _step(self, inputs: torch.Tensor, hidden: torch.Tensor, states: torch.Tensor, mask: torch.Tensor):
+        # inputs: (B, T) 이전 출력 글자. 반환 logits: (B, T, V)
+        outputs, hidden = self.decoder(self.dropout(self.embedding(inputs)), hidden)
+        scores = torch.bmm(self.attention(outputs), states.transpose(1, 2))
+        scores = scores.masked_fill(~mask.unsqueeze(1), float("-inf"))
+        context = torch.bmm(torch.softmax(scores, dim=-1), states)
+        combined = torch.tanh(self.combine(torch.cat([outputs, context], dim=-1)))
+        return self.output(self.dropout(combined)), hidden
+
+    def forward(self, source: torch.Tensor, lengths: torch.Tensor, target: torch.Tensor) -> torch.Tensor:
+        """
+        teacher forcing. target은 EOS로 끝나는 정답이고, decoder 입력은 BOS + target[:-1].
+        """
+        states, hidden, mask = self.encode(source, lengths)
+        inputs = torch.cat([torch.full_like(target[:, :1], BOS), target[:, :-1]], dim=1)
+        logits, _ = self._step(inputs, hidden, states, mask)
+        return logits
+
+    @torch.no_grad()
+    def greedy(self, source: torch.Tensor, lengths: torch.Tensor, max_length: int) -> List[List[int]]:
+        states, hidden, mask = self.encode(source, lengths)
+        inputs = torch.full((source.size(0), 1), BOS, dtype=torch.long)
+        done = torch.zeros(source.size(0), dtype=torch.bool)
+        outputs = []
+        for _ in range(max_length):
+            logits, hidden = self._step(inputs, hidden, states, mask)
+            inputs = logits[:, -1].argmax(dim=-1, keepdim=True)
+            outputs.append(inputs)
+            done |= inputs.squeeze(1) == EOS
+            if bool(done.all()):
+                break
+        return torch.cat(outputs, dim=1).tolist()
+
+
+def save_checkpoint(path: str, model: CharSeq2Seq, vocab: Vocab, meta: Dict):
+    torch.save({"config": model.config, "itos": vocab.itos, "state_dict": model.state_dict(), "meta": meta}, path)
+
+
+class CharTransliterator:
+    def __init__(self, path: str, batch_size: int = 64, threads: int = 1):
+        """
+        threads: torch CPU thread 수. worker process가 여럿이면 1로 두어 core를 나눠 쓴다.
+        """
+        checkpoint = torch.load(path, map_location="cpu")
+        self.vocab = Vocab(checkpoint["itos"][len(SPECIALS):])
+        self.model = CharSeq2Seq(**checkpoint["config"])
+        self.model.load_state_dict(checkpoint["state_dict"])
+        self.model.eval()
+        self.meta = checkpoint.get("meta", {})
+        self.batch_size = batch_size
+        torch.set_num_threads(threads)
+
+    def transliterate_batch(self, texts: Sequence[str]) -> List[str]:
+        outputs = list(texts)
+        # 길이가 비슷한 문장끼리 묶어 padding을 줄인다
+        order = sorted((i for i, text in enumerate(texts) if text.strip()), key=lambda i: len(texts[i]))
+        for start in range(0, len(order), self.batch_size):
+            chunk = order[start:start + self.batch_size]
+            source, lengths = pad_batch([self.vocab.encode(texts[i]) for i in chunk])
+            decoded = self.model.greedy(source, lengths, max_length=2 * int(lengths.max()) + 8)
+            for i, ids in zip(chunk, decoded):
+                text, complete = self.vocab.decode(ids)
+                if complete and text:
+                    outputs[i] = text
+        return outputs
+
+    def __call__(self, text: str) -> str:
+        return self.transliterate_batch([text])[0]
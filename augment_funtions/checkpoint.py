@@ -0,0 +1,124 @@
+"""
+Append-only checkpoint writer for augmentation output
+증강 결과를 row 단위로 이어 쓰는 체크포인트 모듈
+
+Finished rows are appended to a JSONL sink in small batches and fsync'd,
+so a crashed run can resume instead of rewriting the whole output file
+every few rows. Obfuscated rows and failed rows go to two files that are
+committed one after the other, so a crash between the two writes can leave
+either file ahead of the other. Resume therefore starts at the first row
+index missing from both files, and rows already committed after that gap
+are not written again. The first line of each file
+is a header with the run settings (seed, levels); a run with other settings
+refuses to resume from it.
+"""
+
+import os
+import json
+
+HEADER_KEY = "header"
+
+
+class CheckpointMismatch(ValueError):
+    """
+    이어 쓰려는 체크포인트가 다른 설정(seed, 난이도)으로 만들어졌을 때.
+    """
+
+
+class CheckpointWriter:
+    def __init__(self, path: str, failure_path: str, flush_every: int = 32, settings: dict = None):
+        """
+        settings: header에 기록할 실행 설정 (예: {"seed": 42, "cnts": [2, 3]}). 기존 파일의 header와 다르면 CheckpointMismatch.
+        """
+        self.path = path
+        self.failure_path = failure_path
+        self.flush_every = flush_every
+        self.settings = settings or {}
+        self._rows = []
+        self._failures = []
+
+        # 두 파일 중 하나에 commit된 row index
+        self.committed = self._recover(path, self.settings) | self._recover(failure_path, self.settings)
+        self._file = self._open(path)
+        self._failure_file = self._open(failure_path)
+
+    def _open(self, path: str):
+        f = open(path, "a", encoding="utf-8")
+        if f.tell() == 0:
+            # 새 파일은 header부터 commit한다
+            f.write(json.dumps({HEADER_KEY: self.settings}, ensure_ascii=False) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        return f
+
+    @staticmethod
+    def _recover(path: str, settings: dict) -> set:
+        """
+        Drop a partially written trailing line, check the header against settings
+        and return the committed row indices.
+        """
+        if not os.path.exists(path):
+            return set()
+        with open(path, "rb") as f:
+            data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end != len(data):
+            with open(path, "r+b") as f:
+                f.truncate(end)
+        lines = [json.loads(line) for line in data[:end].splitlines() if line.strip()]
+        if not lines:
+            return set()
+        header = lines[0].get(HEADER_KEY)
+        if header != settings:
+            raise CheckpointMismatch(f"{path} was written with settings {header}, not {settings}")
+        return {line["index"] for line in lines[1:]}
+
+    def resume_index(self, start: int = 0) -> int:
+        """
+        start 이후 두 파일 어디에도 없는 첫 row index. 그 뒤에 이미 commit된 row는 is_committed로 건너뛴다.
+        """
+        index = start
+        while index in self.committed:
+            index += 1
+        return index
+
+    def is_committed(self, index: int) -> bool:
+        return index in self.committed
+
+    def write(self, index: int, record: dict):
+        self._rows.append(json.dumps({"index": index, **record}, ensure_ascii=False))
+        self.committed.add(index)
+        if len(self._rows) >= self.flush_every:
+            self.flush()
+
+    def fail(self, index: int, record: dict):
+        self._failures.append(json.dumps({"index": index, **record}, ensure_ascii=False))
+        self.committed.add(index)
+
+    def flush(self):
+        # 두 파일은 따로 commit되므로 그 사이에 멈추면 한쪽만 남는다. resume_index가 두 파일의 빈 index부터 다시 시작한다
+        for f, lines in ((self._failure_file, self._failures), (self._file, self._rows)):
+            if lines:
+                f.write("\n".join(lines) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+                lines.clear()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+        self._failure_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_checkpoint(path: str):
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return [record for record in records if HEADER_KEY not in record]
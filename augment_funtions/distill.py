@@ -0,0 +1,288 @@
+"""
+Distill the 8-3 LLM outputs into a local model
+LLM cache에 쌓인 8-3 입출력 쌍으로 글자 단위 seq2seq 모델을 학습하는 도구
+
+    $ python -m augment_funtions.distill train --cache data/llm.sqlite --output data/foreign_model.pt
+    $ python -m augment_funtions.distill report --cache data/llm.sqlite --model data/foreign_model.pt
+
+train harvests every cached pair of the current korean prompt and model (the
+namespace rule 8-3 reads and writes, see --llm-cache). It holds out a
+validation split chosen by a hash of the input, trains CharSeq2Seq with
+teacher forcing and keeps the checkpoint with the lowest validation loss.
+It then writes <output>.report.json, comparing the model with the LLM outputs
+on the held-out pairs:
+- quality: exact match and character error rate (edit distance / length of
+  the LLM output) against the LLM output, the same for copying the input as
+  a baseline, and how often each one changes the input;
+- latency: sentences per second in batches and p50/p95 for single sentences.
+report recomputes this for an existing model. With --llm-sample N it also
+times N uncached requests to --llm-model for the latency comparison; failed
+requests are counted and left out of the timings.
+"""
+
+import argparse
+import copy
+import hashlib
+import json
+import random
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import torch
+from torch import nn
+
+from .cache import DiskCache
+from .char_seq2seq import PAD, CharSeq2Seq, CharTransliterator, Vocab, pad_batch, save_checkpoint
+from .rule import LLM_MODEL, llm_namespace
+
+Pair = Tuple[str, str]
+
+
+def harvest(cache_path: str, model: str = LLM_MODEL, max_length: int = 200) -> List[Pair]:
+    """
+    cache에서 현재 korean prompt / model의 (입력, LLM 출력) 쌍을 읽는다.
+    """
+    disk = DiskCache(cache_path)
+    try:
+        return [(source, target) for source, target in disk.items(llm_namespace("korean", model))
+                if source.strip() and target and len(source) <= max_length and len(target) <= max_length]
+    finally:
+        disk.close()
+
+
+def is_validation(source: str, ratio: float) -> bool:
+    # 입력 hash로 나누므로 train과 report가 같은 validation 쌍을 쓴다
+    return int(hashlib.sha1(source.encode()).hexdigest()[:8], 16) < ratio * 0x100000000
+
+
+def split(pairs: Sequence[Pair], ratio: float) -> Tuple[List[Pair], List[Pair]]:
+    train_pairs, valid_pairs = [], []
+    for pair in pairs:
+        (valid_pairs if is_validation(pair[0], ratio) else train_pairs).append(pair)
+    return train_pairs, valid_pairs
+
+
+def _batches(pairs: Sequence[Pair], vocab: Vocab, batch_size: int, rng: Optional[random.Random] = None):
+    # 길이순으로 묶고 batch 순서만 섞는다
+    order = sorted(range(len(pairs)), key=lambda i: len(pairs[i][0]))
+    batches = [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+    if rng is not None:
+        rng.shuffle(batches)
+    for batch in batches:
+        source, lengths = pad_batch([vocab.encode(pairs[i][0]) for i in batch])
+        target, _ = pad_batch([vocab.encode(pairs[i][1]) for i in batch])
+        yield source, lengths, target
+
+
+def _loss(model, criterion, source, lengths, target) -> torch.Tensor:
+    logits = model(source, lengths, target)
+    return criterion(logits.reshape(-1, logits.size(-1)), target.reshape(-1))
+
+
+def train(train_pairs: Sequence[Pair], valid_pairs: Sequence[Pair], epochs: int = 30, batch_size: int = 64, lr: float = 2e-3,
+          embedding: int = 64, hidden: int = 128, dropout: float = 0.1, patience: int = 5, seed: int = 0):
+    """
+    validation loss가 가장 낮은 epoch의 (model, vocab, epoch별 기록)을 돌려준다.
+    """
+    torch.manual_seed(seed)
+    rng = random.Random(seed)
+    vocab = Vocab.build(train_pairs)
+    model = CharSeq2Seq(len(vocab), embedding, hidden, dropout)
+    optimizer = torch.optim.Adam(model.parameters(), lr=lr)
+    criterion = nn.CrossEntropyLoss(ignore_index=PAD)
+
+    history = []
+    best_loss, best_state, stale = float("inf"), None, 0
+    for epoch in range(1, epochs + 1):
+        start = time.perf_counter()
+        model.train()
+        total, count = 0.0, 0
+        for source, lengths, target in _batches(train_pairs, vocab, batch_size, rng):
+            optimizer.zero_grad()
+            loss = _loss(model, criterion, source, lengths, target)
+            loss.backward()
+            nn.utils.clip_grad_norm_(model.parameters(), 1.0)
+            optimizer.step()
+            total += loss.item() * len(source)
+            count += len(source)
+
+        model.eval()
+        valid_total, valid_count = 0.0, 0
+        with torch.no_grad():
+            for source, lengths, target in _batches(valid_pairs, vocab, batch_size):
+                valid_total += _loss(model, criterion, source, lengths, target).item() * len(source)
+                valid_count += len(source)
+        train_loss = total / max(count, 1)
+        # validation 쌍이 없으면 train loss로 고른다
+        valid_loss = valid_total / valid_count if valid_count else train_loss
+        history.append({"epoch": epoch, "train_loss": train_loss, "valid_loss": valid_loss, "sec": time.perf_counter() - start})
+        print(f"epoch {epoch}: train loss {train_loss:.4f}  valid loss {valid_loss:.4f}  {history[-1]['sec']:.1f}s")
+
+        if valid_loss < best_loss:
+            best_loss, best_state, stale = valid_loss, copy.deepcopy(model.state_dict()), 0
+        else:
+            stale += 1
+            if stale >= patience:
+                break
+    model.load_state_dict(best_state)
+    model.eval()
+    return model, vocab, history
+
+
+def edit_distance(a: str, b: str) -> int:
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def quality(outputs: Sequence[str], pairs: Sequence[Pair]) -> Dict[str, float]:
+    n = max(len(pairs), 1)
+    return {
+        "exact_match": sum(output == target for output, (_, target) in zip(outputs, pairs)) / n,
+        "cer": sum(edit_distance(output, target) / max(len(target), 1) for output, (_, target) in zip(outputs, pairs)) / n,
+        "changed": sum(output != source for output, (source, _) in zip(outputs, pairs)) / n,
+    }
+
+
+def _percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def model_latency(transliterator: CharTransliterator, texts: Sequence[str], single: int = 200) -> Dict[str, float]:
+    start = time.perf_counter()
+    transliterator.transliterate_batch(texts)
+    elapsed = time.perf_counter() - start
+    times = []
+    for text in texts[:single]:
+        start = time.perf_counter()
+        transliterator(text)
+        times.append(time.perf_counter() - start)
+    return {
+        "batch_sentences_per_sec": len(texts) / elapsed if elapsed else None,
+        "single_p50_sec": _percentile(times, 0.5),
+        "single_p95_sec": _percentile(times, 0.95),
+    }
+
+
+def llm_latency(texts: Sequence[str], model: str = LLM_MODEL) -> Dict[str, float]:
+    """
+    cache를 거치지 않고 model에 직접 요청한 시간 (API key 필요).
+    실패한 요청은 시간에서 빼고, 응답 형식 오류와 client / network 오류를 따로 센다.
+    """
+    import openai
+
+    from .rule import LLMResponseError, TransliterationalObfuscation, openai_client
+
+    client = openai_client()
+    times, response_errors, client_errors = [], 0, 0
+    for text in texts:
+        start = time.perf_counter()
+        try:
+            response = client.chat.completions.create(model=model, messages=TransliterationalObfuscation._messages("korean", text))
+            TransliterationalObfuscation._parse(response.choices[0].message.content)
+        except openai.OpenAIError:
+            client_errors += 1
+            continue
+        except (LLMResponseError, IndexError, AttributeError):
+            response_errors += 1
+            continue
+        times.append(time.perf_counter() - start)
+    return {
+        "model": model,
+        "sentences_per_sec": len(times) / sum(times) if times else None,
+        "single_p50_sec": _percentile(times, 0.5),
+        "single_p95_sec": _percentile(times, 0.95),
+        "errors": response_errors + client_errors,
+        "response_errors": response_errors,
+        "client_errors": client_errors,
+    }
+
+
+def build_report(transliterator: CharTransliterator, valid_pairs: Sequence[Pair], llm_sample: int = 0,
+                 llm_model: str = LLM_MODEL) -> Dict:
+    # 기준은 cache의 LLM 출력이므로 LLM 자신의 quality는 재지 않는다
+    sources = [source for source, _ in valid_pairs]
+    report = {
+        "pairs": len(valid_pairs),
+        "model": quality(transliterator.transliterate_batch(sources), valid_pairs),
+        "copy_input": quality(sources, valid_pairs),
+        "latency": {"model": model_latency(transliterator, sources)},
+    }
+    if llm_sample > 0:
+        report["latency"]["llm"] = llm_latency(sources[:llm_sample], llm_model)
+    return report
+
+
+def print_report(report: Dict):
+    print(f"held-out pairs: {report['pairs']}")
+    for name in ("model", "copy_input"):
+        q = report[name]
+        print(f"{name:>10}: exact match {q['exact_match']:.1%}  CER {q['cer']:.3f}  changed {q['changed']:.1%}")
+    for name, latency in report["latency"].items():
+        rate = latency.get("batch_sentences_per_sec", latency.get("sentences_per_sec"))
+        errors = f"  {latency['errors']} failed" if latency.get("errors") else ""
+        if rate is None or latency["single_p50_sec"] is None:
+            print(f"{name:>10}: no latency measured{errors}")
+            continue
+        print(f"{name:>10}: {rate:,.1f} sent/sec  p50 {latency['single_p50_sec'] * 1e3:.1f} ms  p95 {latency['single_p95_sec'] * 1e3:.1f} ms{errors}")
+
+
+def _write_report(report: Dict, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print_report(report)
+    print(f"-> {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Distill cached 8-3 LLM outputs into a local char-level model")
+    commands = parser.add_subparsers(dest="command", required=True)
+    train_parser = commands.add_parser("train", help="harvest the cache, train a model and write its report")
+    train_parser.add_argument("--output", default="data/foreign_model.pt")
+    train_parser.add_argument("--epochs", type=int, default=30)
+    train_parser.add_argument("--batch-size", type=int, default=64)
+    train_parser.add_argument("--lr", type=float, default=2e-3)
+    train_parser.add_argument("--embedding", type=int, default=64)
+    train_parser.add_argument("--hidden", type=int, default=128)
+    train_parser.add_argument("--dropout", type=float, default=0.1)
+    train_parser.add_argument("--patience", type=int, default=5, help="epochs without a better validation loss before stopping")
+    train_parser.add_argument("--seed", type=int, default=0)
+    report_parser = commands.add_parser("report", help="compare an existing model with the cached LLM outputs")
+    report_parser.add_argument("--model", default="data/foreign_model.pt")
+    for command in (train_parser, report_parser):
+        command.add_argument("--cache", required=True, help="sqlite file written with augmentation.py --llm-cache")
+        command.add_argument("--llm-model", default=LLM_MODEL, help="LLM whose cached outputs are used")
+        command.add_argument("--valid-ratio", type=float, default=0.1)
+        command.add_argument("--llm-sample", type=int, default=0, help="held-out inputs sent to the LLM to time it (needs API_KEY)")
+    args = parser.parse_args()
+
+    pairs = harvest(args.cache, args.llm_model)
+    train_pairs, valid_pairs = split(pairs, args.valid_ratio)
+    print(f"{len(pairs)} cached 8-3 pairs: {len(train_pairs)} train, {len(valid_pairs)} held out")
+    if args.command == "train":
+        if not train_pairs:
+            parser.error(f"no cached 8-3 pairs for {args.llm_model} in {args.cache}")
+        model, vocab, history = train(train_pairs, valid_pairs, args.epochs, args.batch_size, args.lr,
+                                      args.embedding, args.hidden, args.dropout, args.patience, args.seed)
+        save_checkpoint(args.output, model, vocab, {
+            "namespace": llm_namespace("korean", args.llm_model),
+            "train_pairs": len(train_pairs),
+            "valid_ratio": args.valid_ratio,
+            "history": history,
+        })
+        model_path = args.output
+    else:
+        model_path = args.model
+    _write_report(build_report(CharTransliterator(model_path), valid_pairs, args.llm_sample, args.llm_model),
+                  f"{model_path}.report.json")
+
+
+if __name__ == "__main__":
+    main()
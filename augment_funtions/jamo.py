@@ -0,0 +1,168 @@
+"""
+Table-driven Hangul jamo decompose/compose
+한글 음절 분해/조합 모듈
+
+Drop-in replacement for the parts of hgtk used by the rule modules, with the
+same semantics:
+- is_hangul(char): a precomposed syllable (U+AC00-U+D7A3) or a compatibility jamo;
+- decompose(char): (cho, jung, jong) strings, '' for a missing part. A bare
+  jamo is returned as cho, jung or jong only (checked in that order), so
+  'ㄱ' -> ('ㄱ', '', '') and 'ㄳ' -> ('', '', 'ㄳ');
+- compose(cho, jung, jong=''): raises JamoError when the parts do not form a syllable;
+- has_batchim(char): the syllable has a final consonant.
+The string API is backed by dictionaries built once at import time. The array API
+works on NumPy code point arrays with integer arithmetic over the syllable block.
+"""
+
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+CHO = (
+    'ㄱ', 'ㄲ', 'ㄴ', 'ㄷ', 'ㄸ', 'ㄹ', 'ㅁ', 'ㅂ', 'ㅃ', 'ㅅ',
+    'ㅆ', 'ㅇ', 'ㅈ', 'ㅉ', 'ㅊ', 'ㅋ', 'ㅌ', 'ㅍ', 'ㅎ'
+)
+JUNG = (
+    'ㅏ', 'ㅐ', 'ㅑ', 'ㅒ', 'ㅓ', 'ㅔ', 'ㅕ', 'ㅖ', 'ㅗ', 'ㅘ',
+    'ㅙ', 'ㅚ', 'ㅛ', 'ㅜ', 'ㅝ', 'ㅞ', 'ㅟ', 'ㅠ', 'ㅡ', 'ㅢ', 'ㅣ'
+)
+JONG = (
+    '', 'ㄱ', 'ㄲ', 'ㄳ', 'ㄴ', 'ㄵ', 'ㄶ', 'ㄷ', 'ㄹ', 'ㄺ',
+    'ㄻ', 'ㄼ', 'ㄽ', 'ㄾ', 'ㄿ', 'ㅀ', 'ㅁ', 'ㅂ', 'ㅄ', 'ㅅ',
+    'ㅆ', 'ㅇ', 'ㅈ', 'ㅊ', 'ㅋ', 'ㅌ', 'ㅍ', 'ㅎ'
+)
+
+NUM_CHO = 19
+NUM_JUNG = 21
+NUM_JONG = 28
+FIRST_SYLLABLE = 0xAC00  # '가'
+LAST_SYLLABLE = 0xD7A3  # '힣'
+# 호환용 자모 'ㄱ'(U+3131) ~ 'ㅣ'(U+3163)
+FIRST_JAMO = 0x3131
+LAST_JAMO = 0x3163
+
+CHO_INDEX = {c: i for i, c in enumerate(CHO)}
+JUNG_INDEX = {c: i for i, c in enumerate(JUNG)}
+JONG_INDEX = {c: i for i, c in enumerate(JONG)}
+
+
+class JamoError(ValueError):
+    pass
+
+
+def _build_tables():
+    decompose_table = {}
+    compose_table = {}
+    code = FIRST_SYLLABLE
+    for cho in CHO:
+        for jung in JUNG:
+            for jong in JONG:
+                char = chr(code)
+                decompose_table[char] = (cho, jung, jong)
+                compose_table[(cho, jung, jong)] = char
+                code += 1
+    # 자모 하나짜리 글자: 초성 -> 중성 -> 종성 순서로 확인 (hgtk와 동일)
+    for jamo in JONG[1:]:
+        decompose_table[jamo] = ('', '', jamo)
+    for jamo in JUNG:
+        decompose_table[jamo] = ('', jamo, '')
+    for jamo in CHO:
+        decompose_table[jamo] = (jamo, '', '')
+    return decompose_table, compose_table
+
+
+DECOMPOSE, COMPOSE = _build_tables()
+
+
+def is_hangul(char: str) -> bool:
+    return char in DECOMPOSE
+
+
+def decompose(char: str) -> Tuple[str, str, str]:
+    try:
+        return DECOMPOSE[char]
+    except KeyError:
+        raise JamoError(f"not a Hangul letter: {char!r}") from None
+
+
+def compose(cho: str, jung: str, jong: Optional[str] = '') -> str:
+    try:
+        return COMPOSE[(cho, jung, jong or '')]
+    except KeyError:
+        raise JamoError(f"no Hangul syllable for ({cho!r}, {jung!r}, {jong!r})") from None
+
+
+def has_batchim(char: str) -> bool:
+    return decompose(char)[2] != ''
+
+
+def decompose_text(text: str) -> List[Optional[Tuple[str, str, str]]]:
+    """
+    글자마다 (cho, jung, jong)을 돌려준다. 한글이 아닌 글자는 None.
+    """
+    get = DECOMPOSE.get
+    return [get(char) for char in text]
+
+
+def compose_text(parts: Sequence) -> str:
+    """
+    decompose_text의 역. 각 원소는 (cho, jung, jong) 또는 그대로 둘 문자열.
+    """
+    return ''.join(part if isinstance(part, str) else compose(*part) for part in parts)
+
+
+# -----------------------
+# Array API
+# -----------------------
+def _jamo_index_table():
+    # 자모 code point -> (cho, jung, jong) index, 없는 부분은 -1
+    table = np.full((LAST_JAMO - FIRST_JAMO + 1, 3), -1, dtype=np.int32)
+    for code in range(FIRST_JAMO, LAST_JAMO + 1):
+        cho, jung, jong = DECOMPOSE[chr(code)]
+        table[code - FIRST_JAMO] = (CHO_INDEX.get(cho, -1), JUNG_INDEX.get(jung, -1), JONG_INDEX[jong] if jong else -1)
+    return table
+
+
+JAMO_INDEX = _jamo_index_table()
+
+
+def to_codes(text: str) -> np.ndarray:
+    return np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.int32)
+
+
+def from_codes(codes: np.ndarray) -> str:
+    return np.asarray(codes, dtype=np.uint32).tobytes().decode('utf-32-le')
+
+
+def decompose_codes(codes: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    code point 배열을 (cho, jung, jong) index 배열로 분해한다.
+    음절의 받침 없음은 jong 0, 자모 하나짜리 글자의 없는 부분과 한글이 아닌 글자는 -1.
+    """
+    codes = np.asarray(codes, dtype=np.int32)
+    index = codes - FIRST_SYLLABLE
+    syllable = (index >= 0) & (codes <= LAST_SYLLABLE)
+    cho = np.where(syllable, index // (NUM_JUNG * NUM_JONG), -1)
+    jung = np.where(syllable, index // NUM_JONG % NUM_JUNG, -1)
+    jong = np.where(syllable, index % NUM_JONG, -1)
+
+    jamo = (codes >= FIRST_JAMO) & (codes <= LAST_JAMO)
+    if jamo.any():
+        parts = JAMO_INDEX[codes[jamo] - FIRST_JAMO]
+        cho[jamo] = parts[:, 0]
+        jung[jamo] = parts[:, 1]
+        jong[jamo] = parts[:, 2]
+    return cho, jung, jong
+
+
+def compose_codes(cho: np.ndarray, jung: np.ndarray, jong: np.ndarray) -> np.ndarray:
+    """
+    (cho, jung, jong) index 배열을 음절 code point 배열로 조합한다. 모든 index가 유효해야 한다.
+    """
+    cho = np.asarray(cho)
+    jung = np.asarray(jung)
+    jong = np.asarray(jong)
+    if ((cho < 0) | (cho >= NUM_CHO) | (jung < 0) | (jung >= NUM_JUNG) | (jong < 0) | (jong >= NUM_JONG)).any():
+        raise JamoError("jamo index out of range")
+    return FIRST_SYLLABLE + (cho * NUM_JUNG + jung) * NUM_JONG + jong
@@ -0,0 +1,99 @@
+"""
+Rule-based Latin transliteration (offline backend of rule 8-1)
+한글 어절을 로마자 / 초성 차용 표기로 바꾸는 규칙 기반 음차 모듈
+
+Produces the kind of output latin_prompt.txt asks the LLM for, from the
+"latin_dict" tables in rules/transliterational_dictionary.json:
+- each Hangul word is changed with probability word_ratio (about half);
+- a changed word is romanized as a whole ('한' -> 'han') with probability
+  whole_ratio. Otherwise one of its syllables is changed: romanized
+  ('요' -> 'yo'), spelled as a sound-alike English word or letter
+  ('비' -> 'B'), or, when the vowel is one of ㅏ ㅑ ㅓ ㅕ ㅣ ㅔ ㅐ and there
+  is no final consonant, only its initial is borrowed ('게' -> 'gㅔ');
+- a romanized part is upper-cased with probability upper_ratio.
+Romanization follows the Revised Romanization with alternative spellings
+(ㄱ: g/k, ㅓ: eo/u, ...). A final consonant is read by its representative
+sound (real_sound_map), so '닭' -> 'dak'. Every choice is drawn from the rng
+passed in, so results are reproducible with the rule's rng.
+"""
+
+from typing import Dict, List, Optional, Sequence
+
+from . import jamo
+
+# 초성 차용이 가능한 중성 (latin_prompt.txt 지시사항)
+BORROW_VOWELS = frozenset(("ㅏ", "ㅑ", "ㅓ", "ㅕ", "ㅣ", "ㅔ", "ㅐ"))
+
+ROMANIZE, ALIKE, BORROW = "romanize", "alike", "borrow"
+
+
+class LatinTransliterator:
+    def __init__(self, latin_dict: Dict[str, Dict[str, List[str]]], real_sound_map: Dict[str, str],
+                 word_ratio: float = 0.5, whole_ratio: float = 0.5, upper_ratio: float = 0.1):
+        self.initial = latin_dict["initial"]
+        self.medial = latin_dict["medial"]
+        # 겹받침 등은 대표음으로 읽는다
+        self.final = {jong: latin_dict["final"][sound] for jong, sound in real_sound_map.items()}
+        self.alike = latin_dict["syllable"]
+        self.word_ratio = word_ratio
+        self.whole_ratio = whole_ratio
+        self.upper_ratio = upper_ratio
+
+    def romanize(self, syllable: str, rng) -> str:
+        cho, jung, jong = jamo.DECOMPOSE[syllable]
+        latin = rng.choice(self.initial[cho]) + rng.choice(self.medial[jung])
+        if jong:
+            latin += rng.choice(self.final[jong])
+        return latin
+
+    def _modes(self, syllable: str) -> List[str]:
+        modes = [ROMANIZE]
+        if syllable in self.alike:
+            modes.append(ALIKE)
+        cho, jung, jong = jamo.DECOMPOSE[syllable]
+        if jung in BORROW_VOWELS and not jong and cho != "ㅇ":
+            modes.append(BORROW)
+        return modes
+
+    def _upper(self, latin: str, rng) -> str:
+        return latin.upper() if rng.random() < self.upper_ratio else latin
+
+    @staticmethod
+    def _syllables(word: str) -> List[int]:
+        return [i for i, char in enumerate(word) if '가' <= char <= '힣']
+
+    def transliterate_word(self, word: str, rng, positions: Optional[Sequence[int]] = None) -> str:
+        if positions is None:
+            positions = self._syllables(word)
+        if not positions:
+            return word
+        if rng.random() < self.whole_ratio:
+            chars = list(word)
+            for i in positions:
+                chars[i] = self.romanize(chars[i], rng)
+            return self._upper("".join(chars), rng)
+
+        i = rng.choice(positions)
+        syllable = word[i]
+        mode = rng.choice(self._modes(syllable))
+        if mode == ALIKE:
+            latin = rng.choice(self.alike[syllable])
+        elif mode == BORROW:
+            cho, jung, _ = jamo.DECOMPOSE[syllable]
+            # 중성은 호환용 자모로 남긴다 ('게' -> 'gㅔ')
+            latin = self._upper(rng.choice(self.initial[cho]), rng) + jung
+        else:
+            latin = self._upper(self.romanize(syllable, rng), rng)
+        return word[:i] + latin + word[i + 1:]
+
+    def __call__(self, text: str, rng) -> str:
+        words = text.split(" ")
+        for i, word in enumerate(words):
+            positions = self._syllables(word)
+            # 한글 음절이 없는 어절은 난수를 쓰지 않는다
+            if positions and rng.random() < self.word_ratio:
+                words[i] = self.transliterate_word(word, rng, positions)
+        return " ".join(words)
+
+    def transliterate_batch(self, texts: Sequence[str], rng) -> List[str]:
+        return [self(text, rng) for text in texts]
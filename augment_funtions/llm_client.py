@@ -0,0 +1,150 @@
+"""
+Concurrent chat-completion client for the LLM rules
+LLM rule(8-1, 8-3) 요청을 동시에 보내는 asyncio client 모듈
+
+AsyncLLMClient sends a list of chat requests at once and returns their
+contents in input order:
+- at most max_concurrency requests are in flight (asyncio.Semaphore);
+- a token bucket limits the request rate to `rate` per second with bursts of
+  up to `burst` requests;
+- a request that times out, fails to connect or gets 408/409/429/5xx is
+  retried up to max_retries times with full-jitter exponential backoff;
+- every attempt is bounded by `timeout` seconds.
+The event loop and the underlying openai.AsyncOpenAI client are created
+lazily in each process, so a client built before a fork still works in the
+workers. base_url points the client at any OpenAI-compatible server, e.g.
+benchmarks/stub_llm_server.py.
+"""
+
+import asyncio
+import os
+import random
+import time
+from typing import Callable, List, Optional, Sequence, Union
+
+RETRY_STATUS = {408, 409, 429}
+
+
+class TokenBucket:
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.capacity = max(burst, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = None
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        # 순서대로 token을 받도록 lock 안에서 기다린다
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def openai_async_client(base_url: Optional[str] = None):
+    """
+    .env의 API_KEY로 openai.AsyncOpenAI를 만든다. 재시도는 AsyncLLMClient가 하므로 openai 쪽 재시도는 끈다.
+    """
+    import openai
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    return openai.AsyncOpenAI(api_key=os.getenv("API_KEY"), base_url=base_url, max_retries=0)
+
+
+def is_retryable(error: BaseException) -> bool:
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, "status_code", None)
+    if status is None:
+        # openai.APIConnectionError / APITimeoutError 등 응답이 없는 오류
+        return type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+    return status in RETRY_STATUS or status >= 500
+
+
+class AsyncLLMClient:
+    def __init__(self, model: str, max_concurrency: int = 8, rate: float = 0.0, burst: Optional[float] = None,
+                 max_retries: int = 4, timeout: float = 60.0, backoff: float = 1.0, max_backoff: float = 30.0,
+                 base_url: Optional[str] = None, client_factory: Optional[Callable] = None):
+        """
+        rate: 초당 요청 수 상한 (0이면 제한 없음), burst: 한 번에 보낼 수 있는 요청 수 (기본 max_concurrency)
+        client_factory: chat.completions.create coroutine을 가진 client를 만드는 함수 (기본 openai.AsyncOpenAI)
+        """
+        self.model = model
+        self.max_concurrency = max(1, max_concurrency)
+        self.rate = rate
+        self.burst = burst if burst is not None else self.max_concurrency
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.base_url = base_url
+        self.client_factory = client_factory
+        # backoff jitter 전용. rule의 rng stream에 영향을 주지 않는다
+        self.jitter = random.Random()
+        self.retries = 0
+        self.failures = 0
+        self._pid = None
+
+    def _setup(self):
+        # fork된 worker는 부모의 event loop / connection을 쓰지 않고 새로 만든다
+        if self._pid != os.getpid():
+            self._loop = asyncio.new_event_loop()
+            self._client = self.client_factory() if self.client_factory is not None else openai_async_client(self.base_url)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._bucket = TokenBucket(self.rate, self.burst)
+            self.jitter.seed()
+            self._pid = os.getpid()
+
+    async def _complete(self, messages) -> str:
+        attempt = 0
+        while True:
+            async with self._semaphore:
+                await self._bucket.acquire()
+                try:
+                    response = await asyncio.wait_for(
+                        self._client.chat.completions.create(model=self.model, messages=messages), self.timeout)
+                    return response.choices[0].message.content
+                except Exception as e:
+                    if attempt >= self.max_retries or not is_retryable(e):
+                        self.failures += 1
+                        raise
+            # semaphore를 놓고 기다린다 (full jitter)
+            attempt += 1
+            self.retries += 1
+            await asyncio.sleep(self.jitter.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1))))
+
+    async def _gather(self, requests):
+        return await asyncio.gather(*(self._complete(messages) for messages in requests), return_exceptions=True)
+
+    def complete_many(self, requests: Sequence[list]) -> List[Union[str, BaseException]]:
+        """
+        chat messages 목록을 동시에 보내고 입력 순서대로 응답 content 또는 예외를 돌려준다.
+        """
+        if not requests:
+            return []
+        self._setup()
+        return self._loop.run_until_complete(self._gather(list(requests)))
+
+    def complete(self, messages) -> str:
+        result = self.complete_many([messages])[0]
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+    def __getstate__(self):
+        # loop / client는 process마다 다시 만든다
+        state = self.__dict__.copy()
+        for name in ("_loop", "_client", "_semaphore", "_bucket"):
+            state.pop(name, None)
+        state["_pid"] = None
+        return state
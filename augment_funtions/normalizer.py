@@ -0,0 +1,144 @@
+"""
+Rule-based de-obfuscation normalizer
+역 대치 표로 난독화된 문장을 정규형으로 되돌리는 전처리 모듈
+
+The normalizer inverts the deterministic parts of the obfuscation rules using
+the same rule dictionaries, without an LLM:
+- phrase and symbol substitutions (yamin, rotation, compression and meaning
+  tables) are undone in one multi-pattern pass. The patterns are compiled into
+  one regular expression, longest alternative first (leftmost-longest), and
+  decoration symbols added by SymbolAddition can be dropped in the same pass;
+- a jamo symbol next to a Hangul jamo (consonant_swap / vowel_dict output such
+  as '㉠ㅏ' or 'ㄱr') is mapped back to its jamo, and a split cho + jung (+ jong)
+  sequence is recomposed into one syllable;
+- optionally, tense/aspirated initials are folded to the plain consonant
+  (reverse of 1-1) and liaison is undone (reverse of 3-1).
+Only phrase patterns that contain a character other than ASCII and complete
+syllables are inverted, and a jamo symbol is only read as a jamo next to a real
+jamo, so ordinary Hangul words and ASCII text are left alone. The folding
+stages also change clean text and are off by default.
+"""
+
+import re
+from typing import Dict, Iterable, List
+
+from . import jamo
+from .multipattern import alternation
+from .resources import load_resources
+from .transducer import BoundaryTransducer, reverse_continue_sound_rule
+
+# 뒤집을 phrase 표 (앞에 있는 표의 원문이 우선)
+PHRASE_TABLES = (
+    ("iconic", "rotation_dict"),
+    ("iconic", "yamin_dict"),
+    ("iconic", "compression_dict"),
+    ("transliterational", "meaning_dict"),
+)
+# SymbolAddition에서 지울 기호 묶음
+SYMBOL_GROUPS = ("emotions", "hearts", "stars", "circles", "shapes", "brackets", "decorations", "special")
+
+_SPACES = re.compile(r" {2,}")
+
+
+def _is_symbolic(pattern: str) -> bool:
+    # ASCII와 완성형 음절만으로 된 표기는 보통 문장에도 나오므로 뒤집지 않는다
+    return any(not char.isascii() and not ('가' <= char <= '힣') for char in pattern)
+
+
+def _invert(table: Dict[str, List[str]], inverse: Dict[str, str], symbolic_only: bool = True):
+    for original, forms in table.items():
+        for form in forms:
+            if form and form != original and (_is_symbolic(form) or not symbolic_only):
+                inverse.setdefault(form, original)
+
+
+class Normalizer:
+    def __init__(self, strip_symbols: bool = True, fold_power: bool = False, undo_liaison: bool = False):
+        resources = load_resources()
+        iconic = resources["iconic"]
+        replace_dict = resources["replace"]
+
+        # 1. phrase / 기호 역 대치 표
+        self.phrase_map = {}
+        for group, name in PHRASE_TABLES:
+            _invert(resources[group][name], self.phrase_map)
+        if strip_symbols:
+            # 지연 import: rule module은 backend client를 쓰지 않으면 가볍다
+            from .rule import SymbolAddition
+            symbols = SymbolAddition()
+            for group in SYMBOL_GROUPS:
+                for symbol in getattr(symbols, group):
+                    # iconic 표에서 자모로 쓰이는 기호(○, □ 등)는 남긴다
+                    if symbol not in self.phrase_map and not self._is_jamo_symbol(symbol, iconic):
+                        self.phrase_map.setdefault(symbol, "")
+        self.phrase_pattern = re.compile(alternation(self.phrase_map)) if self.phrase_map else None
+        self.phrase_chars = frozenset("".join(self.phrase_map))
+
+        # 2. 자모 기호 역 대치 표 ('ㄱㄱ' -> 'ㄲ', 'ㅏㅣ' -> 'ㅐ' 같은 여러 글자 표기 포함)
+        # 한쪽이 실제 자모일 때만 쓰므로 'r', 'L' 같은 ASCII 표기도 뒤집는다
+        self.consonant_map = {}
+        _invert(iconic["consonant_dict"], self.consonant_map, symbolic_only=False)
+        self.vowel_map = {}
+        _invert(iconic["vowel_dict"], self.vowel_map, symbolic_only=False)
+        cho = alternation(list(self.consonant_map) + list(jamo.CHO))
+        jung = alternation(list(self.vowel_map) + list(jamo.JUNG))
+        jong = alternation(jamo.JONG[1:])
+        self.syllable_pattern = re.compile(f"({cho})({jung})(?:({jong})(?!{jung}))?")
+        self.jamo_chars = frozenset("".join(self.consonant_map) + "".join(self.vowel_map)) | frozenset(jamo.CHO + jamo.JUNG)
+
+        # 3. 된소리 / 거센소리 초성 -> 예사소리 (음절 단위 translate 표)
+        self.power_table = None
+        if fold_power:
+            reverse_power = replace_dict["reverse_power_replace_map"]
+            self.power_table = {}
+            for char, (c, v, j) in jamo.DECOMPOSE.items():
+                if c in reverse_power and v:
+                    self.power_table[ord(char)] = jamo.compose(reverse_power[c][0], v, j)
+
+        # 4. 역연음
+        self.liaison = None
+        if undo_liaison:
+            self.liaison = BoundaryTransducer(
+                reverse_continue_sound_rule(replace_dict["reverse_continue_sound_with_batchim_map"],
+                                            replace_dict["reverse_continue_sound_without_batchim_map"]), consume=True)
+
+    @staticmethod
+    def _is_jamo_symbol(symbol: str, iconic) -> bool:
+        return any(symbol in forms for name in ("consonant_dict", "vowel_dict") for forms in iconic[name].values())
+
+    def _compose(self, match) -> str:
+        cho, jung, jong = match.groups()
+        # 양쪽이 모두 기호이면 (영문 'Li' 등) 자모로 보지 않는다
+        if cho not in jamo.CHO_INDEX and jung not in jamo.JUNG_INDEX:
+            return match.group(0)
+        cho = self.consonant_map.get(cho, cho)
+        jung = self.vowel_map.get(jung, jung)
+        tail = jong or ""
+        if len(jung) == 2:
+            # 'ㅏㅇ' 같은 중성 + 받침 표기. consonant_swap이 남긴 같은 받침은 한 번만 쓴다
+            jung, jong = jung[0], jung[1]
+            tail = "" if tail == jong else tail
+        else:
+            tail = ""
+        try:
+            return jamo.compose(cho, jung, jong or "") + tail
+        except jamo.JamoError:
+            return match.group(0)
+
+    def __call__(self, text: str) -> str:
+        if not isinstance(text, str):
+            return text
+        if self.phrase_pattern is not None and not self.phrase_chars.isdisjoint(text):
+            replaced = self.phrase_pattern.sub(lambda m: self.phrase_map[m.group(0)], text)
+            if replaced != text:
+                text = _SPACES.sub(" ", replaced).strip()
+        if not self.jamo_chars.isdisjoint(text):
+            text = self.syllable_pattern.sub(self._compose, text)
+        if self.power_table is not None:
+            text = text.translate(self.power_table)
+        if self.liaison is not None:
+            text = self.liaison(text)
+        return text
+
+    def normalize_batch(self, texts: Iterable[str]) -> List[str]:
+        return [self(text) for text in texts]
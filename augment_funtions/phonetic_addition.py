@@ -8,12 +8,17 @@ This module provides functions to apply phonetic additions to Korean text:
 3. Final consonant addition (받침 추가)
 """
 
-import hgtk
+from . import jamo
 from typing import Optional
 import random
+from .batch import batched
+from .vectorized import ComponentTable, replace_component, add_final_consonant
+from .transducer import TRANSDUCER_MIN_CHARS, BoundaryTransducer, initial_consonant_rule, adaptive_final_consonant_rule
 
 class PhoneticAddition:
-    def __init__(self):
+    def __init__(self, rng=None):
+        # rule 안에서 쓰는 난수 생성기. random.Random 또는 RuleRNG를 주입하며, 없으면 module-level random
+        self.rng = rng if rng is not None else random
         self.SEMIVOWEL_MAPPING = {
             'ㅏ': ['ㅑ', 'ㅘ'],
             'ㅓ': ['ㅕ', 'ㅝ'],
@@ -82,6 +87,13 @@ class PhoneticAddition:
             'ㅄ': 'ㅅ',    # 값이 -> 갑시 (ㅅ 활용 - 뒤쪽 자음)
         }
 
+        # vectorized 경로용 jamo index 대치 표
+        self.semivowel_table = ComponentTable(self.SEMIVOWEL_MAPPING, jamo.JUNG_INDEX)
+        # 초성 추가 / 받침 추가 음절 경계 transducer
+        self.initial_transducer = BoundaryTransducer(initial_consonant_rule(self.FINAL_TO_INITIAL_MAPPING), consume=False)
+        self.adaptive_transducer = BoundaryTransducer(adaptive_final_consonant_rule(self.INITIAL_TO_FINAL_MAPPING), consume=False)
+
+    @batched
     def phonological_addition_initial_consonant(self, chunk: str) -> Optional[str]:
         """
         Process a single chunk by adding initial consonants based on previous character's final.
@@ -92,50 +104,15 @@ class PhoneticAddition:
         Returns:
             Optional[str]: Modified chunk if any transformation occurred, None otherwise
         """
-        result = []
-        chars = list(chunk)
-        
-        for i, char in enumerate(chars):
-            # Only try to transform Korean characters that start with ㅇ
-            if hgtk.checker.is_hangul(char):
-                # Decompose current character
-                cho, jung, jong = hgtk.letter.decompose(char)
-                
-                # Exception handling for empty initial consonant or vowel
-                if jung == '' or cho == '':
-                    result.append(char)
-                    continue
-                
-                # Check if current character starts with ㅇ and there's a previous character
-                if cho == 'ㅇ' and i > 0:
-                    prev_char = chars[i - 1]
-                    
-                    # Check if previous character is also Korean and has final consonant
-                    if hgtk.checker.is_hangul(prev_char):
-                        # Decompose previous character to get its final consonant
-                        _, _, prev_jong = hgtk.letter.decompose(prev_char)
-                        
-                        # Map the final consonant to appropriate initial consonant
-                        if prev_jong != '' and prev_jong in self.FINAL_TO_INITIAL_MAPPING:
-                            new_cho = self.FINAL_TO_INITIAL_MAPPING[prev_jong]
-                            
-                            # Compose new character with added initial consonant
-                            new_char = hgtk.letter.compose(new_cho, jung, jong)
-                            result.append(new_char)
-                        else:
-                            result.append(char)
-                    else:
-                        result.append(char)
-                else:
-                    result.append(char)
-            else:
-                # Keep punctuation and non-Korean characters as is
-                result.append(char)
-        
-        return ''.join(result)
+        return self.initial_transducer(chunk)
+
+    @phonological_addition_initial_consonant.vectorize(min_chars=TRANSDUCER_MIN_CHARS)
+    def phonological_addition_initial_consonant(self, chunks):
+        return self.initial_transducer.run_batch(chunks)
         
 
 
+    @batched
     def phonological_addition_semivowel(self, chunk: str) -> Optional[str]:
         """
         Process a single chunk by applying semivowel addition to characters.
@@ -150,9 +127,9 @@ class PhoneticAddition:
         
         for char in chunk:
             # Only try to transform Korean characters
-            if hgtk.checker.is_hangul(char):
+            if jamo.is_hangul(char):
                 # Decompose the character into jamo components
-                cho, jung, jong = hgtk.letter.decompose(char)
+                cho, jung, jong = jamo.decompose(char)
                 
                 # Exception handling for empty initial consonant or vowel
                 if jung == '' or cho == '':
@@ -162,10 +139,10 @@ class PhoneticAddition:
                 # Check if the vowel can be transformed
                 if jung in self.SEMIVOWEL_MAPPING:
                     # Apply semivowel transformation
-                    new_jung = random.choice(self.SEMIVOWEL_MAPPING[jung])
+                    new_jung = self.rng.choice(self.SEMIVOWEL_MAPPING[jung])
                     
                     # Compose new character
-                    new_char = hgtk.letter.compose(cho, new_jung, jong)
+                    new_char = jamo.compose(cho, new_jung, jong)
                     result.append(new_char)
                 else:
                     result.append(char)
@@ -174,9 +151,14 @@ class PhoneticAddition:
                 result.append(char)
         
         return ''.join(result)
+
+    @phonological_addition_semivowel.vectorize
+    def phonological_addition_semivowel(self, chunks):
+        return replace_component(chunks, self.rng, 1, self.semivowel_table)
         
 
 
+    @batched
     def phonological_addition_adaptive_final_consonant(self, chunk: str) -> Optional[str]:
         """
         Process a single chunk by adding final consonants based on next character's initial.
@@ -187,55 +169,22 @@ class PhoneticAddition:
         Returns:
             Optional[str]: Modified chunk if any transformation occurred, None otherwise
         """
-        result = []
-        chars = list(chunk)
-        
-        for i, char in enumerate(chars):
-            # Only try to transform Korean characters
-            if hgtk.checker.is_hangul(char):
-                # Decompose current character
-                cho, jung, jong = hgtk.letter.decompose(char)
-                
-                # Exception handling for empty initial consonant or vowel
-                if jung == '' or cho == '':
-                    result.append(char)
-                    continue
-                
-                # Check if current character has no final consonant and there's a next character
-                if jong == '' and i + 1 < len(chars):
-                    next_char = chars[i + 1]
-                    
-                    # Check if next character is also Korean
-                    if hgtk.checker.is_hangul(next_char):
-                        # Decompose next character to get its initial consonant
-                        next_cho, _, _ = hgtk.letter.decompose(next_char)
-                        
-                        # Exception handling for next character as well
-                        if next_cho == '':
-                            result.append(char)
-                            continue
-                        
-                        # Map the initial consonant to appropriate final consonant
-                        if next_cho in self.INITIAL_TO_FINAL_MAPPING:
-                            new_jong = self.INITIAL_TO_FINAL_MAPPING[next_cho]
-                            
-                            # Compose new character with added final consonant
-                            new_char = hgtk.letter.compose(cho, jung, new_jong)
-                            result.append(new_char)
-                        else:
-                            result.append(char)
-                    else:
-                        result.append(char)
-                else:
-                    result.append(char)
-            else:
-                # Keep punctuation and non-Korean characters as is
-                result.append(char)
-
-        if ''.join(result) == chunk:
+        result = self.adaptive_transducer(chunk)
+        if result == chunk:
             return self.phonological_addition_final_consonant(chunk, double_consonant_ratio=0.3)
         
-        return ''.join(result)
+        return result
+
+    @phonological_addition_adaptive_final_consonant.vectorize(min_chars=TRANSDUCER_MIN_CHARS)
+    def phonological_addition_adaptive_final_consonant(self, chunks):
+        results = self.adaptive_transducer.run_batch(chunks)
+        # 바뀌지 않은 chunk만 순서대로 임의 받침 추가로 넘긴다
+        unchanged = [i for i, (result, chunk) in enumerate(zip(results, chunks)) if result == chunk]
+        fallback = add_final_consonant([chunks[i] for i in unchanged], self.rng, 0.3,
+                                       self.DOUBLE_FINAL_CONSONANTS, self.SINGLE_FINAL_CONSONANTS)
+        for i, result in zip(unchanged, fallback):
+            results[i] = result
+        return results
     
 
     def phonological_addition_final_consonant(self, chunk: str, double_consonant_ratio: float = 0.3) -> Optional[str]:
@@ -252,9 +201,9 @@ class PhoneticAddition:
         
         for char in chunk:
             # Only try to transform Korean characters
-            if hgtk.checker.is_hangul(char):
+            if jamo.is_hangul(char):
                 # Decompose the character into jamo components
-                cho, jung, jong = hgtk.letter.decompose(char)
+                cho, jung, jong = jamo.decompose(char)
                 
                 # Exception handling for empty initial consonant or vowel
                 if jung == '' or cho == '':
@@ -264,13 +213,13 @@ class PhoneticAddition:
                 # Check if character has no final consonant
                 if jong == '':
                     # Choose between single and double consonants based on ratio
-                    if random.random() < double_consonant_ratio:
-                        new_jong = random.choice(self.DOUBLE_FINAL_CONSONANTS)
+                    if self.rng.random() < double_consonant_ratio:
+                        new_jong = self.rng.choice(self.DOUBLE_FINAL_CONSONANTS)
                     else:
-                        new_jong = random.choice(self.SINGLE_FINAL_CONSONANTS)
+                        new_jong = self.rng.choice(self.SINGLE_FINAL_CONSONANTS)
                     
                     # Compose new character
-                    new_char = hgtk.letter.compose(cho, jung, new_jong)
+                    new_char = jamo.compose(cho, jung, new_jong)
                     result.append(new_char)
                 else:
                     result.append(char)
@@ -1,100 +1,180 @@
-from pickletools import read_uint1
-import hgtk
+from . import jamo
 import random
-import json
-import requests
 import re
-from bs4 import BeautifulSoup
-from urllib.parse import quote
-from time import sleep
-from G2P.KoG2Padvanced import KoG2Padvanced
+from multiprocessing import Pool
+from .batch import batched
+from .vectorized import replace_component
+from .resources import load_resources
+from .transducer import TRANSDUCER_MIN_CHARS, BoundaryTransducer, continue_sound_rule, reverse_continue_sound_rule
+from .cache import DiskCache, MemoCache, module_version
 
 DEFAULT_COMPOSE_CODE = "ᴥ"
+HANGUL_RUN = re.compile(r'[가-힣]+')
+
+
+# G2P는 1-5를 처음 쓸 때 import한다
+def ko_g2p(text):
+    from G2P.KoG2Padvanced import KoG2Padvanced
+    return KoG2Padvanced(text)
+
+
+def g2p_namespace():
+    from G2P.KoG2Padvanced import KoG2Padvanced
+    return f"g2p:{module_version(KoG2Padvanced)}"
+
+
+def make_g2p_cache(cache_path=None, table=None):
+    """
+    G2P 결과 캐시 (한글 run -> 발음). cache_path를 주면 sqlite 파일을 worker끼리 공유하고,
+    table(build_g2p_table의 결과)을 주면 미리 채워 둔다.
+    """
+    disk = DiskCache(cache_path) if cache_path else None
+    cache = MemoCache(ko_g2p, g2p_namespace, disk=disk)
+    if table:
+        cache.preload(table)
+    return cache
+
+
+def build_g2p_table(texts, workers=1, cache_path=None):
+    """
+    texts 전체의 고유한 한글 run을 한 번씩만 G2P로 변환한 표 {run: 발음}.
+    cache_path의 sqlite cache에 있는 run은 다시 계산하지 않고, 새로 계산한 결과는 cache에 추가한다.
+    """
+    runs = sorted({run for text in texts for run in HANGUL_RUN.findall(text)})
+    namespace = g2p_namespace()
+    disk = DiskCache(cache_path) if cache_path else None
+    table = {}
+    missing = []
+    for run in runs:
+        value = disk.get(namespace, run) if disk is not None else None
+        if value is None:
+            missing.append(run)
+        else:
+            table[run] = value
+
+    if workers > 1 and missing:
+        with Pool(workers) as pool:
+            converted = pool.map(ko_g2p, missing, chunksize=max(1, len(missing) // (workers * 8)))
+    else:
+        converted = [ko_g2p(run) for run in missing]
+    for run, value in zip(missing, converted):
+        table[run] = value
+        if disk is not None:
+            disk.put(namespace, run, value)
+    if disk is not None:
+        disk.close()
+    return table
+
 
 class Processing:
-    def __init__(self):
-        with open("./rules/replace.json", "r") as f:
-            self.replace_dict = json.load(f)
-        self.last_replace_map = {}
-        for i in ["ㄱ", "ㄴ", "ㄷ", "ㄹ", "ㅁ", "ㅂ", "ㅇ"]:
-            self.last_replace_map[i] = []
-        for key in self.replace_dict["real_sound_map"]:
-            self.last_replace_map[self.replace_dict["real_sound_map"][key]].append(key)
+    def __init__(self, rng=None, g2p=None):
+        # rule 안에서 쓰는 난수 생성기. random.Random 또는 RuleRNG를 주입하며, 없으면 module-level random
+        self.rng = rng if rng is not None else random
+        # G2P 결과 캐시. 여러 객체가 공유하도록 make_g2p_cache()로 만든 것을 주입할 수 있다
+        self.g2p = g2p if g2p is not None else make_g2p_cache()
+        # rules/replace.json과 거기서 파생한 표 (resources.py에서 컴파일, process 안에서 공유)
+        resources = load_resources()
+        self.replace_dict = resources["replace"]
+        self.last_replace_map = resources["last_replace_map"]
+        self.power_table = resources["power_table"]
+        self.vowel_table = resources["vowel_table"]
+        self.last_table = resources["last_table"]
+        # 연음 / 역연음 음절 경계 transducer
+        self.continue_transducer = BoundaryTransducer(continue_sound_rule(self.replace_dict["continue_sound_map"]), consume=True)
+        self.reverse_transducer = BoundaryTransducer(
+            reverse_continue_sound_rule(self.replace_dict["reverse_continue_sound_with_batchim_map"],
+                                        self.replace_dict["reverse_continue_sound_without_batchim_map"]), consume=True)
     
     # 1-A 대치
     ## 초성 예사소리 -> 된소리, 거센소리 대치
+    @batched
     def first_power_replace(self, input_span):
         result = []
         for char in list(input_span):
-            if hgtk.checker.is_hangul(char):
-                cho, jung, jong = hgtk.letter.decompose(char)
+            if jamo.is_hangul(char):
+                cho, jung, jong = jamo.decompose(char)
                 if jung == '' or cho == '':
                     continue
                 if cho in self.replace_dict["power_replace_map"]:
-                    candidate = random.choice(self.replace_dict["power_replace_map"][cho])
-                    result.append(hgtk.letter.compose(candidate,jung,jong))
+                    candidate = self.rng.choice(self.replace_dict["power_replace_map"][cho])
+                    result.append(jamo.compose(candidate,jung,jong))
                 else:
-                    result.append(hgtk.letter.compose(cho,jung,jong))
+                    result.append(jamo.compose(cho,jung,jong))
             else:
                 result.append(char)
         return ''.join(result) 
 
+    @first_power_replace.vectorize
+    def first_power_replace(self, texts):
+        return replace_component(texts, self.rng, 0, self.power_table, drop_jamo=True)
+
     ## 초성 된소리, 거센소리 -> 예사소리 대치
     def reverse_first_power_replace(self, input_span):
         result = []
         for char in list(input_span):
-            if hgtk.checker.is_hangul(char):
-                cho, jung, jong = hgtk.letter.decompose(char)
+            if jamo.is_hangul(char):
+                cho, jung, jong = jamo.decompose(char)
                 if jung == '' or cho == '':
                     result.append(char)
                     continue
                 if cho in self.replace_dict["reverse_power_replace_map"]:
-                    result.append(hgtk.letter.compose(random.choice(self.replace_dict["reverse_power_replace_map"][cho]), jung, jong))
+                    result.append(jamo.compose(self.rng.choice(self.replace_dict["reverse_power_replace_map"][cho]), jung, jong))
                 else:
-                    result.append(hgtk.letter.compose(cho, jung, jong))
+                    result.append(jamo.compose(cho, jung, jong))
             else:
                 result.append(char)
         return ''.join(result)
 
     ## 모음 대치
+    @batched
     def vowel_replace(self, input_span):
         result = []
         for char in list(input_span):
-            if hgtk.checker.is_hangul(char):
-                cho, jung, jong = hgtk.letter.decompose(char)
+            if jamo.is_hangul(char):
+                cho, jung, jong = jamo.decompose(char)
                 if jung == '' or cho == '':
                     result.append(char)
                     continue
                 if jung in self.replace_dict["vowel_replace_map"]:
-                    result.append(hgtk.letter.compose(cho, random.choice(self.replace_dict["vowel_replace_map"][jung]), jong))
+                    result.append(jamo.compose(cho, self.rng.choice(self.replace_dict["vowel_replace_map"][jung]), jong))
                 else:
-                    result.append(hgtk.letter.compose(cho, jung, jong))
+                    result.append(jamo.compose(cho, jung, jong))
             else:
                 result.append(char)
         return ''.join(result)
+
+    @vowel_replace.vectorize
+    def vowel_replace(self, texts):
+        return replace_component(texts, self.rng, 1, self.vowel_table)
     
     ## 받침 대치
+    @batched
     def last_replace(self, input_span):
         result = []
         for char in list(input_span):
-            if hgtk.checker.is_hangul(char):
-                cho, jung, jong = hgtk.letter.decompose(char)
+            if jamo.is_hangul(char):
+                cho, jung, jong = jamo.decompose(char)
                 if jung == '' or cho == '':
                     result.append(char)
                     continue
                 if jong != '' and jong in self.replace_dict["real_sound_map"]:
-                    new_jong = random.choice(self.last_replace_map[self.replace_dict["real_sound_map"][jong]])
-                    result.append(hgtk.letter.compose(cho, jung, new_jong))
+                    new_jong = self.rng.choice(self.last_replace_map[self.replace_dict["real_sound_map"][jong]])
+                    result.append(jamo.compose(cho, jung, new_jong))
                 else:
-                    result.append(hgtk.letter.compose(cho, jung, jong))
+                    result.append(jamo.compose(cho, jung, jong))
             else:
                 result.append(char)
         return ''.join(result)
 
+    @last_replace.vectorize
+    def last_replace(self, texts):
+        return replace_component(texts, self.rng, 2, self.last_table)
+
     ## 음운 변동 반영
+    @batched
     def sound_like_replace(self, input_span):
         # finditer로 매칭된 부분의 위치를 정확히 파악
-        matches = list(re.finditer(r'[가-힣]+', input_span))
+        matches = list(HANGUL_RUN.finditer(input_span))
         if matches:
             # 뒤에서부터 바꿔야 인덱스가 꼬이지 않음
             result_text = input_span
@@ -102,12 +182,16 @@ class Processing:
                 start, end = match.span()
                 matched_text = match.group()
                 # print(f"Matched: {matched_text} at {start}-{end}")
-                converted_korean = KoG2Padvanced(matched_text)
+                converted_korean = self.g2p(matched_text)
                 result_text = result_text[:start] + converted_korean + result_text[end:]
             return result_text
         else:
             return input_span
         
+        # from urllib.parse import quote
+        # from time import sleep
+        # import requests
+        # from bs4 import BeautifulSoup
         # encoded_word = quote(input_span.encode("euc-kr"))
         # wait_time = [1, 2, 3, 4, 5]
         # url = f"https://pronunciation.cs.pusan.ac.kr/pronunc2.asp?text1={encoded_word}&submit1=확인하기"
@@ -129,122 +213,34 @@ class Processing:
 
     # 1-C 연음
     ## 연음
+    @batched
     def continue_sound(self, input_span):
-        result = []
-        chars = list(input_span)
-        flag = False
-        
-        for i, char in enumerate(chars):
-            if hgtk.checker.is_hangul(char):
-                cho, jung, jong = hgtk.letter.decompose(char)
-                if jung == '' or cho == '':
-                    result.append(char)
-                    continue
-                
-                if flag:
-                    flag = False
-                    continue
-                
-                # Check if there's a next character and if current character has final consonant
-                if i < len(chars) - 1 and jong != '' and hgtk.checker.is_hangul(chars[i + 1]):
-                    next_cho, next_jung, next_jong = hgtk.letter.decompose(chars[i + 1])
-                    if next_jung == '' or next_cho == '':
-                        result.append(char)
-                        continue
-
-                    # Create the combination pattern
-                    combination = jong + 'ᴥ' + next_cho
-                    
-                    if combination in self.replace_dict["continue_sound_map"]:
-                        # Apply continue sound transformation
-                        new_combination = self.replace_dict["continue_sound_map"][combination]
-                        # print(f"new_next_cho: {cho}, next_jung: {jung}, next_jong: {jong}")
-                        
-                        new_cur_jong = new_combination.split('ᴥ')[0]
-                        new_next_cho = new_combination.split('ᴥ')[1]
-
-                        result.append(hgtk.letter.compose(cho, jung, new_cur_jong))
-                        result.append(hgtk.letter.compose(new_next_cho, next_jung, next_jong))
-                        
-                        # Skip the next character as it's already processed
-                        flag = True
-                    else:
-                        result.append(char)
-                else:
-                    result.append(char)
-            else:
-                result.append(char)
-        
-        if ''.join(result) == input_span:
+        result = self.continue_transducer(input_span)
+        if result == input_span:
             return self.reverse_continue_sound(input_span)
+        return result
 
-        return ''.join(result)
+    @continue_sound.vectorize(min_chars=TRANSDUCER_MIN_CHARS)
+    def continue_sound(self, texts):
+        results = self.continue_transducer.run_batch(texts)
+        # 연음이 적용되지 않은 text만 역연음으로 넘긴다
+        unchanged = [i for i, (result, text) in enumerate(zip(results, texts)) if result == text]
+        for i, result in zip(unchanged, self.reverse_transducer.run_batch([texts[i] for i in unchanged])):
+            results[i] = result
+        return results
 
     ## 역연음
     def reverse_continue_sound(self, input_span):
-        result = []
-        chars = list(input_span)
-        
-        for i, char in enumerate(chars):
-            if chars[i] is None:  # Skip already processed characters
-                continue
-                
-            if hgtk.checker.is_hangul(char):
-                cho, jung, jong = hgtk.letter.decompose(char)
-                if jung == '' or cho == '':
-                    result.append(char)
-                    continue
-                
-                # Check if there's a next character
-                if i < len(chars) - 1 and chars[i + 1] is not None and hgtk.checker.is_hangul(chars[i + 1]):
-                    next_cho, next_jung, next_jong = hgtk.letter.decompose(chars[i + 1])
-                    if next_jung == '' or next_cho == '':
-                        result.append(char)
-                        continue
-                
-                    
-                    # Create the combination pattern for reverse continue sound
-                    combination = cho + 'ᴥ' + next_cho
-                    
-                    # Check with batchim map first
-                    if hgtk.checker.has_batchim(char) and combination in self.replace_dict["reverse_continue_sound_with_batchim_map"]:
-                        candidate = self.replace_dict["reverse_continue_sound_with_batchim_map"][combination]
-                        new_next_cho = 'ㅇ'
-                        new_jong = candidate.split('ᴥ')[0]
-                        new_next_cho = candidate.split('ᴥ')[1]
-                        result.append(hgtk.letter.compose(cho, jung, new_jong))
-                        result.append(hgtk.letter.compose(new_next_cho, next_jung, next_jong))
-                        
-                        # Skip the next character as it's already processed
-                        chars[i + 1] = None
-                    # Check without batchim map
-                    elif not hgtk.checker.has_batchim(char) and combination in self.replace_dict["reverse_continue_sound_without_batchim_map"]:
-                        candidate = self.replace_dict["reverse_continue_sound_without_batchim_map"][combination]
-                        new_next_cho = 'ㅇ'
-                        new_jong = candidate.split('ᴥ')[0]
-                        new_next_cho = candidate.split('ᴥ')[1]
-                        result.append(hgtk.letter.compose(cho, jung, new_jong))
-                        result.append(hgtk.letter.compose(new_next_cho, next_jung, next_jong))
-                        
-                        # Skip the next character as it's already processed
-                        chars[i + 1] = None
-                    else:
-                        result.append(char)
-                else:
-                    result.append(char)
-            else:
-                result.append(char)
-        
-        return ''.join(result)
+        return self.reverse_transducer(input_span)
 
     # # 1-D
     # ## 탈락
     # def elision(self, input_span):
     #     input_span = list(input_span)
     #     for i in range(len(input_span)):
-    #         if hgtk.checker.is_hangul(input_span[i]):
-    #             cho, jung, jong = hgtk.letter.decompose(input_span[i])
-    #             input_span[i] = hgtk.letter.compose(cho, jung)
+    #         if jamo.is_hangul(input_span[i]):
+    #             cho, jung, jong = jamo.decompose(input_span[i])
+    #             input_span[i] = jamo.compose(cho, jung)
         
     #     return "".join(input_span)
         
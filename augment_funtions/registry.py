@@ -0,0 +1,54 @@
+"""
+Lazy rule registry
+rule 이름 -> rule 함수 mapping (처음 쓸 때 rule 객체 생성)
+
+Augmentation.MAP maps a rule name to (class name, method name). The rule
+object is created the first time one of its rules is looked up, so a run that
+only uses jamo rules never loads the JSON dictionaries, the OpenAI client or G2P.
+Created objects share one generator, which set_rng replaces.
+"""
+
+import importlib
+from collections.abc import Mapping
+from typing import Dict, Tuple
+
+
+class RuleRegistry(Mapping):
+    def __init__(self, specs: Dict[str, Tuple[str, str]], rng, options: Dict[str, dict] = None):
+        """
+        specs: {rule: (class 이름, method 이름)}
+        options: {class 이름: 생성자에 rng와 함께 넘길 keyword 인자}
+        """
+        self.specs = specs
+        self.rng = rng
+        self.options = options or {}
+        self._objects = {}
+        self._rules = {}
+
+    def __getitem__(self, rule):
+        bound = self._rules.get(rule)
+        if bound is None:
+            class_name, method = self.specs[rule]
+            bound = self._rules[rule] = getattr(self.instance(class_name), method)
+        return bound
+
+    def __iter__(self):
+        return iter(self.specs)
+
+    def __len__(self):
+        return len(self.specs)
+
+    def instance(self, class_name: str):
+        rule_object = self._objects.get(class_name)
+        if rule_object is None:
+            rule_class = getattr(importlib.import_module(__package__), class_name)
+            rule_object = self._objects[class_name] = rule_class(self.rng, **self.options.get(class_name, {}))
+        return rule_object
+
+    def loaded(self):
+        return list(self._objects.values())
+
+    def set_rng(self, rng):
+        self.rng = rng
+        for rule_object in self._objects.values():
+            rule_object.rng = rng
@@ -0,0 +1,168 @@
+"""
+Compiled rule resources
+rule 사전(JSON)을 한 번 컴파일해 두고 공유하는 모듈
+
+The JSON dictionaries under rules/ and the structures derived from them
+(last_replace_map, the jamo index tables used by the vectorized path, the
+multi-pattern regex matchers of the dictionary rules and the Latin transliterator
+of rule 8-1) are
+compiled into one pickle, resources-<hash>.pickle in the cache directory
+($KOTOX_CACHE_DIR, else $XDG_CACHE_HOME/kotox or ~/.cache/kotox). The hash
+covers the bytes of every source file and of the modules that build the
+compiled structures, so editing a JSON file or the compile code triggers a
+rebuild on the next load. If the cache directory cannot be written, the
+resources are compiled in memory for the process. load_resources() keeps the
+result for the process. Calling it in the main process before forking lets every worker
+share the same pages instead of parsing and holding its own copy.
+
+Build manually with:
+    $ python -m augment_funtions.resources
+"""
+
+import hashlib
+import json
+import os
+import pickle
+import sys
+import tempfile
+import warnings
+
+from . import jamo, latin, multipattern, vectorized
+from .latin import LatinTransliterator
+from .multipattern import PatternReplacer
+from .vectorized import ComponentTable
+
+# 다른 디렉터리(classification 등)에서 import해도 같은 rules/를 읽는다
+RULES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "rules")
+# 소스 트리 대신 사용자 cache 디렉터리에 쓴다. KOTOX_CACHE_DIR로 바꿀 수 있다
+CACHE_ENV = "KOTOX_CACHE_DIR"
+SOURCES = {
+    "replace": "replace.json",
+    "iconic": "iconic_dictionary.json",
+    "transliterational": "transliterational_dictionary.json",
+}
+# 컴파일 결과를 만드는 코드. 이 파일들이 바뀌어도 artifact를 다시 만든다
+COMPILE_MODULES = (sys.modules[__name__], jamo, latin, multipattern, vectorized)
+
+_resources = None
+
+
+def cache_dir() -> str:
+    path = os.environ.get(CACHE_ENV)
+    if path:
+        return path
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "kotox")
+
+
+def content_hash() -> str:
+    digest = hashlib.sha256()
+    for name, file_name in sorted(SOURCES.items()):
+        with open(os.path.join(RULES_DIR, file_name), "rb") as f:
+            digest.update(name.encode())
+            digest.update(f.read())
+    for module in COMPILE_MODULES:
+        with open(module.__file__, "rb") as f:
+            digest.update(os.path.basename(module.__file__).encode())
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def compile_resources(source_hash: str) -> dict:
+    resources = {"hash": source_hash}
+    for name, file_name in SOURCES.items():
+        with open(os.path.join(RULES_DIR, file_name), "r") as f:
+            resources[name] = json.load(f)
+
+    replace_dict = resources["replace"]
+    last_replace_map = {}
+    for i in ["ㄱ", "ㄴ", "ㄷ", "ㄹ", "ㅁ", "ㅂ", "ㅇ"]:
+        last_replace_map[i] = []
+    for key in replace_dict["real_sound_map"]:
+        last_replace_map[replace_dict["real_sound_map"][key]].append(key)
+    resources["last_replace_map"] = last_replace_map
+
+    # vectorized 경로용 jamo index 대치 표
+    resources["power_table"] = ComponentTable(replace_dict["power_replace_map"], jamo.CHO_INDEX)
+    resources["vowel_table"] = ComponentTable(replace_dict["vowel_replace_map"], jamo.JUNG_INDEX)
+    resources["last_table"] = ComponentTable(
+        {jong: last_replace_map[sound] for jong, sound in replace_dict["real_sound_map"].items()}, jamo.JONG_INDEX)
+
+    # 사전 기반 rule의 multi-pattern replacer (escape한 key를 긴 것부터 이은 정규식 alternation, multipattern.py)
+    resources["yamin_replacer"] = PatternReplacer(resources["iconic"]["yamin_dict"])
+    resources["rotation_replacer"] = PatternReplacer(resources["iconic"]["rotation_dict"])
+    resources["meaning_replacer"] = PatternReplacer(resources["transliterational"]["meaning_dict"])
+
+    # 8-1 규칙 기반 backend
+    resources["latin_transliterator"] = LatinTransliterator(resources["transliterational"]["latin_dict"], replace_dict["real_sound_map"])
+    return resources
+
+
+def artifact_path(source_hash: str) -> str:
+    return os.path.join(cache_dir(), f"resources-{source_hash[:16]}.pickle")
+
+
+def store_resources(resources: dict):
+    """
+    컴파일 결과를 artifact로 저장하고 경로를 돌려준다. 다른 process가 동시에 만들어도 깨지지 않도록 rename으로 교체한다.
+    cache 디렉터리에 쓸 수 없으면 경고만 하고 None을 돌려준다 (결과는 process 안에서만 쓴다).
+    """
+    directory = cache_dir()
+    path = artifact_path(resources["hash"])
+    tmp_path = None
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            pickle.dump(resources, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        if tmp_path is not None and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        warnings.warn(f"cannot write the rule resource cache to {directory} ({e}); set {CACHE_ENV} to a writable directory")
+        return None
+    # 이전 JSON / 코드로 만든 artifact 정리
+    for name in os.listdir(directory):
+        stale = os.path.join(directory, name)
+        if name.startswith("resources-") and name.endswith(".pickle") and stale != path:
+            try:
+                os.remove(stale)
+            except OSError:
+                pass
+    return path
+
+
+def build_resources():
+    """
+    artifact를 새로 만들고 경로를 돌려준다. 저장하지 못하면 None.
+    """
+    return store_resources(compile_resources(content_hash()))
+
+
+def load_resources() -> dict:
+    """
+    현재 JSON에 맞는 artifact를 읽는다. 없거나 hash가 다르면 다시 만든다. 결과는 process 안에서 공유된다.
+    rule 객체는 돌려받은 사전을 읽기만 해야 한다.
+    """
+    global _resources
+    if _resources is not None:
+        return _resources
+
+    source_hash = content_hash()
+    path = artifact_path(source_hash)
+    resources = None
+    if os.path.exists(path):
+        try:
+            with open(path, "rb") as f:
+                resources = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            resources = None
+    if resources is None or resources.get("hash") != source_hash:
+        resources = compile_resources(source_hash)
+        store_resources(resources)
+    _resources = resources
+    return resources
+
+
+if __name__ == "__main__":
+    print(build_resources())
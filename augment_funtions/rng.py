@@ -0,0 +1,93 @@
+"""
+Injectable random generators for obfuscation rules
+증강 규칙에 주입하는 난수 생성기 모듈
+
+Rules only use the `choice / sample / shuffle / random / randint` subset of the
+stdlib `random` API, so they accept either a `random.Random` or a `RuleRNG`.
+`RuleRNG` wraps a NumPy `Generator`: scalar draws are served from a buffer of
+uniforms drawn in blocks, `uniforms(n)` hands out the same stream as an array,
+and `.generator` is exposed for batched draws.
+"""
+
+from typing import MutableSequence, Sequence
+
+import numpy as np
+
+
+class RuleRNG:
+    __slots__ = ("generator", "_buffer", "_pos", "block")
+
+    def __init__(self, generator: np.random.Generator, block: int = 1024):
+        self.generator = generator
+        self.block = block
+        self._buffer = generator.random(block)
+        self._pos = 0
+
+    def random(self) -> float:
+        if self._pos == self.block:
+            self._buffer = self.generator.random(self.block)
+            self._pos = 0
+        u = self._buffer[self._pos]
+        self._pos += 1
+        return float(u)
+
+    def uniforms(self, n: int) -> np.ndarray:
+        """
+        random()을 n번 부른 것과 같은 값을 배열로 돌려준다 (vectorized 경로용).
+        """
+        out = np.empty(n)
+        filled = 0
+        while filled < n:
+            if self._pos == self.block:
+                self._buffer = self.generator.random(self.block)
+                self._pos = 0
+            take = min(n - filled, self.block - self._pos)
+            out[filled:filled + take] = self._buffer[self._pos:self._pos + take]
+            self._pos += take
+            filled += take
+        return out
+
+    def _below(self, n: int) -> int:
+        return min(int(self.random() * n), n - 1)
+
+    def randint(self, a: int, b: int) -> int:
+        if b < a:
+            raise ValueError(f"empty range for randint({a}, {b})")
+        return a + self._below(b - a + 1)
+
+    def choice(self, seq: Sequence):
+        if not seq:
+            raise IndexError("Cannot choose from an empty sequence")
+        return seq[self._below(len(seq))]
+
+    def shuffle(self, x: MutableSequence):
+        # Fisher-Yates
+        for i in range(len(x) - 1, 0, -1):
+            j = self._below(i + 1)
+            x[i], x[j] = x[j], x[i]
+
+    def sample(self, population: Sequence, k: int) -> list:
+        n = len(population)
+        if not 0 <= k <= n:
+            raise ValueError("Sample larger than population or is negative")
+        pool = list(population)
+        for i in range(k):
+            j = i + self._below(n - i)
+            pool[i], pool[j] = pool[j], pool[i]
+        return pool[:k]
+
+
+def make_rng(seed: int, *key: int) -> RuleRNG:
+    """
+    (seed, *key)로부터 결정되는 생성기. 예: make_rng(seed, row_index)
+    """
+    return RuleRNG(np.random.default_rng([seed, *key]))
+
+
+def as_generator(rng) -> np.random.Generator:
+    """
+    batch/vectorized 경로에서 쓸 NumPy Generator. random.Random이 주입된 경우 그 상태에서 파생한다.
+    """
+    if isinstance(rng, RuleRNG):
+        return rng.generator
+    return np.random.default_rng(rng.getrandbits(64))
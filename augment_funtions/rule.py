@@ -1,37 +1,148 @@
+import functools
+import hashlib
 import os
-import openai
 import random
 import json
-import hgtk
-from dotenv import load_dotenv
+from typing import Dict, List, Sequence, Tuple
+from . import jamo
+from .batch import batched
+from .cache import DiskCache, MemoCache
+from .resources import RULES_DIR, load_resources
+from .symbols import SymbolInserter
+
+LLM_MODEL = "gpt-4.1"
+# 8-1 / 8-3 system prompt
+PROMPT_FILES = {"latin": "latin_prompt.txt", "korean": "korean_prompt.txt"}
+# 여러 문장을 한 요청으로 보낼 때 system prompt 뒤에 붙이는 지시
+BATCH_PROMPT_FILE = "batch_prompt.txt"
+# 8-1 backend: llm (API 요청) 또는 rule (augment_funtions/latin.py의 규칙 기반 음차)
+LATIN_BACKENDS = ("llm", "rule")
+# 8-3 backend: llm 또는 model (augment_funtions/distill.py로 학습한 글자 단위 seq2seq)
+FOREIGN_BACKENDS = ("llm", "model")
+
+_prompts = {}
+
+
+class LLMCacheMiss(LookupError):
+    """
+    offline mode에서 cache에 없는 입력을 만났을 때 (API를 부르지 않고 바로 실패한다).
+    name: prompt 이름, texts: 그 요청에서 cache에 없던 입력 전부.
+    """
+    def __init__(self, name: str, texts: Sequence[str]):
+        super().__init__(f"{name} prompt: no cached output for {texts[0]!r} (offline mode)")
+        self.name = name
+        self.texts = list(texts)
+
+
+class LLMResponseError(ValueError):
+    pass
+
+
+def _read_prompt(filename: str) -> Tuple[str, str]:
+    prompt = _prompts.get(filename)
+    if prompt is None:
+        with open(os.path.join(RULES_DIR, filename), "r") as file:
+            text = file.read()
+        prompt = _prompts[filename] = (text, hashlib.sha256(text.encode()).hexdigest())
+    return prompt
+
+
+def load_prompt(name: str) -> Tuple[str, str]:
+    """
+    prompt 파일 내용과 sha256. process마다 한 번만 읽는다.
+    """
+    return _read_prompt(PROMPT_FILES[name])
+
+
+def _strip_fence(content: str) -> str:
+    return content.replace("```json", "").replace("```", "")
+
+
+def parse_batch_output(content: str, texts: Sequence[str]) -> Dict[int, str]:
+    """
+    여러 문장 응답(JSON 배열)에서 검증을 통과한 원소만 {입력 번호: 출력}으로 돌려준다.
+    id가 범위 밖이거나 중복이거나, input이 보낸 문장과 다르거나, output이 빈 원소는 버린다.
+    """
+    try:
+        items = json.loads(_strip_fence(content))
+    except (TypeError, ValueError):
+        return {}
+    if not isinstance(items, list):
+        return {}
+    outputs = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        index, source, output = item.get("id"), item.get("input"), item.get("output")
+        if type(index) is not int or not 0 <= index < len(texts) or index in outputs:
+            continue
+        if not isinstance(source, str) or source.strip() != texts[index].strip():
+            continue
+        if isinstance(output, str) and output.strip():
+            outputs[index] = output
+    return outputs
+
+
+class LLMRequestCounter:
+    """
+    LLM API 요청 수 계측: requests(보낸 요청), items(요청한 문장), fallbacks(여러 문장 응답에서 빠져 한 문장씩 다시 보낸 문장).
+    """
+    def __init__(self):
+        self.requests = 0
+        self.items = 0
+        self.fallbacks = 0
+
+    def counts(self) -> Dict[str, int]:
+        return {"requests": self.requests, "items": self.items, "fallbacks": self.fallbacks}
+
+
+def llm_namespace(name: str, model: str = LLM_MODEL) -> str:
+    # prompt나 model이 바뀌면 이전 결과를 읽지 않는다
+    return f"llm:{model}:{name}:{load_prompt(name)[1][:16]}"
+
 
-load_dotenv()
-API_KEY = os.getenv("API_KEY")
+def make_llm_caches(cache_path=None) -> Dict[str, MemoCache]:
+    """
+    prompt마다 (prompt hash, model, 입력 문장) -> 출력 cache. cache_path를 주면 sqlite 파일에 남겨 다음 실행에서도 쓴다.
+    """
+    disk = DiskCache(cache_path) if cache_path else None
+    return {name: MemoCache(None, functools.partial(llm_namespace, name), disk=disk) for name in PROMPT_FILES}
+
+
+def openai_client():
+    """
+    .env의 API_KEY로 OpenAI client를 만든다. openai / dotenv는 LLM rule을 처음 쓸 때 import한다.
+    """
+    import openai
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    return openai.OpenAI(api_key=os.getenv("API_KEY"))
 
 class SyntaticObfuscation:
-    def __init__(self):\
-        pass
+    def __init__(self, rng=None):
+        # rule 안에서 쓰는 난수 생성기. random.Random 또는 RuleRNG를 주입하며, 없으면 module-level random
+        self.rng = rng if rng is not None else random
     
-    def spacing(self, text_list: str) -> str:
+    @batched
+    def spacing(self, text_list) -> str:
         """
         4-A. 띄어쓰기
+        text_list: 어절 단위 SpanStore
         """
-        option = random.choice([0, 1])
+        option = self.rng.choice([0, 1])
         if option == 0:
-            result = ""
-            for span in text_list:
-                result += span['span'][-1]
-            return result
+            return "".join(text_list.spans)
         else:
             result_list = []
             applied_index = []
             for i in range(len(text_list)):
-                word = text_list[i]['span'][-1]
-                applied_rule = text_list[i]['applied_rule']
+                word = text_list.spans[i]
+                applied_rule = text_list.applied_rules(i)
                 # 단어 길이가 2 이상일 때만 띄어쓰기 삽입 시도, 배열 교란이 없는 경우에만
                 if len(word) > 1 and '11' not in applied_rule:
                     # 삽입 위치를 1 ~ len(word)-1 중에서 랜덤 선택
-                    insert_pos = random.randint(1, len(word)-1)
+                    insert_pos = self.rng.randint(1, len(word)-1)
                     word = word[:insert_pos] + " " + word[insert_pos:]
                     result_list.append(word)
                     applied_index.append(i)
@@ -40,22 +151,20 @@ class SyntaticObfuscation:
             
             # 40% 이하면 그냥 띄어쓰기 없는 걸로
             if len(applied_index) < int(len(text_list)*0.4):
-                result = ""
-                for span in text_list:
-                    result += span['span'][-1]
-                return result
+                return "".join(text_list.spans)
             else:
-                selected_span = random.sample(applied_index, int(len(text_list)*0.4))
+                selected_span = self.rng.sample(applied_index, int(len(text_list)*0.4))
                 result = ""
                 for i in range(len(result_list)):
                     if i in selected_span:
                         result += result_list[i] + " "
                     else:
-                        result += text_list[i]['span'][-1] + " "
+                        result += text_list.spans[i] + " "
                 
                 return result.rstrip()
                 
 
+    @batched
     def change_array(self, text: str) -> str:
         """
         4-B. 배열교란
@@ -71,14 +180,14 @@ class SyntaticObfuscation:
         chars = list(span)
         if len(span) == 3:
             middle = chars[1]
-            if random.random() < 0.7:
+            if self.rng.random() < 0.7:
                 chars[1], chars[2] = chars[2], chars[1]
             return "".join(chars)
         middle = chars[1:-1]
         if len(middle) > 1:
             shuffled = middle[:]
             for _ in range(3):
-                random.shuffle(shuffled)
+                self.rng.shuffle(shuffled)
                 if shuffled != middle:
                     break
             chars = [chars[0]] + shuffled + [chars[-1]]
@@ -87,38 +196,40 @@ class SyntaticObfuscation:
 
 # 3. 도상적 대치
 class IconicObfuscation:
-    def __init__(self):
-        with open("./rules/iconic_dictionary.json", "r") as f:
-            self.iconic_dict = json.load(f)
-            # self.okt = Okt()
-
+    def __init__(self, rng=None):
+        # rule 안에서 쓰는 난수 생성기. random.Random 또는 RuleRNG를 주입하며, 없으면 module-level random
+        self.rng = rng if rng is not None else random
+        resources = load_resources()
+        self.iconic_dict = resources["iconic"]
+        self.yamin_replacer = resources["yamin_replacer"]
+        self.rotation_replacer = resources["rotation_replacer"]
+        # self.okt = Okt()
+
+    @batched
     def yamin_swap(self, text: str) -> str:
         """
         2-A. 가나다
         """
-        for key in self.iconic_dict['yamin_dict'].keys():
-            if key in text:
-                text = text.replace(key, random.choice(self.iconic_dict["yamin_dict"][key]))
-
-        return text
+        return self.yamin_replacer.replace(text, self.rng)
 
+    @batched
     def consonant_swap(self, text: str) -> str:
         """
         2-A. 자음, 모음
         """
         result = list(text)
         for i in range(len((text))):
-            if hgtk.checker.is_hangul(result[i]):
-                cho, jung, jong = hgtk.letter.decompose(result[i])
+            if jamo.is_hangul(result[i]):
+                cho, jung, jong = jamo.decompose(result[i])
                 if jung+jong in self.iconic_dict["vowel_dict"].keys():
-                    jung = random.choice(self.iconic_dict["vowel_dict"][jung+jong])
+                    jung = self.rng.choice(self.iconic_dict["vowel_dict"][jung+jong])
                     jong == ""
                 elif jong == "" and jung in self.iconic_dict["vowel_dict"].keys():
-                    jung = random.choice(self.iconic_dict["vowel_dict"][jung])
+                    jung = self.rng.choice(self.iconic_dict["vowel_dict"][jung])
                 elif jung not in ['ㅗ','ㅛ','ㅜ','ㅠ','ㅡ','ㅚ','ㅙ','ㅞ','ㅟ','ㅝ','ㅘ'] and jong == "" and cho in self.iconic_dict["consonant_dict"].keys():
-                    cho = random.choice(self.iconic_dict["consonant_dict"][cho])
+                    cho = self.rng.choice(self.iconic_dict["consonant_dict"][cho])
                 try:
-                    result[i] = hgtk.letter.compose(cho, jung, jong)
+                    result[i] = jamo.compose(cho, jung, jong)
                 except:
                     result[i] = cho + jung + jong
             else:
@@ -126,90 +237,243 @@ class IconicObfuscation:
 
         return "".join(result)
 
+    @batched
     def rotation_swap(self, text: str) -> str:
         """
         2-B. 90도 회전
         """
-        for key in self.iconic_dict["rotation_dict"].keys():
-            if key in text:
-                text = text.replace(key, random.choice(self.iconic_dict["rotation_dict"][key]))
-        return text
+        return self.rotation_replacer.replace(text, self.rng)
         
 
 ### 3. 표기법적 접근
 class TransliterationalObfuscation:
-    def __init__(self):
-        with open("./rules/transliterational_dictionary.json", "r") as f:
-            self.transliterational_dict = json.load(f)  
-            self.client = openai.OpenAI(api_key=API_KEY)     
-
-    def iconic_swap(self, text: str) -> str:
-        """
-        3-A. 음차
-        """
-        with open("./rules/latin_prompt.txt", "r") as file:
-            prompt = file.read()
-        
-        messages = [
+    def __init__(self, rng=None, llm_caches=None, offline=False, llm_client=None, batch_size=1, llm_counter=None,
+                 latin_backend="llm", foreign_backend="llm", foreign_model=None):
+        # rule 안에서 쓰는 난수 생성기. random.Random 또는 RuleRNG를 주입하며, 없으면 module-level random
+        self.rng = rng if rng is not None else random
+        resources = load_resources()
+        self.transliterational_dict = resources["transliterational"]
+        self.meaning_replacer = resources["meaning_replacer"]
+        if latin_backend not in LATIN_BACKENDS:
+            raise ValueError(f"unknown 8-1 backend {latin_backend!r}, expected one of {LATIN_BACKENDS}")
+        self.latin_backend = latin_backend
+        self.latin_transliterator = resources["latin_transliterator"]
+        if foreign_backend not in FOREIGN_BACKENDS:
+            raise ValueError(f"unknown 8-3 backend {foreign_backend!r}, expected one of {FOREIGN_BACKENDS}")
+        if foreign_backend == "model" and not foreign_model:
+            raise ValueError("8-3 model backend needs a checkpoint path (foreign_model)")
+        self.foreign_backend = foreign_backend
+        self.foreign_model = foreign_model
+        self._foreign_transliterator = None
+        self._client = None
+        # LLM 결과 cache. offline이면 cache miss에서 API를 부르지 않고 LLMCacheMiss를 낸다
+        self.llm_caches = llm_caches if llm_caches is not None else make_llm_caches()
+        self.offline = offline
+        self._requests = {name: functools.partial(self._request, name) for name in PROMPT_FILES}
+        # AsyncLLMClient를 주면 요청을 동시에 보낸다 (batch 경로). 없으면 client로 하나씩 보낸다
+        self.llm_client = llm_client
+        # batch 경로에서 한 요청에 담는 문장 수 (1이면 문장마다 요청)
+        self.batch_size = max(1, batch_size)
+        self.llm_counter = llm_counter if llm_counter is not None else LLMRequestCounter()
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = openai_client()
+        return self._client
+
+    @client.setter
+    def client(self, client):
+        self._client = client
+
+    @property
+    def foreign_transliterator(self):
+        if self._foreign_transliterator is None:
+            # torch는 model backend를 쓸 때만 import한다
+            from .char_seq2seq import CharTransliterator
+            self._foreign_transliterator = CharTransliterator(self.foreign_model)
+        return self._foreign_transliterator
+
+    @staticmethod
+    def _messages(name: str, text: str) -> list:
+        prompt, _ = load_prompt(name)
+        return [
             {"role": "system", "content": prompt}, 
             {"role": "user", "content": text}
             ]
-        
+
+    @staticmethod
+    def _batch_messages(name: str, texts: Sequence[str]) -> list:
+        # system prompt는 요청당 한 번만 보낸다
+        prompt, _ = load_prompt(name)
+        batch_prompt, _ = _read_prompt(BATCH_PROMPT_FILE)
+        items = [{"id": i, "input": text} for i, text in enumerate(texts)]
+        return [
+            {"role": "system", "content": f"{prompt}\n\n{batch_prompt}"},
+            {"role": "user", "content": json.dumps(items, ensure_ascii=False)}
+            ]
+
+    @staticmethod
+    def _parse(content: str) -> str:
+        try:
+            return json.loads(_strip_fence(content))["output"]
+        except Exception as e:
+            raise LLMResponseError(e) from e
+
+    def _create(self, messages):
         response = self.client.chat.completions.create(
-            model="gpt-4.1",
+            model=LLM_MODEL,
             messages=messages,
         )
-        
         try:
-            response = response.choices[0].message.content
-            response.replace("```json", "").replace("```", "")
-            response = json.loads(response)
+            return response.choices[0].message.content
         except Exception as e:
+            return LLMResponseError(e)
+
+    def _send(self, requests: List[list], items: int) -> list:
+        """
+        요청들을 보내고 입력 순서대로 응답 content 또는 예외를 돌려준다.
+        """
+        self.llm_counter.requests += len(requests)
+        self.llm_counter.items += items
+        if self.llm_client is not None:
+            return self.llm_client.complete_many(requests)
+        return [self._create(messages) for messages in requests]
+
+    def _request(self, name: str, text: str) -> str:
+        if self.offline:
+            raise LLMCacheMiss(name, [text])
+        content = self._send([self._messages(name, text)], 1)[0]
+        if isinstance(content, BaseException):
+            raise LLMResponseError(content) from content
+        return self._parse(content)
+
+    def _transliterate(self, name: str, text: str) -> str:
+        try:
+            return self.llm_caches[name](text, self._requests[name])
+        except LLMResponseError as e:
+            # 잘못된 응답은 cache에 남기지 않는다
             print(f"error: {e}")
             return text
-        
-        return response["output"]
 
+    def _request_many(self, name: str, texts: List[str]) -> Dict[str, object]:
+        """
+        문장들을 batch_size개씩 묶어 요청한다. 여러 문장 응답에서 검증에 실패한 문장은 한 문장씩 다시 보낸다.
+        문장 -> 출력 또는 예외.
+        """
+        groups = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        requests = [self._batch_messages(name, group) if len(group) > 1 else self._messages(name, group[0]) for group in groups]
+        results = {}
+        single = []
+        for group, content in zip(groups, self._send(requests, len(texts))):
+            if len(group) == 1:
+                results[group[0]] = content
+                continue
+            outputs = {} if isinstance(content, BaseException) else parse_batch_output(content, group)
+            for i, text in enumerate(group):
+                if i in outputs:
+                    results[text] = outputs[i]
+                else:
+                    single.append(text)
+        if single:
+            self.llm_counter.fallbacks += len(single)
+            # 이미 items로 센 문장이다
+            results.update(zip(single, self._send([self._messages(name, text) for text in single], 0)))
+        # 한 문장 응답은 여기서 {"output": ...}을 읽는다
+        for text in single + [group[0] for group in groups if len(group) == 1]:
+            content = results[text]
+            try:
+                if isinstance(content, BaseException):
+                    raise LLMResponseError(content) from content
+                results[text] = self._parse(content)
+            except LLMResponseError as e:
+                results[text] = e
+        return results
+
+    def prefetch(self, name: str, texts) -> Dict[str, str]:
+        """
+        cache에 없는 문장들을 한꺼번에 요청하고 {입력: 출력}을 돌려준다 (llm_client가 있으면 동시에, batch_size > 1이면 여러 문장씩).
+        잘못된 응답은 cache에 남기지 않고 결과에서도 뺀다.
+        """
+        cache = self.llm_caches[name]
+        outputs = {}
+        missing = []
+        for text in dict.fromkeys(texts):
+            value = cache.get(text)
+            if value is None:
+                missing.append(text)
+            else:
+                outputs[text] = value
+        if missing and self.offline:
+            raise LLMCacheMiss(name, missing)
+        if missing:
+            for text, output in self._request_many(name, missing).items():
+                if isinstance(output, BaseException):
+                    print(f"error: {output}")
+                else:
+                    outputs[text] = output
+                    cache.put(text, output)
+        return outputs
+
+    def _transliterate_many(self, name: str, texts):
+        """
+        prefetch와 같고, 잘못된 응답을 받은 문장은 _transliterate처럼 입력 문장을 그대로 돌려준다.
+        """
+        outputs = self.prefetch(name, texts)
+        return [outputs.get(text, text) for text in texts]
+
+    def _use_batch(self) -> bool:
+        # offline이면 batch 경로로 cache에 없는 입력을 한 번에 모두 알린다 (LLMCacheMiss.texts)
+        return self.llm_client is not None or self.batch_size > 1 or self.offline
+
+    @batched
+    def iconic_swap(self, text: str) -> str:
+        """
+        3-A. 음차
+        """
+        if self.latin_backend == "rule":
+            return self.latin_transliterator(text, self.rng)
+        return self._transliterate("latin", text)
+
+    @iconic_swap.vectorize(min_chars=0)
+    def iconic_swap(self, texts):
+        if self.latin_backend == "rule":
+            return self.latin_transliterator.transliterate_batch(texts, self.rng)
+        if not self._use_batch():
+            return [self._transliterate("latin", text) for text in texts]
+        return self._transliterate_many("latin", texts)
+
+    @batched
     def foreign_iconic_swap(self, text: str) -> str:
         """
         3-A. 외국어 음차
         """
-        with open("./rules/korean_prompt.txt", "r") as file:
-            prompt = file.read()
-        
-        messages = [
-            {"role": "system", "content": prompt}, 
-            {"role": "user", "content": text}
-            ]
-        response = self.client.chat.completions.create(
-            model="gpt-4.1",
-            messages=messages,
-        )
+        if self.foreign_backend == "model":
+            return self.foreign_transliterator(text)
+        return self._transliterate("korean", text)
 
-        try:
-            response = response.choices[0].message.content
-            response.replace("```json", "").replace("```", "")
-            response = json.loads(response)
-        except Exception as e:
-            print(f"error: {e}")
-            return text
-        
-        return response["output"]
+    @foreign_iconic_swap.vectorize(min_chars=0)
+    def foreign_iconic_swap(self, texts):
+        if self.foreign_backend == "model":
+            return self.foreign_transliterator.transliterate_batch(texts)
+        if not self._use_batch():
+            return [self._transliterate("korean", text) for text in texts]
+        return self._transliterate_many("korean", texts)
 
+    @batched
     def meaning_swap(self, text: str) -> str:
         """
         3-B. 표기 대치
         """     
-        for key in self.transliterational_dict["meaning_dict"].keys():
-            if key in text:
-                text = text.replace(key, random.choice(self.transliterational_dict["meaning_dict"][key]))
-        return text
+        return self.meaning_replacer.replace(text, self.rng)
 
 
 # 6. 화용접 접근
 # 6-A. 표현 추가
 class SymbolAddition:
-    def __init__(self):
+    def __init__(self, rng=None):
+        # rule 안에서 쓰는 난수 생성기. random.Random 또는 RuleRNG를 주입하며, 없으면 module-level random
+        self.rng = rng if rng is not None else random
         # 하트 관련 기호들
         self.hearts = ['♡', '♥', '♤', '♧']
         # 별과 기하학적 기호들
@@ -228,6 +492,8 @@ class SymbolAddition:
         self.decorations = ['━', '─', '┃', '┗', '┣', '┓', '┫', '┛', '┻', '┳']
         # 특수 문자들
         self.special = ['¸', 'º', '°', '˛', '˚', '¯', '´', '`', '¨', 'ˆ', '˜', '˙']
+        # comprehensive_symbol_addition의 pass들을 합친 한 번의 scan
+        self.inserter = SymbolInserter(self)
 
     def add_hearts(self, text: str, probability: float = 0.3) -> str:
         """
@@ -240,13 +506,13 @@ class SymbolAddition:
             result.append(word)
             
             # 단어 끝에 하트 추가
-            if random.random() < probability:
-                heart = random.choice(self.hearts)
+            if self.rng.random() < probability:
+                heart = self.rng.choice(self.hearts)
                 result.append(heart)
             
             # 문장 중간에 하트 추가
-            if random.random() < probability * 0.5:
-                heart = random.choice(self.hearts)
+            if self.rng.random() < probability * 0.5:
+                heart = self.rng.choice(self.hearts)
                 result.append(heart)
         
         return ' '.join(result)
@@ -260,15 +526,15 @@ class SymbolAddition:
         
         for word in words:
             # 단어 앞에 별 추가
-            if random.random() < probability:
-                star = random.choice(self.stars)
+            if self.rng.random() < probability:
+                star = self.rng.choice(self.stars)
                 result.append(star)
             
             result.append(word)
             
             # 단어 뒤에 별 추가
-            if random.random() < probability:
-                star = random.choice(self.stars)
+            if self.rng.random() < probability:
+                star = self.rng.choice(self.stars)
                 result.append(star)
         
         return ' '.join(result)
@@ -282,8 +548,8 @@ class SymbolAddition:
         
         for word in words:
             # 단어를 원형 기호로 감싸기
-            if random.random() < probability:
-                circle = random.choice(self.circles)
+            if self.rng.random() < probability:
+                circle = self.rng.choice(self.circles)
                 result.append(f"{circle}{word}{circle}")
             else:
                 result.append(word)
@@ -299,8 +565,8 @@ class SymbolAddition:
         
         for word in words:
             # 단어를 괄호로 감싸기
-            if random.random() < probability:
-                bracket_pair = random.choice([
+            if self.rng.random() < probability:
+                bracket_pair = self.rng.choice([
                     ('【', '】'), ('《', '》'), ('「', '」'), 
                     ('『', '』'), ('∥', '∥'), ('〃', '〃')
                 ])
@@ -317,23 +583,23 @@ class SymbolAddition:
         result = text
 
         # 문장 끝에 특수 구두점 추가
-        if random.random() < probability:
-            punct = random.choice(self.punctuation)
+        if self.rng.random() < probability:
+            punct = self.rng.choice(self.punctuation)
             result += punct
 
         # 문장 중간에 점점점 추가
-        if random.random() < probability * 0.7:
-            dots = random.choice(['‥', '…'])
+        if self.rng.random() < probability * 0.7:
+            dots = self.rng.choice(['‥', '…'])
             result = result.replace(' ', f' {dots} ', 1)
 
         # 단어 중간에 특수 구두점 추가
         words = result.split()
         new_words = []
         for word in words:
-            if len(word) > 1 and random.random() < probability:
+            if len(word) > 1 and self.rng.random() < probability:
                 # 단어 중간 위치 선택
-                insert_pos = random.randint(1, len(word)-1)
-                punct = random.choice(self.punctuation)
+                insert_pos = self.rng.randint(1, len(word)-1)
+                punct = self.rng.choice(self.punctuation)
                 # 단어 중간에 특수 구두점 삽입
                 new_word = word[:insert_pos] + punct + word[insert_pos:]
                 new_words.append(new_word)
@@ -356,8 +622,8 @@ class SymbolAddition:
             result.append(word)
             
             # 감정 기호 추가
-            if random.random() < probability:
-                emotion = random.choice(self.emotions)
+            if self.rng.random() < probability:
+                emotion = self.rng.choice(self.emotions)
                 result.append(emotion)
         
         return ' '.join(result)
@@ -369,8 +635,8 @@ class SymbolAddition:
         result = text
         
         # 문장 앞뒤에 장식 추가
-        if random.random() < probability:
-            decoration = random.choice(self.decorations)
+        if self.rng.random() < probability:
+            decoration = self.rng.choice(self.decorations)
             result = f"{decoration} {result} {decoration}"
         
         return result
@@ -384,10 +650,10 @@ class SymbolAddition:
         
         for word in words:
             # 단어에 특수 문자 추가
-            if random.random() < probability:
-                special = random.choice(self.special)
+            if self.rng.random() < probability:
+                special = self.rng.choice(self.special)
                 # 단어 중간이나 끝에 추가
-                if random.random() < 0.5:
+                if self.rng.random() < 0.5:
                     result.append(f"{word}{special}")
                 else:
                     result.append(f"{special}{word}")
@@ -396,27 +662,18 @@ class SymbolAddition:
         
         return ' '.join(result)
 
+    @batched
     def comprehensive_symbol_addition(self, text: str) -> str:
         """
         모든 종류의 기호를 종합적으로 추가하는 함수
+        add_hearts(0.2) -> add_stars(0.15) -> add_circles(0.1) -> add_brackets(0.15) -> add_punctuation(0.2)
+        -> add_emotions(0.1) -> add_decorations(0.05) -> add_special_chars(0.05)를 차례로 적용한 것과 같은 분포 (symbols.py)
         """
-        # 각 함수를 순차적으로 적용
-        result = text
-        
-        # 확률을 조절하여 너무 많은 기호가 추가되지 않도록 함
-        result = self.add_hearts(result, 0.2)
-        result = self.add_stars(result, 0.15)
-        result = self.add_circles(result, 0.1)
-        result = self.add_brackets(result, 0.15)
-        result = self.add_punctuation(result, 0.2)
-        result = self.add_emotions(result, 0.1)
-        result = self.add_decorations(result, 0.05)
-        result = self.add_special_chars(result, 0.05)
-        
-        # 연속된 공백 정리
-        result = ' '.join(result.split())
-        
-        return result
+        return self.inserter(text, self.rng)
+
+    @comprehensive_symbol_addition.vectorize(min_chars=0)
+    def comprehensive_symbol_addition(self, texts):
+        return self.inserter.insert_batch(texts, self.rng)
     
 if __name__ == "__main__":
     print("=== 한국어 증강 모듈 ===")
@@ -0,0 +1,94 @@
+"""
+Compact span store for the augmentation scheduler
+증강 과정에서 어절 상태를 저장하는 모듈
+
+A sentence is kept as its current surface words, one applied-rule bitmask per
+word, the offsets of each word in the joined sentence, and a flat edit log of
+(rule id, span index, offset). Intermediate versions of a word are not kept;
+the joined sentence is spliced on each step instead of being rebuilt.
+"""
+
+from array import array
+from typing import Dict, Sequence
+
+
+class SpanStore:
+    __slots__ = ("spans", "applied", "known", "mask", "offsets", "text", "log", "rule_names")
+
+    def __init__(self, text: str, rule_names: Sequence[str]):
+        self.spans = text.split()
+        n = len(self.spans)
+        # rule id bitmask: 적용된 rule / index 계산 완료 rule / 적용 가능한 rule
+        self.applied = array("Q", bytes(8 * n))
+        self.known = array("Q", bytes(8 * n))
+        self.mask = array("Q", bytes(8 * n))
+        self.offsets = array("l", bytes(array("l").itemsize * n))
+        offset = 0
+        for i, span in enumerate(self.spans):
+            self.offsets[i] = offset
+            offset += len(span) + 1
+        self.text = " ".join(self.spans)
+        # (rule id, span index, offset) 묶음을 이어 붙인 edit log
+        self.log = array("l")
+        self.rule_names = rule_names
+
+    def __len__(self):
+        return len(self.spans)
+
+    def applied_rules(self, i: int):
+        bits = self.applied[i]
+        return [name for k, name in enumerate(self.rule_names) if bits >> k & 1]
+
+    def unindexed(self) -> "SpanStore":
+        """
+        applicability index(known / mask)만 비운 복사본을 돌려준다. 어절과 적용된 rule은 그대로 둔다.
+        """
+        new = SpanStore.__new__(SpanStore)
+        new.spans = list(self.spans)
+        new.applied = array("Q", self.applied)
+        new.known = array("Q", bytes(8 * len(self.spans)))
+        new.mask = array("Q", bytes(8 * len(self.spans)))
+        new.offsets = array("l", self.offsets)
+        new.text = self.text
+        new.log = array("l", self.log)
+        new.rule_names = self.rule_names
+        return new
+
+    def apply(self, rule_id: int, edits: Dict[int, str]) -> "SpanStore":
+        """
+        edits({span index: new surface})를 적용한 새 store를 돌려준다. 원래 store는 그대로 남는다.
+        """
+        new = SpanStore.__new__(SpanStore)
+        new.spans = list(self.spans)
+        new.applied = array("Q", self.applied)
+        new.known = array("Q", self.known)
+        new.mask = array("Q", self.mask)
+        new.offsets = array("l", self.offsets)
+        new.log = array("l", self.log)
+        new.rule_names = self.rule_names
+
+        pieces = []
+        prev = 0
+        delta = 0
+        bit = 1 << rule_id
+        order = sorted(edits)
+        for k, i in enumerate(order):
+            old_span = self.spans[i]
+            start = self.offsets[i]
+            pieces.append(self.text[prev:start])
+            pieces.append(edits[i])
+            prev = start + len(old_span)
+
+            new.spans[i] = edits[i]
+            new.applied[i] |= bit
+            new.known[i] = 0
+            new.mask[i] = 0
+            new.log.extend((rule_id, i, start + delta))
+            delta += len(edits[i]) - len(old_span)
+            # 다음 edit 어절까지 offset 이동
+            stop = order[k + 1] + 1 if k + 1 < len(order) else len(self.spans)
+            for j in range(i + 1, stop):
+                new.offsets[j] += delta
+        pieces.append(self.text[prev:])
+        new.text = "".join(pieces)
+        return new
@@ -0,0 +1,90 @@
+"""
+Augmentation run statistics
+증강 scheduler 계측 모듈
+
+Cheap counters collected by Augmentation while it runs:
+- per rule: attempts, successful applications, spans rejected by
+  _is_possible, attempts rejected because too few spans changed
+  (_select_span / _is_feasible) and wall time spent inside the rule;
+- per sentence: rule draws (loops), backtracks (the sampler's restarts) and
+  whether the draw cap was hit;
+- per cache (e.g. G2P): hits, disk hits and misses, and the number of LLM
+  requests, sentences sent and single-sentence fallbacks.
+Worker processes return their stats with each row and the main process merges them.
+"""
+
+import json
+from array import array
+
+
+RULE_COUNTERS = ("attempts", "applied", "rejected_possible", "rejected_select", "time_sec")
+
+
+class AugmentationStats:
+    def __init__(self):
+        self.rules = {}
+        self.draws = array("l")
+        self.backtracks = array("l")
+        self.capped_rows = []
+        self.caches = {}
+
+    def rule(self, rule: str) -> dict:
+        counters = self.rules.get(rule)
+        if counters is None:
+            counters = self.rules[rule] = dict.fromkeys(RULE_COUNTERS, 0)
+        return counters
+
+    def add_sentence(self, index, draws: int, backtracks: int, capped: bool):
+        self.draws.append(draws)
+        self.backtracks.append(backtracks)
+        if capped:
+            self.capped_rows.append(index)
+
+    def add_cache(self, name: str, before: dict, after: dict):
+        """
+        cache counter의 before -> after 증가분을 더한다.
+        """
+        counters = self.caches.setdefault(name, dict.fromkeys(after, 0))
+        for key, value in after.items():
+            counters[key] += value - before.get(key, 0)
+
+    def merge(self, other: "AugmentationStats"):
+        for rule, counters in other.rules.items():
+            mine = self.rule(rule)
+            for key in RULE_COUNTERS:
+                mine[key] += counters[key]
+        self.draws.extend(other.draws)
+        self.backtracks.extend(other.backtracks)
+        self.capped_rows.extend(other.capped_rows)
+        for name, counters in other.caches.items():
+            self.add_cache(name, {}, counters)
+
+    @staticmethod
+    def _summary(values):
+        if not values:
+            return {"mean": None, "p50": None, "p95": None, "max": None}
+        ordered = sorted(values)
+        return {
+            "mean": sum(ordered) / len(ordered),
+            "p50": ordered[len(ordered) // 2],
+            "p95": ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))],
+            "max": ordered[-1],
+        }
+
+    def to_dict(self) -> dict:
+        return {
+            "rules": {rule: dict(counters) for rule, counters in sorted(self.rules.items(), key=lambda x: -x[1]["time_sec"])},
+            "sentences": {
+                "count": len(self.draws),
+                "draws": self._summary(self.draws),
+                "backtracks": self._summary(self.backtracks),
+                "total_backtracks": sum(self.backtracks),
+                "cap_hits": len(self.capped_rows),
+                "capped_rows": self.capped_rows,
+            },
+            "caches": {name: dict(counters) for name, counters in self.caches.items()},
+        }
+
+    def dump(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
@@ -0,0 +1,335 @@
+"""
+Fused symbol insertion for rule 13-2
+기호 추가 (13-2)의 여러 pass를 한 번의 scan으로 합친 모듈
+
+SymbolAddition.comprehensive_symbol_addition used to run eight passes (hearts,
+stars, circles, brackets, punctuation, emotions, decorations, special
+characters). Each pass split the text, drew rng.random() per word and joined
+it again, and each later pass also saw the symbols that earlier passes had
+inserted. SymbolInserter tokenizes once and follows the same token tree
+word by word:
+- a word may be followed by up to two hearts, and each of these tokens may
+  get a star before and after it (up to 9 token slots per word);
+- every token may be wrapped in a circle, then in a bracket pair;
+- the sentence may get a punctuation mark appended to its last token and '‥'
+  or '…' after its first token;
+- every token of length > 1 may get a punctuation mark inserted inside it;
+- every token may be followed by an emotion;
+- the sentence may be wrapped in decorations;
+- every token may get a special character before or after it.
+Each decision has a fixed place in one array of uniforms: 53 per word and 9
+per sentence, drawn with rng.uniforms for a whole batch at once. A roll and
+what follows from it share one uniform: when u < p, x = u / p * n picks one
+of n symbols and the fraction of x is again uniform, for the next choice
+(the side of a special character, the special character of an emotion, the
+punctuation mark after its position). The probabilities and the token
+interactions are the same as in the passes, so the outputs follow the same
+distribution. They are not identical draw for draw, because the passes
+consumed a data-dependent number of draws in a different order. A batch
+gives the same outputs as calling the inserter on each text in turn with the
+same rng.
+"""
+
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+BRACKET_PAIRS = (('【', '】'), ('《', '》'), ('「', '」'), ('『', '』'), ('∥', '∥'), ('〃', '〃'))
+DOTS = ('‥', '…')
+
+# 어절 하나가 만들 수 있는 token: heart 자리 3개 (어절 자신, heart 2개) x 위치 3개 (앞 별, 본체, 뒤 별)
+_HEART_SLOTS = 3
+_BEFORE, _MAIN, _AFTER = range(3)
+_POSITIONS = 3
+_TOKEN_SLOTS = _HEART_SLOTS * _POSITIONS
+# token slot k = _POSITIONS x heart 자리 h + 위치. 항상 있는 어절 자신의 본체 slot
+_WORD_SLOT = _MAIN
+# token slot 하나의 uniforms: circle, bracket, 구두점 (위치 -> 기호), 감정 기호 (-> special -> 앞/뒤), special (-> 앞/뒤)
+_CIRCLE, _BRACKET, _PUNCT, _EMOTION, _SPECIAL = range(5)
+_SLOT_WIDTH = 5
+
+# 어절마다의 uniforms 배치: heart 2개, heart 자리마다 (앞 별, 뒤 별), 어절 자신의 slot, 나머지 token slot
+_HEARTS = 0
+_STARS = _HEARTS + 2
+_STAR_SIDES = 2
+_BODY = _STARS + _STAR_SIDES * _HEART_SLOTS
+_OPTIONAL = _BODY + _SLOT_WIDTH
+# token slot마다 uniforms 시작 위치. 어절 자신은 _BODY, 나머지는 slot 순서대로 _OPTIONAL부터
+_SLOT_AT = tuple(_BODY if k == _WORD_SLOT else _OPTIONAL + (k - (k > _WORD_SLOT)) * _SLOT_WIDTH for k in range(_TOKEN_SLOTS))
+WORD_DRAWS = _OPTIONAL + (_TOKEN_SLOTS - 1) * _SLOT_WIDTH
+
+# 문장 단위 token (점점점, 빈 문장의 구두점) 하나의 uniforms: 뒤에 붙는 감정 기호, token의 special
+_TOKEN_EMOTION, _TOKEN_SPECIAL = range(2)
+_SENTENCE_TOKEN_WIDTH = 2
+# 문장마다의 uniforms 배치: 끝 구두점, 점점점, 점점점 token, 빈 문장의 구두점 token, 장식, 양쪽 장식의 special
+_END = 0
+_DOTS = _END + 1
+_DOTS_TOKEN = _DOTS + 1
+_EMPTY_TOKEN = _DOTS_TOKEN + _SENTENCE_TOKEN_WIDTH
+_DECORATION = _EMPTY_TOKEN + _SENTENCE_TOKEN_WIDTH
+_DECORATION_SPECIAL = _DECORATION + 1
+_LEFT, _RIGHT = range(2)
+SENTENCE_DRAWS = _DECORATION_SPECIAL + 2
+
+# 선택 뒤 남는 uniform(_split의 소수 부분)이 이보다 작으면 special을 token 앞에 붙인다
+_FRONT = 0.5
+# 이보다 어절이 적은 batch는 NumPy 변환 비용이 더 커서 어절 단위 loop를 쓴다 (결과는 같다)
+VECTORIZE_MIN_WORDS = 48
+
+# token 하나의 (구두점 위치 uniform 또는 -1, 감정 기호, 감정 기호 special, 그 앞 여부, special, 앞 여부)
+Extras = Optional[Tuple[float, int, int, bool, int, bool]]
+
+
+def _uniforms(rng, n: int) -> np.ndarray:
+    if hasattr(rng, "uniforms"):
+        return rng.uniforms(n)
+    # random.Random / random module
+    return np.array([rng.random() for _ in range(n)])
+
+
+def _pick(u: float, p: float, n: int) -> int:
+    """
+    u < p이면 x = u / p * n으로 고른 index, 아니면 -1.
+    """
+    if u >= p:
+        return -1
+    return min(int(u / p * n), n - 1)
+
+
+def _split(u: float, p: float, n: int) -> Tuple[int, float]:
+    """
+    _pick과 같은 index와 x의 소수 부분 (다음 선택에 쓰는 uniform).
+    """
+    if u >= p:
+        return -1, 0.0
+    x = u / p * n
+    i = min(int(x), n - 1)
+    return i, x - i
+
+
+def _picks(u: np.ndarray, p: float, n: int) -> np.ndarray:
+    # _pick의 vectorized 판
+    return np.where(u < p, np.minimum((u / p * n).astype(np.int64), n - 1), -1)
+
+
+def _splits(u: np.ndarray, p: float, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    # _split의 vectorized 판
+    x = u / p * n
+    i = np.minimum(x.astype(np.int64), n - 1)
+    return np.where(u < p, i, -1), np.where(u < p, x - i, 0.0)
+
+
+class SymbolInserter:
+    def __init__(self, tables, hearts: float = 0.2, stars: float = 0.15, circles: float = 0.1, brackets: float = 0.15,
+                 punctuation: float = 0.2, emotions: float = 0.1, decorations: float = 0.05, special: float = 0.05):
+        """
+        tables: hearts, stars, circles, punctuation, emotions, decorations, special 기호 목록을 가진 객체 (SymbolAddition)
+        나머지 인자는 comprehensive_symbol_addition이 각 pass에 주던 확률.
+        """
+        self.hearts = list(tables.hearts)
+        self.stars = list(tables.stars)
+        self.circles = list(tables.circles)
+        self.punctuation = list(tables.punctuation)
+        self.emotions = list(tables.emotions)
+        self.decorations = list(tables.decorations)
+        self.special = list(tables.special)
+        self.p_hearts = hearts
+        self.p_stars = stars
+        self.p_circles = circles
+        self.p_brackets = brackets
+        self.p_punctuation = punctuation
+        self.p_emotions = emotions
+        self.p_decorations = decorations
+        self.p_special = special
+
+    def _special(self, token: str, choice: int, before: bool) -> str:
+        if choice < 0:
+            return token
+        return self.special[choice] + token if before else token + self.special[choice]
+
+    def _sentence_special(self, token: str, u: float) -> str:
+        choice, rest = _split(u, self.p_special, len(self.special))
+        return self._special(token, choice, rest < _FRONT)
+
+    def _sentence_token(self, out: List[str], token: str, g: List[float], at: int):
+        """
+        문장 단위 token (점점점, 빈 문장의 구두점)과 뒤에 붙을 수 있는 감정 기호. at: g 안에서 이 token의 uniforms 시작 위치.
+        """
+        out.append(self._sentence_special(token, g[at + _TOKEN_SPECIAL]))
+        emotion, rest = _split(g[at + _TOKEN_EMOTION], self.p_emotions, len(self.emotions))
+        if emotion >= 0:
+            out.append(self._sentence_special(self.emotions[emotion], rest))
+
+    def _token(self, word: str, position: int, symbol: int, circle: int, bracket: int) -> str:
+        # position: _BEFORE 앞 별, _MAIN 본체 (어절 또는 heart), _AFTER 뒤 별
+        if position == _MAIN:
+            token = word if symbol < 0 else self.hearts[symbol]
+        else:
+            token = self.stars[symbol]
+        if circle >= 0:
+            circle_char = self.circles[circle]
+            token = f"{circle_char}{token}{circle_char}"
+        if bracket >= 0:
+            left, right = BRACKET_PAIRS[bracket]
+            token = f"{left}{token}{right}"
+        return token
+
+    def _extras(self, punct: float, emotion: float, special: float) -> Extras:
+        """
+        token 하나의 구두점 / 감정 기호 / special 결정. 아무것도 붙지 않으면 None.
+        """
+        if punct >= self.p_punctuation and emotion >= self.p_emotions and special >= self.p_special:
+            return None
+        n_special = len(self.special)
+        emotion, rest = _split(emotion, self.p_emotions, len(self.emotions))
+        emotion_special, emotion_rest = _split(rest, self.p_special, n_special) if emotion >= 0 else (-1, 0.0)
+        special, special_rest = _split(special, self.p_special, n_special)
+        return (punct / self.p_punctuation if punct < self.p_punctuation else -1.0,
+                emotion, emotion_special, emotion_rest < _FRONT, special, special_rest < _FRONT)
+
+    def _sentence_tokens(self, words: Sequence[str], u: np.ndarray) -> Tuple[List[str], List[Extras]]:
+        """
+        _word_tokens와 같은 결과를 어절 단위 loop로 계산한다 (한 문장). u: (어절 수, WORD_DRAWS).
+        어절 자신의 slot까지만 list로 바꾸고, 나머지 slot은 token이 있을 때만 꺼낸다.
+        """
+        tokens, extras = [], []
+        n_hearts, n_stars = len(self.hearts), len(self.stars)
+        p_hearts, p_stars, p_circles, p_brackets = self.p_hearts, self.p_stars, self.p_circles, self.p_brackets
+        for w, (word, head) in enumerate(zip(words, u[:, :_OPTIONAL].tolist())):
+            hearts = (-1, _pick(head[_HEARTS], p_hearts, n_hearts), _pick(head[_HEARTS + 1], p_hearts * 0.5, n_hearts))
+            for h, heart in enumerate(hearts):
+                if h and heart < 0:
+                    continue
+                star = _STARS + _STAR_SIDES * h
+                stars = (_pick(head[star], p_stars, n_stars), heart, _pick(head[star + 1], p_stars, n_stars))
+                for position, symbol in enumerate(stars):
+                    if position != _MAIN and symbol < 0:
+                        continue
+                    at = _SLOT_AT[_POSITIONS * h + position]
+                    circle, bracket, punct, emotion, special = head[at:] if at == _BODY else u[w, at:at + _SLOT_WIDTH].tolist()
+                    if symbol < 0 and circle >= p_circles and bracket >= p_brackets:
+                        # 기호 없이 남는 어절 (대부분)
+                        tokens.append(word)
+                    else:
+                        tokens.append(self._token(word, position, symbol, _pick(circle, p_circles, len(self.circles)),
+                                                  _pick(bracket, p_brackets, len(BRACKET_PAIRS))))
+                    extras.append(self._extras(punct, emotion, special))
+        return tokens, extras
+
+    def _word_tokens(self, words: Sequence[str], u: np.ndarray) -> Tuple[np.ndarray, List[str], List[Extras]]:
+        """
+        모든 어절의 token slot을 한 번에 정한다. u: (어절 수, WORD_DRAWS). 반환: (token마다 어절 index, token, _extras의 결과).
+        """
+        n = len(words)
+        heart_symbol = np.stack([_picks(u[:, _HEARTS], self.p_hearts, len(self.hearts)),
+                                 _picks(u[:, _HEARTS + 1], self.p_hearts * 0.5, len(self.hearts))], axis=1)
+        heart = np.concatenate([np.ones((n, 1), dtype=bool), heart_symbol >= 0], axis=1)
+
+        star_symbol = _picks(u[:, _STARS:_BODY].reshape(n, _HEART_SLOTS, _STAR_SIDES), self.p_stars, len(self.stars))
+        # slot (heart h, 앞 별 / 본체 / 뒤 별) 순서 = pass들이 만들던 token 순서
+        present = np.stack([heart & (star_symbol[:, :, 0] >= 0), heart, heart & (star_symbol[:, :, 1] >= 0)], axis=2).reshape(-1)
+        # 본체가 아닌 slot의 기호: heart 또는 star index
+        symbol = np.stack([star_symbol[:, :, 0], np.concatenate([np.full((n, 1), -1), heart_symbol], axis=1), star_symbol[:, :, 1]],
+                          axis=2).reshape(-1)
+
+        index = np.flatnonzero(present)
+        word_index = index // _TOKEN_SLOTS
+        slot_u = u[word_index[:, None], np.array(_SLOT_AT)[index % _TOKEN_SLOTS][:, None] + np.arange(_SLOT_WIDTH)]
+
+        tokens = [self._token(words[w], position, sym, circle, bracket)
+                  for w, position, sym, circle, bracket in zip(word_index.tolist(), (index % _POSITIONS).tolist(), symbol[index].tolist(),
+                                                               _picks(slot_u[:, _CIRCLE], self.p_circles, len(self.circles)).tolist(),
+                                                               _picks(slot_u[:, _BRACKET], self.p_brackets, len(BRACKET_PAIRS)).tolist())]
+
+        # 구두점 / 감정 기호 / special이 붙는 token만 골라 계산한다
+        extras = [None] * len(tokens)
+        decorated = np.flatnonzero((slot_u[:, _PUNCT] < self.p_punctuation) | (slot_u[:, _EMOTION] < self.p_emotions)
+                                   | (slot_u[:, _SPECIAL] < self.p_special))
+        rows = slot_u[decorated]
+        n_special = len(self.special)
+        punct = rows[:, _PUNCT]
+        emotion, rest = _splits(rows[:, _EMOTION], self.p_emotions, len(self.emotions))
+        emotion_special, emotion_rest = _splits(rest, self.p_special, n_special)
+        special, special_rest = _splits(rows[:, _SPECIAL], self.p_special, n_special)
+        for i, *extra in zip(decorated.tolist(),
+                             np.where(punct < self.p_punctuation, punct / self.p_punctuation, -1.0).tolist(),
+                             emotion.tolist(),
+                             np.where(emotion >= 0, emotion_special, -1).tolist(),
+                             (np.where(emotion >= 0, emotion_rest, 0.0) < _FRONT).tolist(),
+                             special.tolist(),
+                             (special_rest < _FRONT).tolist()):
+            extras[i] = tuple(extra)
+        return word_index, tokens, extras
+
+    def _assemble(self, tokens: List[str], extras: List[Extras], g: List[float]) -> str:
+        """
+        한 문장의 token에 문장 단위 결정(g)과 token 단위 구두점 / 감정 기호 / special을 적용한다.
+        """
+        # 문장 끝 구두점은 마지막 token에 붙는다 (token 안 구두점보다 먼저)
+        end = _pick(g[_END], self.p_punctuation, len(self.punctuation))
+        if end >= 0 and tokens:
+            tokens[-1] += self.punctuation[end]
+
+        out = []
+        if not tokens and end >= 0:
+            # 빈 문장에 붙은 구두점 token
+            self._sentence_token(out, self.punctuation[end], g, _EMPTY_TOKEN)
+        dots = _pick(g[_DOTS], self.p_punctuation * 0.7, len(DOTS)) if len(tokens) > 1 else -1
+        for i, (token, extra) in enumerate(zip(tokens, extras)):
+            if extra is None:
+                out.append(token)
+            else:
+                punct, emotion, emotion_special, emotion_before, special, before = extra
+                # 두 글자 이상인 token의 1 ~ len-1 위치에 구두점을 넣는다
+                if punct >= 0 and len(token) > 1:
+                    x = punct * (len(token) - 1)
+                    position = min(int(x), len(token) - 2)
+                    # 위치를 고르고 남은 소수 부분으로 구두점을 고른다
+                    mark = self.punctuation[min(int((x - int(x)) * len(self.punctuation)), len(self.punctuation) - 1)]
+                    token = token[:position + 1] + mark + token[position + 1:]
+                out.append(self._special(token, special, before))
+                if emotion >= 0:
+                    out.append(self._special(self.emotions[emotion], emotion_special, emotion_before))
+            if i == 0 and dots >= 0:
+                self._sentence_token(out, DOTS[dots], g, _DOTS_TOKEN)
+
+        decoration = _pick(g[_DECORATION], self.p_decorations, len(self.decorations))
+        if decoration >= 0:
+            out.insert(0, self._sentence_special(self.decorations[decoration], g[_DECORATION_SPECIAL + _LEFT]))
+            out.append(self._sentence_special(self.decorations[decoration], g[_DECORATION_SPECIAL + _RIGHT]))
+        return " ".join(out)
+
+    def insert_batch(self, texts: Sequence[str], rng) -> List[str]:
+        """
+        모든 문장의 uniforms를 한 번에 뽑고 모든 어절의 결정을 한 번에 계산한다.
+        uniforms는 문장마다 (어절 수 x WORD_DRAWS, SENTENCE_DRAWS) 순서로 쓰므로 문장마다 __call__을 부른 것과 같은 결과.
+        """
+        if not texts:
+            return []
+        sentences = [text.split() for text in texts]
+        counts = [len(sentence) for sentence in sentences]
+        u = _uniforms(rng, sum(counts) * WORD_DRAWS + len(sentences) * SENTENCE_DRAWS)
+        if sum(counts) < VECTORIZE_MIN_WORDS:
+            outputs, o = [], 0
+            for sentence, n in zip(sentences, counts):
+                stop = o + n * WORD_DRAWS
+                tokens, extras = self._sentence_tokens(sentence, u[o:stop].reshape(n, WORD_DRAWS))
+                outputs.append(self._assemble(tokens, extras, u[stop:stop + SENTENCE_DRAWS].tolist()))
+                o = stop + SENTENCE_DRAWS
+            return outputs
+
+        # 문장 단위 uniforms를 빼면 어절 단위 uniforms가 순서대로 남는다
+        sizes = np.array(counts) * WORD_DRAWS + SENTENCE_DRAWS
+        sentence_at = (np.cumsum(sizes) - SENTENCE_DRAWS)[:, None] + np.arange(SENTENCE_DRAWS)
+        is_word = np.ones(len(u), dtype=bool)
+        is_word[sentence_at] = False
+        words = [word for sentence in sentences for word in sentence]
+        word_index, tokens, extras = self._word_tokens(words, u[is_word].reshape(len(words), WORD_DRAWS))
+        # 문장마다의 token 범위
+        owner = np.repeat(np.arange(len(sentences)), counts)
+        bounds = np.concatenate(([0], np.cumsum(np.bincount(owner[word_index], minlength=len(sentences))))).tolist()
+        return [self._assemble(tokens[bounds[i]:bounds[i + 1]], extras[bounds[i]:bounds[i + 1]], g)
+                for i, g in enumerate(u[sentence_at].tolist())]
+
+    def __call__(self, text: str, rng) -> str:
+        return self.insert_batch([text], rng)[0]
@@ -0,0 +1,205 @@
+"""
+Syllable-boundary transducer for context-dependent jamo rules
+음절 경계 규칙 (연음, 역연음, 초성 추가, 받침 추가)을 한 번의 scan으로 적용하는 모듈
+
+Each rule looks at one boundary between two adjacent characters and may
+rewrite the final consonant (jong) of the left character and/or the initial
+consonant (cho) of the right one. A rule sees each side as a triple
+(cho, jong, syllable): syllable is True for a full syllable (cho and jung
+present), and a non-Hangul character is ('', '', False). Rules always read the
+original characters. With consume=True, a right character changed by a rule
+is not used as the left side of the next boundary (greedy left-to-right
+pairing, as in 연음). The string path runs in one left-to-right pass. The
+batch path does the same over code point arrays. A boundary is encoded as one
+integer key, and the rule's answer for each key is kept in two lookup arrays
+(2.5 MB per transducer, allocated on the first batch). The rule is only called
+for keys not seen before, so a warm batch is pure NumPy gathers, and greedy
+pairs are selected with NumPy. Below TRANSDUCER_MIN_CHARS the fixed cost of
+the array work is still larger than the string loop, so rules built on a
+transducer register their batch path with that threshold.
+"""
+
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from . import jamo
+from .vectorized import _join, _split
+
+Side = Tuple[str, str, bool]
+Step = Optional[Tuple[Optional[str], Optional[str]]]
+
+_NOT_HANGUL = ('', '', '')
+# side 특징 (cho index + 1, jong index, syllable)의 개수
+_SIDE_KEYS = (jamo.NUM_CHO + 1) * jamo.NUM_JONG * 2
+# lookup 표 값: 아직 계산하지 않은 경계 / 규칙이 맞지 않음 / 규칙이 맞았지만 그 쪽은 그대로
+_UNKNOWN, _NO_STEP, _KEEP = -3, -1, -2
+# run_batch가 글자 단위 loop보다 빨라지는 batch 글자 수 (실제 pair 기준 측정에서 약 200자)
+TRANSDUCER_MIN_CHARS = 256
+
+
+class BoundaryTransducer:
+    def __init__(self, rule: Callable[[Side, Side], Step], consume: bool):
+        """
+        rule(left, right) -> (새 left jong, 새 right cho) (None은 그대로) 또는 규칙이 맞지 않으면 None
+        """
+        self.rule = rule
+        self.consume = consume
+        # 경계 key -> 새 jong / cho index (run_batch에서 처음 쓸 때 만든다)
+        self._jong_table = None
+        self._cho_table = None
+
+    def __call__(self, text: str) -> str:
+        rule = self.rule
+        get = jamo.DECOMPOSE.get
+        compose = jamo.compose
+        out = []
+        # 아직 내보내지 않은 왼쪽 글자: 출력 글자, (바뀌었을 수 있는) cho / jong, jung, 원래 side
+        pending = None
+        for char in text:
+            cho, jung, jong = get(char, _NOT_HANGUL)
+            side = (cho, jong, cho != '' and jung != '')
+            if pending is not None:
+                p_char, p_cho, p_jung, p_jong, p_side = pending
+                step = rule(p_side, side)
+                if step is not None:
+                    new_jong, new_cho = step
+                    if new_jong is not None:
+                        p_char = compose(p_cho, p_jung, new_jong)
+                    if new_cho is not None:
+                        cho = new_cho
+                        char = compose(cho, jung, jong)
+                    if self.consume:
+                        out.append(p_char)
+                        out.append(char)
+                        pending = None
+                        continue
+                out.append(p_char)
+            pending = (char, cho, jung, jong, side)
+        if pending is not None:
+            out.append(pending[0])
+        return ''.join(out)
+
+    def run_batch(self, texts: Sequence[str]) -> List[str]:
+        """
+        texts 각각에 __call__을 적용한 것과 같은 결과를 code point 배열 위에서 계산한다.
+        """
+        if not texts:
+            return []
+        codes, lengths = _join(texts)
+        cho, jung, jong = jamo.decompose_codes(codes)
+        n = len(codes)
+        if n < 2:
+            return list(texts)
+
+        syllable = (cho >= 0) & (jung >= 0)
+        feature = ((cho + 1) * jamo.NUM_JONG + np.maximum(jong, 0)) * 2 + syllable
+        key = feature[:-1] * _SIDE_KEYS + feature[1:]
+        # text 경계를 넘는 쌍은 제외
+        inside = np.ones(n - 1, dtype=bool)
+        ends = np.cumsum(lengths)[:-1]
+        inside[ends[(ends > 0) & (ends < n)] - 1] = False
+
+        jong_step, cho_step = self._lookup(key)
+        fire = inside & ((jong_step != _NO_STEP) | (cho_step != _NO_STEP))
+
+        if self.consume:
+            # 연속으로 맞는 경계에서는 왼쪽부터 하나 건너 하나씩 적용된다
+            positions = np.arange(n - 1)
+            start = fire & ~np.concatenate(([False], fire[:-1]))
+            run_start = np.maximum.accumulate(np.where(start, positions, 0))
+            fire &= (positions - run_start) % 2 == 0
+
+        left = np.flatnonzero(fire & (jong_step >= 0))
+        right = np.flatnonzero(fire & (cho_step >= 0)) + 1
+        jong = jong.copy()
+        cho = cho.copy()
+        jong[left] = jong_step[left]
+        cho[right] = cho_step[right - 1]
+        changed = np.union1d(left, right)
+        codes = codes.copy()
+        codes[changed] = jamo.compose_codes(cho[changed], jung[changed], jong[changed])
+        return _split(codes, lengths)
+
+    def _lookup(self, key: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        경계 key마다 (새 jong index, 새 cho index). 처음 보는 key만 rule을 불러 표에 채운다.
+        규칙이 맞지 않으면 _NO_STEP, 맞았지만 바꾸는 부분이 없으면 _KEEP (consume 판정에는 포함).
+        """
+        if self._jong_table is None:
+            self._jong_table = np.full(_SIDE_KEYS * _SIDE_KEYS, _UNKNOWN, dtype=np.int8)
+            self._cho_table = np.full(_SIDE_KEYS * _SIDE_KEYS, _UNKNOWN, dtype=np.int8)
+        jong_step = self._jong_table[key]
+        unknown = jong_step == _UNKNOWN
+        if unknown.any():
+            for value in np.unique(key[unknown]).tolist():
+                step = self.rule(_decode_side(value // _SIDE_KEYS), _decode_side(value % _SIDE_KEYS))
+                if step is None:
+                    self._jong_table[value] = self._cho_table[value] = _NO_STEP
+                    continue
+                self._jong_table[value] = jamo.JONG_INDEX[step[0]] if step[0] is not None else _KEEP
+                self._cho_table[value] = jamo.CHO_INDEX[step[1]] if step[1] is not None else _KEEP
+            jong_step = self._jong_table[key]
+        return jong_step.astype(np.int64), self._cho_table[key].astype(np.int64)
+
+
+def _decode_side(feature: int) -> Side:
+    syllable = bool(feature % 2)
+    feature //= 2
+    cho = feature // jamo.NUM_JONG - 1
+    return (jamo.CHO[cho] if cho >= 0 else '', jamo.JONG[feature % jamo.NUM_JONG], syllable)
+
+
+def _split_pairs(mapping: Dict[str, str]) -> Dict[Tuple[str, str], Tuple[str, str]]:
+    # "앞ᴥ뒤" -> "새 앞ᴥ새 뒤" 형식의 replace.json 표를 tuple 표로
+    return {tuple(key.split('ᴥ')): tuple(value.split('ᴥ')) for key, value in mapping.items()}
+
+
+def continue_sound_rule(continue_sound_map: Dict[str, str]):
+    """
+    연음: 받침이 있는 음절 + 음절에서 (받침, 다음 초성)이 표에 있으면 받침을 다음 초성으로 넘긴다.
+    """
+    table = _split_pairs(continue_sound_map)
+
+    def rule(left: Side, right: Side) -> Step:
+        if left[2] and right[2] and left[1]:
+            return table.get((left[1], right[0]))
+        return None
+    return rule
+
+
+def reverse_continue_sound_rule(with_batchim_map: Dict[str, str], without_batchim_map: Dict[str, str]):
+    """
+    역연음: 두 음절의 (초성, 다음 초성)을 왼쪽 음절의 받침 유무에 따라 다른 표에서 찾는다.
+    """
+    with_batchim = _split_pairs(with_batchim_map)
+    without_batchim = _split_pairs(without_batchim_map)
+
+    def rule(left: Side, right: Side) -> Step:
+        if left[2] and right[2]:
+            table = with_batchim if left[1] else without_batchim
+            return table.get((left[0], right[0]))
+        return None
+    return rule
+
+
+def initial_consonant_rule(final_to_initial: Dict[str, str]):
+    """
+    초성 추가: 'ㅇ'으로 시작하는 음절의 초성을 앞 글자(자모 포함) 받침에서 가져온다.
+    """
+    def rule(left: Side, right: Side) -> Step:
+        if right[2] and right[0] == 'ㅇ' and left[1] in final_to_initial:
+            return None, final_to_initial[left[1]]
+        return None
+    return rule
+
+
+def adaptive_final_consonant_rule(initial_to_final: Dict[str, str]):
+    """
+    받침 추가: 받침 없는 음절에 다음 글자(자모 포함) 초성에 맞는 받침을 붙인다.
+    """
+    def rule(left: Side, right: Side) -> Step:
+        if left[2] and not left[1] and right[0] in initial_to_final:
+            return initial_to_final[right[0]], None
+        return None
+    return rule
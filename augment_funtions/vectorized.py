@@ -0,0 +1,105 @@
+"""
+Vectorized character-level replacement rules
+음절 단위 대치 규칙의 NumPy 구현
+
+Rules that decompose every syllable, optionally pick a replacement jamo from a
+map and recompose it (1-1, 1-3, 1-4, 2-1 and the random-final fallback of 2-2) are applied to a whole batch at
+once: the texts are joined into one code point array, split into cho/jung/jong
+index arrays, mapped through lookup tables and recomposed in one pass.
+
+Random draws come from RuleRNG.uniforms in text order, one uniform wherever the
+per-character code calls rng.choice / rng.random. With the same RuleRNG
+the output is therefore identical to calling the rule on each text in turn.
+"""
+
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from . import jamo
+
+
+class ComponentTable:
+    """
+    jamo index -> 후보 jamo index 표. 후보가 없는 index는 count 0.
+    """
+    __slots__ = ("count", "choices")
+
+    def __init__(self, mapping: Dict[str, Sequence[str]], index: Dict[str, int]):
+        width = max((len(targets) for targets in mapping.values()), default=1)
+        self.count = np.zeros(len(index), dtype=np.int64)
+        self.choices = np.zeros((len(index), width), dtype=np.int64)
+        for source, targets in mapping.items():
+            if source not in index:
+                continue
+            self.count[index[source]] = len(targets)
+            self.choices[index[source], :len(targets)] = [index[t] for t in targets]
+
+    def draw(self, source: np.ndarray, u: np.ndarray) -> np.ndarray:
+        count = self.count[source]
+        # RuleRNG._below과 같은 계산
+        k = np.minimum((u * count).astype(np.int64), count - 1)
+        return self.choices[source, k]
+
+
+def _join(texts: Sequence[str]):
+    codes = jamo.to_codes("".join(texts))
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+    return codes, lengths
+
+
+def _split(codes: np.ndarray, lengths: np.ndarray) -> List[str]:
+    text = jamo.from_codes(codes)
+    bounds = np.concatenate(([0], np.cumsum(lengths))).tolist()
+    return [text[start:stop] for start, stop in zip(bounds[:-1], bounds[1:])]
+
+
+def _recompose(codes, cho, jung, jong, positions):
+    codes = codes.copy()
+    codes[positions] = jamo.compose_codes(cho[positions], jung[positions], jong[positions])
+    return codes
+
+
+def replace_component(texts: Sequence[str], rng, component: int, table: ComponentTable, drop_jamo: bool = False) -> List[str]:
+    """
+    음절의 cho(0) / jung(1) / jong(2)을 table의 후보 중 하나로 바꾼다.
+    drop_jamo: 자모 하나짜리 글자를 지운다 (first_power_replace의 동작).
+    """
+    codes, lengths = _join(texts)
+    parts = list(jamo.decompose_codes(codes))
+    syllable = (parts[0] >= 0) & (parts[1] >= 0)
+
+    source = parts[component]
+    positions = np.flatnonzero(syllable & (table.count[np.maximum(source, 0)] > 0))
+    source[positions] = table.draw(source[positions], rng.uniforms(len(positions)))
+    codes = _recompose(codes, *parts, positions)
+
+    if drop_jamo:
+        keep = syllable | ((parts[0] < 0) & (parts[1] < 0) & (parts[2] < 0))
+        if not keep.all():
+            kept = np.concatenate(([0], np.cumsum(keep)))
+            bounds = np.concatenate(([0], np.cumsum(lengths)))
+            lengths = np.diff(kept[bounds])
+            codes = codes[keep]
+    return _split(codes, lengths)
+
+
+def add_final_consonant(texts: Sequence[str], rng, double_ratio: float, double: Sequence[str], single: Sequence[str]) -> List[str]:
+    """
+    받침 없는 음절마다 double_ratio 확률로 double, 아니면 single 받침 중 하나를 붙인다.
+    """
+    if not texts:
+        return []
+    codes, lengths = _join(texts)
+    cho, jung, jong = jamo.decompose_codes(codes)
+    positions = np.flatnonzero((cho >= 0) & (jung >= 0) & (jong == 0))
+
+    # 음절마다 (비율 판정, 후보 선택) 순서로 두 번 뽑는다
+    u = rng.uniforms(2 * len(positions)).reshape(-1, 2)
+    double_index = np.array([jamo.JONG_INDEX[c] for c in double], dtype=np.int64)
+    single_index = np.array([jamo.JONG_INDEX[c] for c in single], dtype=np.int64)
+    pick_double = u[:, 0] < double_ratio
+    count = np.where(pick_double, len(double), len(single))
+    k = np.minimum((u[:, 1] * count).astype(np.int64), count - 1)
+    jong[positions] = np.where(pick_double, double_index[np.minimum(k, len(double) - 1)], single_index[np.minimum(k, len(single) - 1)])
+    return _split(_recompose(codes, cho, jung, jong, positions), lengths)
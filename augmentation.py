@@ -1,39 +1,66 @@
-import pandas as pd
-from tqdm import tqdm
-import random
 import argparse
-from augment_funtions import Processing, SyntaticObfuscation, IconicObfuscation, TransliterationalObfuscation, SymbolAddition, PhoneticAddition
+import time
+from contextlib import ExitStack
+from itertools import islice
+from multiprocessing import Pool
+from typing import List
+from augment_funtions.registry import RuleRegistry
+from augment_funtions.checkpoint import CheckpointMismatch, CheckpointWriter, read_checkpoint
+from augment_funtions.spans import SpanStore
+from augment_funtions.rng import make_rng
+from augment_funtions.stats import AugmentationStats
+from augment_funtions.processing import build_g2p_table, make_g2p_cache
+from augment_funtions.rule import (FOREIGN_BACKENDS, LATIN_BACKENDS, LLM_MODEL, LLMCacheMiss, LLMRequestCounter,
+                                   TransliterationalObfuscation, make_llm_caches)
+from augment_funtions.resources import load_resources
 
 
 class Augmentation:
-    def __init__(self, rng):
-        processing = Processing()
-        syntatic_obfuscation= SyntaticObfuscation()
-        iconic_obfuscation = IconicObfuscation()
-        symbol_addition = SymbolAddition()
-        transliterational_obfuscation = TransliterationalObfuscation()
-        phonetic_addition = PhoneticAddition()
+    def __init__(self, rng, max_draws=500, g2p_cache_path=None, g2p_table=None, llm_cache_path=None, llm_offline=False, llm_client_options=None,
+                 llm_batch_size=1, latin_backend="llm", foreign_backend="llm", foreign_model=None):
         self.rng = rng
+        # G2P / LLM 결과 캐시. rule 객체가 만들어지기 전에도 hit/miss를 읽을 수 있도록 여기서 만든다
+        self.g2p_cache = make_g2p_cache(g2p_cache_path, g2p_table)
+        self.llm_caches = make_llm_caches(llm_cache_path)
+        # hit/miss를 계측하는 rule backend cache
+        self.caches = {"g2p": self.g2p_cache}
+        self.caches.update((f"llm:{name}", cache) for name, cache in self.llm_caches.items())
+        # LLM API 요청 수 (cache와 같은 방식으로 row마다 증가분을 모은다)
+        self.llm_counter = LLMRequestCounter()
+        self.caches["llm:requests"] = self.llm_counter
+        # llm_client_options (AsyncLLMClient 인자)를 주면 LLM rule 요청을 동시에 보낸다
+        self.llm_client = None
+        if llm_client_options:
+            # asyncio는 LLM client를 쓸 때만 import한다
+            from augment_funtions.llm_client import AsyncLLMClient
+            self.llm_client = AsyncLLMClient(LLM_MODEL, **llm_client_options)
 
-        self.MAP = {
-            "1-1": processing.first_power_replace,         # 초성대치
-            "1-3":processing.vowel_replace,   #모음 대치
-            "1-4": processing.last_replace,   #받침 대치
-            "1-5": processing.sound_like_replace,   #음운 변동을 반영해서 표기    
-            "2-1": phonetic_addition.phonological_addition_semivowel,   #반모음 첨가
-            "2-2": phonetic_addition.phonological_addition_adaptive_final_consonant,  #받침 추가 (뒤초성에따라)
-            "2-3": phonetic_addition.phonological_addition_initial_consonant,    #초성 추가
-            "3-1": processing.continue_sound,   #연음
-            "5-1": iconic_obfuscation.yamin_swap, #도상적 대치 (가나다)
-            "5-2": iconic_obfuscation.consonant_swap, #도상적 대치(ㄱㄴㄷ,ㅏㅑㅓ)
-            "6-1": iconic_obfuscation.rotation_swap, #방향 전환 (90도)
-            "8-1": transliterational_obfuscation.iconic_swap,  # 음차
-            "8-3": transliterational_obfuscation.foreign_iconic_swap,
-            "8-2": transliterational_obfuscation.meaning_swap,  #표기대치 (한자)
-            "10": syntatic_obfuscation.spacing,  # 띄어쓰기
-            "11": syntatic_obfuscation.change_array,  #배열 교란
-            "13-2": symbol_addition.comprehensive_symbol_addition   #기호 추가
-        }
+        # rule 객체는 해당 rule을 처음 쓸 때 만들어진다
+        self.MAP = RuleRegistry({
+            "1-1": ("Processing", "first_power_replace"),         # 초성대치
+            "1-3": ("Processing", "vowel_replace"),   #모음 대치
+            "1-4": ("Processing", "last_replace"),   #받침 대치
+            "1-5": ("Processing", "sound_like_replace"),   #음운 변동을 반영해서 표기    
+            "2-1": ("PhoneticAddition", "phonological_addition_semivowel"),   #반모음 첨가
+            "2-2": ("PhoneticAddition", "phonological_addition_adaptive_final_consonant"),  #받침 추가 (뒤초성에따라)
+            "2-3": ("PhoneticAddition", "phonological_addition_initial_consonant"),    #초성 추가
+            "3-1": ("Processing", "continue_sound"),   #연음
+            "5-1": ("IconicObfuscation", "yamin_swap"), #도상적 대치 (가나다)
+            "5-2": ("IconicObfuscation", "consonant_swap"), #도상적 대치(ㄱㄴㄷ,ㅏㅑㅓ)
+            "6-1": ("IconicObfuscation", "rotation_swap"), #방향 전환 (90도)
+            "8-1": ("TransliterationalObfuscation", "iconic_swap"),  # 음차
+            "8-3": ("TransliterationalObfuscation", "foreign_iconic_swap"),
+            "8-2": ("TransliterationalObfuscation", "meaning_swap"),  #표기대치 (한자)
+            "10": ("SyntaticObfuscation", "spacing"),  # 띄어쓰기
+            "11": ("SyntaticObfuscation", "change_array"),  #배열 교란
+            "13-2": ("SymbolAddition", "comprehensive_symbol_addition")   #기호 추가
+        }, rng, options={
+            "Processing": {"g2p": self.g2p_cache},
+            "TransliterationalObfuscation": {"llm_caches": self.llm_caches, "offline": llm_offline, "llm_client": self.llm_client,
+                                             "batch_size": llm_batch_size, "llm_counter": self.llm_counter,
+                                             "latin_backend": latin_backend, "foreign_backend": foreign_backend,
+                                             "foreign_model": foreign_model},
+        })
 
         # Categories per spec (adjusted for consistency)
         self.ALONE = {"5-1", "11", "6-1"}
@@ -47,6 +74,40 @@ class Augmentation:
         self.SENTENCE = {"10", "13-2", "8-1"}
         self.LOW = {"1-3", "2-3", "3-1", "5-1", "6-1", "8-2", "11"}
 
+        # 어절 단위로 적용되는 rule과 applicability index에서 쓰는 rule별 id / bit
+        self.SPAN_RULES = [r for r in self.MAP if r not in self.SENTENCE]
+        self.RULE_NAMES = tuple(self.MAP)
+        self.RULE_ID = {rule: i for i, rule in enumerate(self.RULE_NAMES)}
+        self.RULE_BIT = {rule: 1 << i for i, rule in enumerate(self.RULE_NAMES)}
+        self.BLOCKING_MASK = sum(self.RULE_BIT[r] for r in self.LAST | self.ALONE if r in self.RULE_BIT)
+        self._index_memo = {}
+
+        # 문장당 rule 시도 횟수 상한 (최악의 경우 지연 시간 bound)
+        self.max_draws = max_draws
+        # 선택된 어절의 대치 결과가 바뀌지 않았을 때 다시 뽑는 횟수
+        self.max_redraws = 8
+        self._draws = 0
+        self._backtracks = 0
+        self.stats = AugmentationStats()
+
+    def set_rng(self, rng):
+        """
+        scheduler와 모든 rule 객체가 같은 생성기를 쓰도록 교체한다 (row마다 호출).
+        """
+        self.rng = rng
+        self.MAP.set_rng(rng)
+
+    def cache_counts(self):
+        return {name: cache.counts() for name, cache in self.caches.items()}
+
+    def preload_llm(self, tables):
+        """
+        main process가 모아서 받아 둔 row 하나의 LLM 출력({prompt 이름: {입력: 출력}})을 cache 앞에 둔다. 이전 row의 표는 버린다.
+        """
+        for name, cache in self.llm_caches.items():
+            cache.table.clear()
+            cache.preload(tables.get(name, {}))
+
     # -----------------------
     # Utility
     # -----------------------
@@ -54,22 +115,94 @@ class Augmentation:
         # Simple tokenization (based on whitespace). Can be replaced with more sophisticated tokenizer if needed.
         return text.split()
 
-    def _detokenize(self, text_list):
-        result = ""
-        for span in text_list:
-            result += span['span'][-1] + " "
-        return result.rstrip()
-
-    def _apply_rule_to_span(self, text_span, rule):
-        apply = self._is_possible(text_span, rule)
-        if apply:
-            applied_text = self.MAP[rule](text_span['span'][-1])
-            if applied_text == text_span['span'][-1]:
-                return None
-            else:
-                return applied_text
-        else:
-            return None
+    def _new_spans(self, text):
+        return SpanStore(text, self.RULE_NAMES)
+
+    def prepare(self, text):
+        """
+        문장 쌍을 tokenize한다.
+        반환된 (neutral, toxic) store는 같은 문장 쌍의 여러 max_count에 재사용된다. applicability index와 memo는
+        max_count마다 새로 만들므로 한 난이도의 결과는 함께 만든 다른 난이도에 영향을 받지 않는다.
+        """
+        return self._new_spans(text[0]), self._new_spans(text[1])
+
+    def apply_rule_batch(self, rule, texts):
+        """
+        rule 하나를 여러 어절/문장에 한 번에 적용한다. (결과 리스트, changed-mask)를 돌려준다.
+        """
+        start = time.perf_counter()
+        result = self.MAP[rule].batch(texts, self.rng)
+        self.stats.rule(rule)['time_sec'] += time.perf_counter() - start
+        return result
+
+    def _call_rule(self, rule, text):
+        start = time.perf_counter()
+        result = self.MAP[rule](text)
+        self.stats.rule(rule)['time_sec'] += time.perf_counter() - start
+        return result
+
+    def _index_rule(self, text_list, rule):
+        """
+        Applicability index: 어절마다 rule별로 '계산했는지'(known)와 '바꿀 수 있는지'(mask) bit를 둔다.
+        아직 계산하지 않은 어절들은 rule의 batch API로 한 번에 계산하고, (어절, 적용된 rule, rule) 단위로 memo에 저장한다.
+        memo는 적용 가능 여부만 정한다. 실제 대치 결과는 rule을 적용할 때 어절마다 새로 뽑는다 (_draw_replacements).
+        """
+        bit = self.RULE_BIT[rule]
+        indexed = []
+        pending = {}
+        for i in range(len(text_list)):
+            if text_list.known[i] & bit:
+                continue
+            text_list.known[i] |= bit
+            applied = text_list.applied[i]
+            if not self._is_possible(applied, rule):
+                self.stats.rule(rule)['rejected_possible'] += 1
+                continue
+            key = (text_list.spans[i], applied, rule)
+            if key not in self._index_memo:
+                pending[key] = None
+            indexed.append((i, key))
+        if pending:
+            outputs, changed = self.apply_rule_batch(rule, [key[0] for key in pending])
+            # 바뀐 결과는 _draw_replacements가 끝내 바뀐 결과를 얻지 못했을 때만 쓴다
+            self._index_memo.update((key, output if is_changed else None) for key, output, is_changed in zip(pending, outputs, changed))
+        for i, key in indexed:
+            if self._index_memo[key] is not None:
+                text_list.mask[i] |= bit
+
+    def _draw_replacements(self, rule, selections):
+        """
+        selections: [(SpanStore, 선택된 어절 index들)]. store마다 {어절 index: 대치 결과}를 돌려준다.
+        어절마다 따로 뽑으므로 두 문장에, 또는 한 문장에 여러 번 나오는 어절도 서로 다른 결과를 받는다.
+        어절을 바꾸지 않은 결과는 다시 뽑아 기존 방식처럼 '바뀐 결과' 중 하나를 쓰고,
+        max_redraws번 안에 바뀌지 않으면 index를 만들 때의 결과를 쓴다.
+        """
+        edits = [{} for _ in selections]
+        pending = [(k, i) for k, (_, indices) in enumerate(selections) for i in indices]
+        for _ in range(self.max_redraws):
+            if not pending:
+                break
+            outputs, changed = self.apply_rule_batch(rule, [selections[k][0].spans[i] for k, i in pending])
+            for (k, i), output, is_changed in zip(pending, outputs, changed):
+                if is_changed:
+                    edits[k][i] = output
+            pending = [item for item, is_changed in zip(pending, changed) if not is_changed]
+        for k, i in pending:
+            text_list = selections[k][0]
+            edits[k][i] = self._index_memo[(text_list.spans[i], text_list.applied[i], rule)]
+        return edits
+
+    def _required_spans(self, span_list, apply_ratio, rule):
+        if rule in self.LOW:
+            apply_ratio = 0.25
+        return max(int(len(span_list) * apply_ratio), 1)
+
+    def _is_feasible(self, text_list, apply_ratio, rule):
+        bit = self.RULE_BIT[rule]
+        required = self._required_spans(text_list, apply_ratio, rule)
+        self._index_rule(text_list, rule)
+        count = sum(1 for i in range(len(text_list)) if text_list.mask[i] & bit)
+        return count >= required
 
     def _select_span(self, span_list, apply_ratio, rule):
         if rule in self.LOW:
@@ -82,13 +215,11 @@ class Augmentation:
 
         return selected_index
 
-    def _is_possible(self, text_span, rule):
-        if text_span['applied_rule']:
-            for r in text_span['applied_rule']:
-                if r in self.LAST:
-                    return False
-                if r in self.ALONE:
-                    return False
+    def _is_possible(self, applied, rule):
+        # applied: 이 어절에 적용된 rule bitmask
+        if applied:
+            if applied & self.BLOCKING_MASK:
+                return False
             if rule in self.FIRST:
                 return False
         else:
@@ -96,8 +227,93 @@ class Augmentation:
                 return False
         return True
 
-    def augmentation(self, text, max_count, apply_ratio):
+    def _rules_at(self, step, max_count):
+        """
+        위치별 rule 문법: 문장 단위 rule(SENTENCE)은 마지막 step에만 올 수 있다.
+        8-3은 첫 step에서는 문장 전체에, 이후에는 어절 단위로 적용된다 (FIRST 제약은 _is_possible에서 처리).
+        """
+        if step == max_count - 1:
+            return list(self.MAP)
+        return [rule for rule in self.MAP if rule not in self.SENTENCE]
+
+    def _apply_step(self, rule, neutral_text_list, toxic_text_list, step, apply_ratio):
+        """
+        rule 하나를 적용한 새 SpanStore와 step 기록을 돌려준다. 적용할 수 없으면 None.
+        SpanStore.apply는 새 store를 만들므로 backtracking 시 이전 상태가 보존된다.
+        """
+        if rule in self.SENTENCE:
+            # Space addition
+            if rule == '10':
+                neutral_after_text = self._call_rule(rule, neutral_text_list)
+                toxic_after_text = self._call_rule(rule, toxic_text_list)
+            else:
+                # neutral / toxic을 한 batch로 (LLM rule은 두 요청을 동시에 보낸다)
+                (neutral_after_text, toxic_after_text), _ = self.apply_rule_batch(rule, [neutral_text_list.text, toxic_text_list.text])
+            self.stats.rule(rule)['applied'] += 1
+            return neutral_text_list, toxic_text_list, (rule, neutral_after_text, toxic_after_text)
+
+        if rule == '8-3' and step == 0:
+            (neutral_after_text, toxic_after_text), _ = self.apply_rule_batch(rule, [neutral_text_list.text, toxic_text_list.text])
+            self.stats.rule(rule)['applied'] += 1
+            return self._new_spans(neutral_after_text), self._new_spans(toxic_after_text), (rule, neutral_after_text, toxic_after_text)
+
+        if not (self._is_feasible(neutral_text_list, apply_ratio, rule)
+                and self._is_feasible(toxic_text_list, apply_ratio, rule)):
+            self.stats.rule(rule)['rejected_select'] += 1
+            return None
+        self.stats.rule(rule)['applied'] += 1
+
+        # Select span (index의 적용 가능 bit) -> Apply technique (선택된 어절만 새로 대치)
+        bit = self.RULE_BIT[rule]
+        selections = []
+        for text_list in (neutral_text_list, toxic_text_list):
+            after_list = [span if text_list.mask[i] & bit else None for i, span in enumerate(text_list.spans)]
+            selections.append((text_list, self._select_span(after_list, apply_ratio, rule)))
+        neutral_edits, toxic_edits = self._draw_replacements(rule, selections)
+        neutral_after_list = neutral_text_list.apply(self.RULE_ID[rule], neutral_edits)
+        toxic_after_list = toxic_text_list.apply(self.RULE_ID[rule], toxic_edits)
+        return neutral_after_list, toxic_after_list, (rule, neutral_after_list.text, toxic_after_list.text)
+
+    def _sample_sequence(self, neutral_text_list, toxic_text_list, used, step, max_count, apply_ratio):
         """
+        Constraint-aware rule sequence sampler.
+
+        각 step에서 그 위치에 올 수 있는 남은 rule들의 무작위 순열을 만들고, 앞에서부터 적용 가능한 첫 rule을 택한다.
+        즉 각 step에서는 '현재 상태에서 적용 가능한 rule 중 균등 추출'이다.
+        이후 step에서 더 진행할 수 없으면 직전 step으로 돌아가(backtracking) 순열의 다음 rule을 시도한다.
+        rule 시도 횟수는 문장당 self.max_draws로 제한되므로 최악의 경우에도 지연 시간이 bounded 된다.
+
+        기존 rejection 방식과 rule 순서의 분포는 다르다.
+        - 기존 방식은 한 번 실패한 rule을 그 문장에서 다시 뽑지 않았지만, 여기서는 그 step의 순열에서만 빠지고 이후 step에서는 다시 후보가 된다.
+        - 기존 방식은 실패가 15번을 넘으면 처음부터 다시 시작했지만, 여기서는 막힌 step의 직전 step으로만 돌아가므로
+          앞 step들의 선택이 유지된 순서가 더 자주 나온다.
+        """
+        if step == max_count:
+            return []
+        order = [rule for rule in self._rules_at(step, max_count) if rule not in used]
+        self.rng.shuffle(order)
+        for rule in order:
+            if self._draws >= self.max_draws:
+                return None
+            self._draws += 1
+            self.stats.rule(rule)['attempts'] += 1
+            applied = self._apply_step(rule, neutral_text_list, toxic_text_list, step, apply_ratio)
+            if applied is None:
+                continue
+            neutral_after_list, toxic_after_list, record = applied
+            if rule in self.SENTENCE:
+                return [record]
+            rest = self._sample_sequence(neutral_after_list, toxic_after_list, used | {rule}, step + 1, max_count, apply_ratio)
+            if rest is not None:
+                return [record] + rest
+            self._backtracks += 1
+        return None
+
+    def augmentation(self, text, max_count, apply_ratio, index=None, spans=None):
+        """
+        spans: prepare(text)의 결과. 주어지면 tokenize를 다시 하지 않는다.
+        applicability index와 memo는 호출마다 비우므로 결과는 (rng, text, max_count)로만 결정된다.
+
         #### output format ####
         {
             "origin": "original text",
@@ -114,155 +330,300 @@ class Augmentation:
             ]
         }
         """
-        current_count = 0
         report = {"origin":text[0],"toxic":text[1],"obfuscated_rules":[], "neutral_steps":[], "toxic_steps":[]}
-        
-        neutral_text_list = self._tokenize(text[0])
-        toxic_text_list = self._tokenize(text[1])
-        neutral_text_list = [{'span': [x], 'applied_rule': []} for x in neutral_text_list]
-        toxic_text_list = [{'span': [x], 'applied_rule': []} for x in toxic_text_list]
-
-        all_rules = self.MAP.copy()
-        constrain = 0
-        current_loop = 0
-        
-        while max_count > current_count:
-            current_loop += 1
-            # Maximum loop
-            if current_loop > 500:
-                return {"origin":text[0],"toxic":text[1],"obfuscated_rules":[], "neutral_steps":[], "toxic_steps":[]}
+        if spans is None:
+            spans = self.prepare(text)
+        # index bit와 memo에 들어간 대치 결과는 이 난이도의 rng로 다시 만든다
+        self._index_memo = {}
+        spans = (spans[0].unindexed(), spans[1].unindexed())
+        self._draws = 0
+        self._backtracks = 0
 
-            neutral_after_list = []
-            toxic_after_list = []
+        sequence = self._sample_sequence(spans[0], spans[1], frozenset(), 0, max_count, apply_ratio)
+        self.stats.add_sentence(index, self._draws, self._backtracks, sequence is None)
+        # 제한 안에 가능한 rule 순서를 찾지 못하면 빈 report
+        if sequence is None:
+            return report
 
-            # Select technique
-            selected_rule = self.rng.choice(list(all_rules.keys()))
+        for rule, neutral_text, toxic_text in sequence:
+            report['obfuscated_rules'].append(rule)
+            report['neutral_steps'].append({'rule': rule, "obfuscated_text": neutral_text})
+            report['toxic_steps'].append({'rule': rule, "obfuscated_text": toxic_text})
+        return report
 
-            if selected_rule in self.SENTENCE:
-                if current_count != max_count - 1:
-                    continue
-                elif current_count == max_count - 1:
-                    # Space addition
-                    if selected_rule == '10':
-                        neutral_after_text = self.MAP[selected_rule](neutral_text_list)
-                        toxic_after_text = self.MAP[selected_rule](toxic_text_list)
-                        report['obfuscated_rules'].append("10")
-                        report['neutral_steps'].append({'rule': "10", "obfuscated_text": neutral_after_text})
-                        report['toxic_steps'].append({'rule': "10", "obfuscated_text": toxic_after_text})
-                        break
-                    else:
-                        neutral_text = self._detokenize(neutral_text_list)
-                        toxic_text = self._detokenize(toxic_text_list)
-                        neutral_after_text = self.MAP[selected_rule](neutral_text)
-                        toxic_after_text = self.MAP[selected_rule](toxic_text)
-                        report['obfuscated_rules'].append(selected_rule)
-                        report['neutral_steps'].append({'rule': selected_rule, "obfuscated_text": neutral_after_text})
-                        report['toxic_steps'].append({'rule': selected_rule, "obfuscated_text": toxic_after_text})
-                        break
-            elif selected_rule in '8-3' and current_count == 0:
-                neutral_text = self._detokenize(neutral_text_list)
-                toxic_text = self._detokenize(toxic_text_list)
-                neutral_after_text = self.MAP[selected_rule](neutral_text)
-                toxic_after_text = self.MAP[selected_rule](toxic_text)
-                report['obfuscated_rules'].append(selected_rule)
-                report['neutral_steps'].append({'rule': selected_rule, "obfuscated_text": neutral_after_text})
-                report['toxic_steps'].append({'rule': selected_rule, "obfuscated_text": toxic_after_text})
-                neutral_text_list = [{'span': [x], 'applied_rule': []} for x in self._tokenize(neutral_after_text)]
-                toxic_text_list = [{'span': [x], 'applied_rule': []} for x in self._tokenize(toxic_after_text)]
-                all_rules.pop(selected_rule)
-                current_count += 1
-                constrain = 0
-                continue
-            else:
-                # Apply technique
-                for span in neutral_text_list:
-                    neutral_after = self._apply_rule_to_span(span, selected_rule)
-                    neutral_after_list.append(neutral_after)
-                for span in toxic_text_list:
-                    toxic_after = self._apply_rule_to_span(span, selected_rule)
-                    toxic_after_list.append(toxic_after)
-                # Select span
-                neutral_selected_span = self._select_span(neutral_after_list, apply_ratio, selected_rule)
-                toxic_selected_span = self._select_span(toxic_after_list, apply_ratio, selected_rule)
-                
-                if neutral_selected_span and toxic_selected_span:
-                    # Apply span
-                    for i in neutral_selected_span:
-                        neutral_text_list[i]['applied_rule'].append(selected_rule)
-                        neutral_text_list[i]['span'].append(neutral_after_list[i])
-                    for i in toxic_selected_span:
-                        toxic_text_list[i]['applied_rule'].append(selected_rule)
-                        toxic_text_list[i]['span'].append(toxic_after_list[i])
-
-                    neutral_text = self._detokenize(neutral_text_list)
-                    toxic_text = self._detokenize(toxic_text_list)
-                        
-                    report['obfuscated_rules'].append(selected_rule)
-                    report['neutral_steps'].append({'rule': selected_rule, "obfuscated_text": neutral_text})
-                    report['toxic_steps'].append({'rule': selected_rule, "obfuscated_text": toxic_text})
-                    all_rules.pop(selected_rule)
-                    current_count += 1
-                    constrain = 0
+def row_rng(seed, index, cnt):
+    """
+    Row/난이도 단위 난수 생성기. (global seed, row index, cnt)로부터 결정되므로
+    worker 수나 처리 순서와 무관하게 같은 row는 항상 같은 결과를 만들고, 일부 row만 따로 다시 생성해도 같은 결과가 나온다.
+    """
+    return make_rng(seed, index, cnt)
+
+
+_worker_augmentation = None
+
+
+def _init_worker(g2p_cache_path=None, g2p_table=None, llm_cache_path=None, llm_offline=False, llm_client_options=None, llm_batch_size=1,
+                 latin_backend="llm", foreign_backend="llm", foreign_model=None):
+    global _worker_augmentation
+    _worker_augmentation = Augmentation(make_rng(0), g2p_cache_path=g2p_cache_path, g2p_table=g2p_table,
+                                        llm_cache_path=llm_cache_path, llm_offline=llm_offline, llm_client_options=llm_client_options,
+                                        llm_batch_size=llm_batch_size, latin_backend=latin_backend,
+                                        foreign_backend=foreign_backend, foreign_model=foreign_model)
+
+
+def _augment_row(task):
+    index, neutral, toxic, cnts, seed, llm_tables = task
+    if _worker_augmentation is None:
+        _init_worker()
+    if llm_tables is not None:
+        _worker_augmentation.preload_llm(llm_tables)
+    text = [neutral, toxic]
+    # tokenize 결과만 모든 난이도가 공유한다
+    spans = _worker_augmentation.prepare(text)
+    results = {}
+    for cnt in cnts:
+        _worker_augmentation.set_rng(row_rng(seed, index, cnt))
+        # row마다 새 계측값을 모아 main process로 돌려보낸다
+        _worker_augmentation.stats = AugmentationStats()
+        before = _worker_augmentation.cache_counts()
+        report = _worker_augmentation.augmentation(text, cnt, 0.4, index=index, spans=spans)
+        for name, after in _worker_augmentation.cache_counts().items():
+            _worker_augmentation.stats.add_cache(name, before[name], after)
+        results[cnt] = (report, _worker_augmentation.stats)
+    return results
+
+
+def _gather_row(task):
+    """
+    offline worker에서 row를 난이도마다 만들어 본다. cache에 없는 LLM 입력을 만난 난이도는 거기서 멈추고 그 입력을 돌려준다.
+    반환: (모든 난이도의 결과 또는 None, [(prompt 이름, 입력들)])
+    """
+    index, neutral, toxic, cnts, seed, llm_tables = task
+    results, missing = {}, []
+    for cnt in cnts:
+        try:
+            results.update(_augment_row((index, neutral, toxic, [cnt], seed, llm_tables)))
+        except LLMCacheMiss as e:
+            missing.append((e.name, e.texts))
+    return (None if missing else results), missing
+
+
+def gather_rows(rows, cnts, seed, requester, chunk_rows, map_rows):
+    """
+    rows((index, neutral, toxic))를 chunk_rows개씩 만들고 입력 순서대로 row 결과를 돌려준다.
+    chunk의 모든 row를 LLM 없이 만들어 보고, 멈춘 row들이 기다리는 입력을 한꺼번에 요청한 뒤 (여러 row의 요청이 동시에 /
+    한 요청에 묶여 나간다) 그 row들만 받은 출력으로 처음부터 다시 만든다. 같은 입력에는 같은 출력을 쓰므로 결과는 한 row씩 만든 것과 같다.
+    requester: LLM 요청을 보낼 TransliterationalObfuscation, map_rows: pool.map 또는 map
+    """
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, chunk_rows))
+        if not chunk:
+            return
+        tables = [{} for _ in chunk]
+        results = [None] * len(chunk)
+        pending = list(range(len(chunk)))
+        while pending:
+            tasks = [(*chunk[k], cnts, seed, tables[k]) for k in pending]
+            waiting = []
+            for k, (row_results, missing) in zip(pending, map_rows(_gather_row, tasks)):
+                if row_results is not None:
+                    results[k] = row_results
                 else:
-                    # Try again
-                    all_rules.pop(selected_rule)
-                    constrain += 1
-                    if constrain > 15:
-                        constrain = 0
-                        current_count = 0
-                        report = {"origin":text[0],"toxic":text[1],"obfuscated_rules":[], "neutral_steps":[], "toxic_steps":[]}
-                        
-                        neutral_text_list = self._tokenize(text[0])
-                        toxic_text_list = self._tokenize(text[1])
-                        neutral_text_list = [{'span': [x], 'applied_rule': []} for x in neutral_text_list]
-                        toxic_text_list = [{'span': [x], 'applied_rule': []} for x in toxic_text_list]
-                        print("===== Re-start!!======")
-                    continue
+                    waiting.append((k, missing))
+            # prompt마다 chunk 전체의 입력을 한꺼번에 요청한다
+            inputs = {}
+            for _, missing in waiting:
+                for name, texts in missing:
+                    inputs.setdefault(name, {}).update(dict.fromkeys(texts))
+            outputs = {name: requester.prefetch(name, list(texts)) for name, texts in inputs.items()}
+            for k, missing in waiting:
+                for name, texts in missing:
+                    # 잘못된 응답은 한 row씩 만들 때처럼 입력을 그대로 쓴다 (cache에는 남기지 않는다)
+                    tables[k].setdefault(name, {}).update((text, outputs[name].get(text, text)) for text in texts)
+            pending = [k for k, _ in waiting]
+        yield from results
 
-        return report
 
-def main(cnt):
-    augmentation = Augmentation(random.Random(42))
-    df = pd.read_csv("data/ko_obf_length.csv")
+def export_csv(records, path):
+    import pandas as pd
+
     neutral_texts = []
     toxic_texts = []
     obfucated_texts = []
     obfucasted_labels = []
-
-    for i in tqdm(range(597, len(df))):
-        report = augmentation.augmentation([df.iloc[i]['neutral'], df.iloc[i]['toxic']], cnt, 0.4)
-
+    for record in sorted(records, key=lambda r: r['index']):
         # neutral
-        neutral_texts.append(report['origin'])
+        neutral_texts.append(record['origin'])
         toxic_texts.append("")
-        obfucated_texts.append(report['neutral_steps'][-1]['obfuscated_text'])
-        obfucasted_labels.append(report['obfuscated_rules'])
+        obfucated_texts.append(record['neutral_text'])
+        obfucasted_labels.append(record['obfuscated_rules'])
 
         # toxxic
-        neutral_texts.append(report['origin'])
-        toxic_texts.append(report['toxic'])
-        obfucated_texts.append(report['toxic_steps'][-1]['obfuscated_text'])
-        obfucasted_labels.append(report['obfuscated_rules'])
-
-        if i > 10 and i % 3 == 0:
-            data = pd.DataFrame()
-            data['neutral'] = neutral_texts
-            data['toxic'] = toxic_texts
-            data['obfucated_texts'] = obfucated_texts
-            data['obfucasted_labels'] = obfucasted_labels
-            data.to_csv(f"data/ko_obfs_augmented_{cnt}.csv", index=False)
+        neutral_texts.append(record['origin'])
+        toxic_texts.append(record['toxic'])
+        obfucated_texts.append(record['toxic_text'])
+        obfucasted_labels.append(record['obfuscated_rules'])
 
     data = pd.DataFrame()
     data['neutral'] = neutral_texts
     data['toxic'] = toxic_texts
     data['obfucated_texts'] = obfucated_texts
     data['obfucasted_labels'] = obfucasted_labels
-    data.to_csv(f"data/ko_obfs_augmented_{cnt}.csv", index=False)
+    data.to_csv(path, index=False)
+
+
+def main(cnts, workers=1, seed=42, start=0, flush_every=32, g2p_cache=None, g2p_prefetch=False, llm_cache=None, llm_offline=False,
+         llm_concurrency=0, llm_rate=0.0, llm_base_url=None, llm_batch_size=1, llm_gather_rows=0,
+         latin_backend="llm", foreign_backend="llm", foreign_model=None):
+    """
+    cnts의 모든 난이도를 입력을 한 번 읽는 동안 함께 만들고, 난이도마다 따로 저장한다.
+    난이도마다 memo를 새로 만들므로 결과는 (seed, row, cnt)로 결정되고, 함께 요청한 다른 난이도와 무관하다.
+    llm_gather_rows: 0보다 크면 이만큼의 row마다 LLM 요청을 모아서 main process가 보낸다 (gather_rows).
+    """
+    # pandas / tqdm은 CLI 실행에만 필요하므로 worker import 비용에서 뺀다
+    import pandas as pd
+    from tqdm import tqdm
+
+    df = pd.read_csv("data/ko_obf_length.csv")
+    cnts = sorted(set(cnts))
+    g2p_table = None
+    if g2p_prefetch:
+        # 입력 전체의 고유한 한글 run을 생성 전에 한 번씩만 변환한다
+        start_time = time.perf_counter()
+        g2p_table = build_g2p_table(pd.concat([df['neutral'], df['toxic']]).dropna().astype(str), workers, g2p_cache)
+        print(f"G2P prefetch: {len(g2p_table)} unique runs in {time.perf_counter() - start_time:.1f}s")
+    # fork 전에 읽어 두면 worker들이 컴파일된 rule 사전을 복사하지 않고 공유한다
+    load_resources()
+    llm_client_options = None
+    if llm_concurrency > 0:
+        # 요청 속도 상한은 요청을 보내는 process들이 나눠 갖는다 (모아서 보내면 main process 하나)
+        senders = 1 if llm_gather_rows > 0 else max(workers, 1)
+        llm_client_options = {"max_concurrency": llm_concurrency, "rate": llm_rate / senders, "base_url": llm_base_url}
+    requester = None
+    worker_llm_offline, worker_llm_client_options = llm_offline, llm_client_options
+    if llm_gather_rows > 0:
+        client = None
+        if llm_client_options:
+            from augment_funtions.llm_client import AsyncLLMClient
+            client = AsyncLLMClient(LLM_MODEL, **llm_client_options)
+        requester = TransliterationalObfuscation(llm_caches=make_llm_caches(llm_cache), llm_client=client, batch_size=llm_batch_size)
+        # worker는 요청하지 않고 cache에 없는 입력을 main process에 돌려준다
+        worker_llm_offline, worker_llm_client_options = True, None
+    if workers <= 1:
+        _init_worker(g2p_cache, g2p_table, llm_cache, worker_llm_offline, worker_llm_client_options, llm_batch_size, latin_backend,
+                     foreign_backend, foreign_model)
+    output_paths = {cnt: f"data/ko_obfs_augmented_{cnt}" for cnt in cnts}
+
+    run_stats = {cnt: AugmentationStats() for cnt in cnts}
+    # seed나 난이도 조합이 다른 실행의 체크포인트는 이어 쓰지 않는다
+    settings = {"seed": seed, "cnts": cnts}
+    with ExitStack() as stack:
+        try:
+            writers = {
+                cnt: stack.enter_context(CheckpointWriter(f"{path}.jsonl", f"{path}_failed.jsonl", flush_every, settings))
+                for cnt, path in output_paths.items()
+            }
+        except CheckpointMismatch as e:
+            raise SystemExit(f"Cannot resume: {e}. Rerun with the same --cnt and --seed, or remove the checkpoint files.")
+        # 가장 뒤처진 난이도부터 다시 시작한다. 이미 저장된 row는 다시 계산하되 기록하지 않는다
+        indices = range(min(writer.resume_index(start) for writer in writers.values()), len(df))
+        if any(writer.committed for writer in writers.values()):
+            print(f"Resume from row {indices.start}")
+        rows = ((i, df.iloc[i]['neutral'], df.iloc[i]['toxic']) for i in indices)
+        tasks = ((*row, cnts, seed, None) for row in rows)
+        if workers > 1:
+            pool = Pool(workers, initializer=_init_worker, initargs=(g2p_cache, g2p_table, llm_cache, worker_llm_offline, worker_llm_client_options,
+                                                                           llm_batch_size, latin_backend, foreign_backend, foreign_model))
+            if requester is not None:
+                results = gather_rows(rows, cnts, seed, requester, llm_gather_rows, pool.map)
+            else:
+                # imap은 입력 순서대로 결과를 돌려준다
+                results = pool.imap(_augment_row, tasks, chunksize=8)
+        else:
+            pool = None
+            if requester is not None:
+                results = gather_rows(rows, cnts, seed, requester, llm_gather_rows, map)
+            else:
+                results = map(_augment_row, tasks)
+
+        for i, row_results in zip(indices, tqdm(results, total=len(indices))):
+            for cnt, (report, stats) in row_results.items():
+                writer = writers[cnt]
+                if writer.is_committed(i):
+                    continue
+                run_stats[cnt].merge(stats)
+                # 최대 loop를 넘기면 빈 report가 돌아오므로 실패 파일로 보낸다
+                if not report['neutral_steps']:
+                    writer.fail(i, {'origin': report['origin'], 'toxic': report['toxic']})
+                    continue
+                writer.write(i, {
+                    'origin': report['origin'],
+                    'toxic': report['toxic'],
+                    'obfuscated_rules': report['obfuscated_rules'],
+                    'neutral_text': report['neutral_steps'][-1]['obfuscated_text'],
+                    'toxic_text': report['toxic_steps'][-1]['obfuscated_text'],
+                })
+
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    if requester is not None:
+        counts = requester.llm_counter.counts()
+        print(f"LLM requests (gathered): {counts['requests']} for {counts['items']} sentences, {counts['fallbacks']} single-sentence fallbacks")
+    for cnt, output_path in output_paths.items():
+        run_stats[cnt].dump(f"{output_path}_stats.json")
+        print(f"=== cnt {cnt} ===")
+        for rule, counters in list(run_stats[cnt].to_dict()['rules'].items())[:5]:
+            print(f"rule {rule}: {counters['time_sec']:.2f}s, applied {counters['applied']}/{counters['attempts']}")
+        for name, counters in run_stats[cnt].caches.items():
+            if name == "llm:requests":
+                print(f"LLM requests: {counters['requests']} for {counters['items']} sentences, {counters['fallbacks']} single-sentence fallbacks")
+                continue
+            print(f"{name} cache: {counters['table_hits']} prefetched, {counters['hits']} hits, {counters['disk_hits']} disk hits, {counters['misses']} misses")
+
+        failures = read_checkpoint(f"{output_path}_failed.jsonl")
+        if failures:
+            print(f"{len(failures)} rows failed, see {output_path}_failed.jsonl")
+        export_csv(read_checkpoint(f"{output_path}.jsonl"), f"{output_path}.csv")
 
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description='Generate Korean problem.')
-    parser.add_argument('-c', '--cnt', required=True, help='count', default='1')
+    parser.add_argument('-c', '--cnt', required=True, type=int, nargs='+', help='count (several values generate every level in one pass)')
+    parser.add_argument('-w', '--workers', type=int, default=1, help='number of worker processes')
+    parser.add_argument('-s', '--seed', type=int, default=42, help='global random seed')
+    parser.add_argument('--start', type=int, default=0, help='first row index when there is no checkpoint to resume from')
+    parser.add_argument('--flush-every', type=int, default=32, help='rows buffered between fsyncs of the checkpoint')
+    parser.add_argument('--g2p-cache', default=None, help='sqlite file shared by workers to cache G2P results across runs')
+    parser.add_argument('--g2p-prefetch', action='store_true', help='convert every unique Hangul run of the input with G2P before generation')
+    parser.add_argument('--llm-cache', default=None, help='sqlite file keeping LLM rule outputs (8-1, 8-3) across runs')
+    parser.add_argument('--llm-offline', action='store_true', help='never call the LLM API; stop on the first input missing from --llm-cache')
+    parser.add_argument('--llm-concurrency', type=int, default=0,
+                        help='LLM requests in flight per worker (0 sends them one at a time). Without --llm-gather-rows a worker only has '
+                             'the requests of one row step to send: 2 sentences, or the words of 2 sentences for 8-3')
+    parser.add_argument('--llm-rate', type=float, default=0.0, help='overall LLM requests per second across workers (0 = unlimited)')
+    parser.add_argument('--llm-base-url', default=None, help='OpenAI-compatible endpoint, e.g. a local stub server')
+    parser.add_argument('--llm-batch-size', type=int, default=1,
+                        help='sentences packed into one LLM request (1 sends each sentence alone). Without --llm-gather-rows a request '
+                             'only packs texts of one row step, so sentence requests hold at most 2 sentences')
+    parser.add_argument('--llm-gather-rows', type=int, default=0,
+                        help='collect the LLM requests of this many rows and send them together from the main process, so '
+                             '--llm-concurrency and --llm-batch-size apply across rows (0 = each worker sends its own)')
+    parser.add_argument('--latin-backend', choices=LATIN_BACKENDS, default='llm', help='rule 8-1 backend: the LLM, or the offline rule-based transliterator')
+    parser.add_argument('--foreign-backend', choices=FOREIGN_BACKENDS, default='llm', help='rule 8-3 backend: the LLM, or a model trained with augment_funtions.distill')
+    parser.add_argument('--foreign-model', default=None, help='checkpoint of the 8-3 model backend')
     args = parser.parse_args()
+    if args.foreign_backend == 'model' and not args.foreign_model:
+        parser.error('--foreign-backend model needs --foreign-model')
+    if args.llm_offline and not args.llm_cache:
+        parser.error('--llm-offline needs --llm-cache')
+    if args.llm_gather_rows > 0 and args.llm_offline:
+        parser.error('--llm-gather-rows sends LLM requests; it cannot be used with --llm-offline')
 
-    main(int(args.cnt))
\ No newline at end of file
+    main(args.cnt, workers=args.workers, seed=args.seed, start=args.start, flush_every=args.flush_every,
+         g2p_cache=args.g2p_cache, g2p_prefetch=args.g2p_prefetch, llm_cache=args.llm_cache, llm_offline=args.llm_offline,
+         llm_concurrency=args.llm_concurrency, llm_rate=args.llm_rate, llm_base_url=args.llm_base_url,
+         llm_batch_size=args.llm_batch_size, llm_gather_rows=args.llm_gather_rows, latin_backend=args.latin_backend,
+         foreign_backend=args.foreign_backend, foreign_model=args.foreign_model)
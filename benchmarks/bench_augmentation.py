@@ -0,0 +1,506 @@
+"""
+Offline augmentation benchmark
+증강 속도 측정 스크립트 (네트워크 불필요)
+
+Measures startup cost (imports, Augmentation() and a worker's first jamo rule in
+a fresh interpreter), per-rule throughput (chars/sec, per call and as one batch),
+per-sentence latency percentiles for Augmentation.augmentation at max_count 1-3,
+sampler draw/backtrack counts, cap hits, separate vs shared multi-level
+generation, dictionary rules (key loop vs regex alternation), the boundary transducer
+rules called per sentence pair and as one batch, and peak memory on a
+synthetic Hangul corpus. The OpenAI client of TransliterationalObfuscation and
+the G2P backend are replaced by local stubs, so results only reflect the
+pipeline itself.
+
+Run from the repository root:
+    $ python benchmarks/bench_augmentation.py --output bench.json
+    $ python benchmarks/bench_augmentation.py --output new.json --compare bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CHO = "ㄱㄲㄴㄷㄸㄹㅁㅂㅃㅅㅆㅇㅈㅉㅊㅋㅌㅍㅎ"
+# 자주 쓰이는 모음 위주로 뽑는다
+JUNG_WEIGHTS = [8, 3, 1, 1, 6, 3, 2, 1, 6, 1, 1, 1, 1, 5, 1, 1, 1, 1, 4, 1, 7]
+NUM_JUNG = 21
+NUM_JONG = 28
+
+
+def stub_g2p():
+    """
+    G2P 대신 받침을 대표음으로만 바꾸는 stub을 등록한다.
+    """
+    def ko_g2p_stub(text):
+        result = []
+        for char in text:
+            code = ord(char) - 0xAC00
+            if 0 <= code < 11172 and code % NUM_JONG in (19, 20, 22, 23, 25, 27):
+                # ㅅ ㅆ ㅈ ㅊ ㅌ ㅎ -> ㄷ
+                char = chr(0xAC00 + code - code % NUM_JONG + 7)
+            result.append(char)
+        return "".join(result)
+
+    package = types.ModuleType("G2P")
+    module = types.ModuleType("G2P.KoG2Padvanced")
+    module.KoG2Padvanced = ko_g2p_stub
+    package.KoG2Padvanced = module
+    sys.modules["G2P"] = package
+    sys.modules["G2P.KoG2Padvanced"] = module
+
+
+class StubChatClient:
+    """
+    OpenAI chat client stub: 입력 문장의 어절 순서를 뒤집어 {"output": ...} JSON으로 돌려준다.
+    """
+    def __init__(self):
+        self.chat = types.SimpleNamespace(completions=types.SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages, **kwargs):
+        text = messages[-1]["content"]
+        content = json.dumps({"input": text, "output": " ".join(reversed(text.split()))}, ensure_ascii=False)
+        message = types.SimpleNamespace(content=content)
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+
+def synthetic_word(rng, min_chars, max_chars, hangul_ratio):
+    length = rng.randint(min_chars, max_chars)
+    if rng.random() >= hangul_ratio:
+        return "".join(rng.choice("abcdefghijklmnopqrstuvwxyz0123456789") for _ in range(length))
+    chars = []
+    for _ in range(length):
+        cho = rng.randrange(len(CHO))
+        jung = rng.choices(range(NUM_JUNG), weights=JUNG_WEIGHTS)[0]
+        jong = rng.randrange(1, NUM_JONG) if rng.random() < 0.4 else 0
+        chars.append(chr(0xAC00 + (cho * NUM_JUNG + jung) * NUM_JONG + jong))
+    return "".join(chars)
+
+
+def synthetic_corpus(n, min_words, max_words, min_chars, max_chars, hangul_ratio, seed):
+    rng = random.Random(seed)
+
+    def sentence():
+        return " ".join(synthetic_word(rng, min_chars, max_chars, hangul_ratio) for _ in range(rng.randint(min_words, max_words)))
+
+    return [(sentence(), sentence()) for _ in range(n)]
+
+
+def percentiles(values):
+    values = sorted(values)
+    if not values:
+        return {"p50": None, "p95": None, "p99": None}
+
+    def at(q):
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    return {"p50": at(0.50), "p95": at(0.95), "p99": at(0.99)}
+
+
+def build_augmentation(seed):
+    from augmentation import Augmentation
+    from augment_funtions.rng import make_rng
+
+    augmentation = Augmentation(make_rng(seed))
+    augmentation.MAP.instance("TransliterationalObfuscation").client = StubChatClient()
+    return augmentation
+
+
+def bench_rules(augmentation, corpus, repeat):
+    from augment_funtions.spans import SpanStore
+
+    words = [word for pair in corpus for text in pair for word in text.split()]
+    sentences = [text for pair in corpus for text in pair]
+    results = {}
+    for rule, func in augmentation.MAP.items():
+        if rule == "10":
+            inputs = [SpanStore(text, augmentation.RULE_NAMES) for text in sentences]
+            chars = sum(len(store.text) for store in inputs)
+        elif rule in augmentation.SENTENCE or rule == "8-3":
+            inputs = sentences
+            chars = sum(len(text) for text in inputs)
+        else:
+            inputs = words
+            chars = sum(len(text) for text in inputs)
+        latencies = []
+        start = time.perf_counter()
+        for _ in range(repeat):
+            for text in inputs:
+                t = time.perf_counter()
+                func(text)
+                latencies.append(time.perf_counter() - t)
+        elapsed = time.perf_counter() - start
+
+        # 전체 입력을 rule.batch 한 번으로 (vectorized 구현이 있으면 그 경로)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            func.batch(inputs, augmentation.rng)
+        batch_elapsed = time.perf_counter() - start
+        results[rule] = {
+            "unit": "sentence" if inputs is not words else "span",
+            "calls": len(latencies),
+            "chars_per_sec": chars * repeat / elapsed if elapsed else None,
+            "batch_chars_per_sec": chars * repeat / batch_elapsed if batch_elapsed else None,
+            "latency_sec": percentiles(latencies),
+        }
+    return results
+
+
+def bench_sentences(augmentation, corpus, max_counts, apply_ratio, seed):
+    from augment_funtions.rng import make_rng
+
+    results = {}
+    for max_count in max_counts:
+        latencies = []
+        draws = []
+        backtracks = []
+        capped = 0
+        start = time.perf_counter()
+        for index, pair in enumerate(corpus):
+            augmentation.set_rng(make_rng(seed, index))
+            t = time.perf_counter()
+            report = augmentation.augmentation(list(pair), max_count, apply_ratio)
+            latencies.append(time.perf_counter() - t)
+            draws.append(augmentation._draws)
+            backtracks.append(augmentation._backtracks)
+            if not report["neutral_steps"]:
+                capped += 1
+        elapsed = time.perf_counter() - start
+
+        # tracemalloc은 실행을 느리게 하므로 메모리는 별도 pass에서 측정
+        tracemalloc.start()
+        for index, pair in enumerate(corpus):
+            augmentation.set_rng(make_rng(seed, index))
+            augmentation.augmentation(list(pair), max_count, apply_ratio)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        results[str(max_count)] = {
+            "sentences": len(corpus),
+            "sentences_per_sec": len(corpus) / elapsed if elapsed else None,
+            "latency_sec": percentiles(latencies),
+            # 문장당 rule 시도 횟수 (max_count를 넘는 만큼이 거절/backtracking)
+            "rule_draws_mean": sum(draws) / len(draws) if draws else None,
+            "rule_draws_max": max(draws, default=None),
+            "backtracks_total": sum(backtracks),
+            "cap_hits": capped,
+            "tracemalloc_peak_bytes": peak,
+        }
+    return results
+
+
+def bench_levels(augmentation, corpus, max_counts, apply_ratio, seed):
+    """
+    max_counts를 문장마다 따로 만들 때와 prepare() 결과를 공유해 한 번에 만들 때의 시간 비교
+    """
+    from augment_funtions.rng import make_rng
+
+    start = time.perf_counter()
+    for max_count in max_counts:
+        for index, pair in enumerate(corpus):
+            augmentation.set_rng(make_rng(seed, index, max_count))
+            augmentation.augmentation(list(pair), max_count, apply_ratio)
+    separate = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for index, pair in enumerate(corpus):
+        spans = augmentation.prepare(list(pair))
+        for max_count in max_counts:
+            augmentation.set_rng(make_rng(seed, index, max_count))
+            augmentation.augmentation(list(pair), max_count, apply_ratio, spans=spans)
+    shared = time.perf_counter() - start
+
+    return {"max_counts": max_counts, "separate_sec": separate, "shared_sec": shared}
+
+
+STARTUP_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+import augmentation
+imported = time.perf_counter()
+from augment_funtions.rng import make_rng
+augmentation.Augmentation(make_rng(0))
+built = time.perf_counter()
+augmentation._worker_augmentation = None
+augmentation._init_worker()
+augmentation._worker_augmentation.MAP["1-1"]("가나다")
+first_rule = time.perf_counter()
+heavy = [name for name in ("openai", "dotenv", "G2P", "bs4", "requests") if name in sys.modules]
+print(imported - start, built - imported, first_rule - built, ",".join(heavy))
+"""
+
+
+def bench_startup(repeat):
+    """
+    새 interpreter에서 import / Augmentation 생성 / worker 초기화 후 jamo rule 첫 호출까지의 시간.
+    """
+    runs = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT], cwd=ROOT, capture_output=True, text=True, check=True).stdout.split()
+        runs.append(output)
+    best = min(runs, key=lambda run: float(run[0]))
+    return {
+        "import_sec": float(best[0]),
+        "construct_sec": float(best[1]),
+        "worker_first_rule_sec": float(best[2]),
+        # jamo rule만 쓴 worker가 불러온 무거운 의존성
+        "heavy_modules_loaded": best[3].split(",") if len(best) > 3 else [],
+    }
+
+
+def legacy_dictionary_replace(table, text, rng):
+    # PatternReplacer 이전의 key 순회 구현 (비교용)
+    for key in table.keys():
+        if key in text:
+            text = text.replace(key, rng.choice(table[key]))
+    return text
+
+
+def bench_multipattern(corpus, key_ratio, seed):
+    """
+    사전 기반 rule (yamin / rotation / meaning)의 key 순회 loop와 PatternReplacer (regex alternation) 비교.
+    corpus의 어절 일부를 사전 key로 바꿔 match가 실제로 생기게 한다.
+    """
+    from augment_funtions.resources import load_resources
+
+    resources = load_resources()
+    tables = {
+        "yamin": (resources["iconic"]["yamin_dict"], resources["yamin_replacer"]),
+        "rotation": (resources["iconic"]["rotation_dict"], resources["rotation_replacer"]),
+        "meaning": (resources["transliterational"]["meaning_dict"], resources["meaning_replacer"]),
+    }
+    results = {}
+    for name, (table, replacer) in tables.items():
+        rng = random.Random(seed)
+        keys = list(table)
+        sentences = [" ".join(rng.choice(keys) if rng.random() < key_ratio else word for word in text.split())
+                     for pair in corpus for text in pair]
+        chars = sum(map(len, sentences))
+
+        # 문장마다 같은 seed의 rng (생성 비용은 측정에서 뺀다)
+        rngs = [random.Random(seed) for _ in sentences]
+        start = time.perf_counter()
+        legacy = [legacy_dictionary_replace(table, text, r) for text, r in zip(sentences, rngs)]
+        legacy_elapsed = time.perf_counter() - start
+        rngs = [random.Random(seed) for _ in sentences]
+        start = time.perf_counter()
+        outputs = [replacer.replace(text, r) for text, r in zip(sentences, rngs)]
+        elapsed = time.perf_counter() - start
+        results[name] = {
+            "keys": len(keys),
+            "legacy_chars_per_sec": chars / legacy_elapsed if legacy_elapsed else None,
+            "chars_per_sec": chars / elapsed if elapsed else None,
+            # 연쇄 대치가 없어지면서 결과가 달라진 문장 비율
+            "differs_from_legacy": sum(a != b for a, b in zip(legacy, outputs)) / max(len(sentences), 1),
+        }
+    return results
+
+
+def bench_latin(corpus, seed):
+    """
+    rule 8-1의 규칙 기반 backend (LLM 없이) 처리량.
+    """
+    from augment_funtions.rng import make_rng
+    from augment_funtions.rule import TransliterationalObfuscation
+
+    rule = TransliterationalObfuscation(make_rng(seed), latin_backend="rule")
+    sentences = [text for pair in corpus for text in pair]
+    start = time.perf_counter()
+    outputs, changed = rule.iconic_swap.batch(sentences, make_rng(seed))
+    elapsed = time.perf_counter() - start
+    return {
+        "sentences_per_sec": len(sentences) / elapsed if elapsed else None,
+        "chars_per_sec": sum(map(len, sentences)) / elapsed if elapsed else None,
+        "changed": sum(changed) / max(len(sentences), 1),
+    }
+
+
+def legacy_symbol_addition(rule, text, rng):
+    # SymbolInserter 이전의 pass 순회 구현 (비교용)
+    rule.rng = rng
+    text = rule.add_hearts(text, 0.2)
+    text = rule.add_stars(text, 0.15)
+    text = rule.add_circles(text, 0.1)
+    text = rule.add_brackets(text, 0.15)
+    text = rule.add_punctuation(text, 0.2)
+    text = rule.add_emotions(text, 0.1)
+    text = rule.add_decorations(text, 0.05)
+    text = rule.add_special_chars(text, 0.05)
+    return " ".join(text.split())
+
+
+def bench_symbols(corpus, seed):
+    """
+    rule 13-2의 pass 순회와 SymbolInserter 비교. pipeline처럼 (neutral, toxic) 쌍마다 부른 것과 corpus 전체를 한 batch로 부른 것.
+    """
+    from augment_funtions.rng import make_rng
+    from augment_funtions.rule import SymbolAddition
+
+    rule = SymbolAddition(make_rng(seed))
+    sentences = [text for pair in corpus for text in pair]
+    rng = make_rng(seed)
+    start = time.perf_counter()
+    for text in sentences:
+        legacy_symbol_addition(rule, text, rng)
+    legacy_elapsed = time.perf_counter() - start
+    rng = make_rng(seed)
+    start = time.perf_counter()
+    for pair in corpus:
+        rule.comprehensive_symbol_addition.batch(list(pair), rng)
+    pair_elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    rule.comprehensive_symbol_addition.batch(sentences, make_rng(seed))
+    batch_elapsed = time.perf_counter() - start
+    return {
+        "legacy_sentences_per_sec": len(sentences) / legacy_elapsed if legacy_elapsed else None,
+        "pair_sentences_per_sec": len(sentences) / pair_elapsed if pair_elapsed else None,
+        "batch_sentences_per_sec": len(sentences) / batch_elapsed if batch_elapsed else None,
+    }
+
+
+def bench_transducers(augmentation, corpus, repeat):
+    """
+    음절 경계 transducer rule (2-2, 2-3, 3-1)을 pipeline처럼 pair의 어절마다 부른 것.
+    글자 단위 loop, run_batch 강제, min_chars 기준을 따르는 rule.batch, corpus 전체 한 batch를 비교한다.
+    """
+    pairs = [[word for text in pair for word in text.split()] for pair in corpus]
+    words = [word for pair in pairs for word in pair]
+    chars = sum(map(len, words))
+    results = {}
+    for rule in ("2-2", "2-3", "3-1"):
+        func = augmentation.MAP[rule]
+        rng = augmentation.rng
+        # lookup 표를 채운 뒤의 정상 상태를 잰다
+        func.vectorized(func.owner, words)
+
+        def timed(call):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                call()
+            elapsed = time.perf_counter() - start
+            return chars * repeat / elapsed if elapsed else None
+
+        results[rule] = {
+            "min_chars": func.min_chars,
+            "pair_chars": chars / max(len(pairs), 1),
+            "loop_chars_per_sec": timed(lambda: [func(word) for word in words]),
+            "pair_vectorized_chars_per_sec": timed(lambda: [func.vectorized(func.owner, pair) for pair in pairs]),
+            "pair_batch_chars_per_sec": timed(lambda: [func.batch(pair, rng) for pair in pairs]),
+            "corpus_batch_chars_per_sec": timed(lambda: func.batch(words, rng)),
+        }
+    return results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(current, baseline_path):
+    with open(baseline_path, "r") as f:
+        baseline = json.load(f)
+    print(f"\n=== compared with {baseline_path} ({baseline.get('commit')}) ===")
+    for rule, result in current["rules"].items():
+        old = baseline.get("rules", {}).get(rule)
+        if old and old["chars_per_sec"] and result["chars_per_sec"]:
+            print(f"rule {rule:>5}: chars/sec x{result['chars_per_sec'] / old['chars_per_sec']:.2f}")
+    for max_count, result in current["sentences"].items():
+        old = baseline.get("sentences", {}).get(max_count)
+        if old and old["latency_sec"]["p50"] and result["latency_sec"]["p50"]:
+            print(f"max_count {max_count}: sentences/sec x{result['sentences_per_sec'] / old['sentences_per_sec']:.2f}, "
+                  f"p95 x{result['latency_sec']['p95'] / old['latency_sec']['p95']:.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline augmentation benchmark")
+    parser.add_argument("--sentences", type=int, default=300, help="number of synthetic sentence pairs")
+    parser.add_argument("--min-words", type=int, default=3)
+    parser.add_argument("--max-words", type=int, default=12)
+    parser.add_argument("--min-chars", type=int, default=1)
+    parser.add_argument("--max-chars", type=int, default=5)
+    parser.add_argument("--hangul-ratio", type=float, default=1.0, help="fraction of Hangul words (rest are ASCII)")
+    parser.add_argument("--max-counts", type=int, nargs="+", default=[1, 2, 3])
+    parser.add_argument("--apply-ratio", type=float, default=0.4)
+    parser.add_argument("--rule-repeat", type=int, default=1, help="passes over the corpus per rule")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--startup-repeat", type=int, default=3, help="fresh interpreters started to time imports")
+    parser.add_argument("--key-ratio", type=float, default=0.2, help="fraction of words replaced by dictionary keys in the multi-pattern benchmark")
+    parser.add_argument("--real-g2p", action="store_true", help="use the installed KoG2Padvanced instead of the stub")
+    parser.add_argument("--output", default="bench_output.json")
+    parser.add_argument("--compare", default=None, help="previous JSON result to compare against")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    if not args.real_g2p:
+        stub_g2p()
+    # client 생성에만 쓰이며 요청은 모두 stub으로 처리된다
+    os.environ.setdefault("OPENAI_API_KEY", "offline-benchmark")
+    os.environ.setdefault("API_KEY", "offline-benchmark")
+
+    corpus = synthetic_corpus(args.sentences, args.min_words, args.max_words, args.min_chars, args.max_chars, args.hangul_ratio, args.seed)
+    augmentation = build_augmentation(args.seed)
+
+    result = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "params": vars(args),
+        "corpus_chars": sum(len(text) for pair in corpus for text in pair),
+        "startup": bench_startup(args.startup_repeat),
+        "rules": bench_rules(augmentation, corpus, args.rule_repeat),
+        "sentences": bench_sentences(augmentation, corpus, args.max_counts, args.apply_ratio, args.seed),
+        "levels": bench_levels(augmentation, corpus, args.max_counts, args.apply_ratio, args.seed),
+        "multipattern": bench_multipattern(corpus, args.key_ratio, args.seed),
+        "latin_backend": bench_latin(corpus, args.seed),
+        "symbols": bench_symbols(corpus, args.seed),
+        "transducers": bench_transducers(augmentation, corpus, args.rule_repeat),
+        # Linux는 KiB 단위
+        "peak_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+    }
+
+    with open(args.output, "w") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+
+    startup = result["startup"]
+    print(f"startup: import {startup['import_sec'] * 1e3:.0f} ms  Augmentation() {startup['construct_sec'] * 1e3:.1f} ms  "
+          f"worker + first jamo rule {startup['worker_first_rule_sec'] * 1e3:.1f} ms  heavy modules {startup['heavy_modules_loaded']}")
+    for rule, r in result["rules"].items():
+        print(f"rule {rule:>5}: {r['chars_per_sec']:>12,.0f} chars/sec  batch {r['batch_chars_per_sec']:>12,.0f} chars/sec  p99 {r['latency_sec']['p99'] * 1e6:8.1f} us/{r['unit']}")
+    for max_count, r in result["sentences"].items():
+        lat = r["latency_sec"]
+        print(f"max_count {max_count}: {r['sentences_per_sec']:8.1f} sent/sec  p50 {lat['p50'] * 1e3:.2f} ms  "
+              f"p95 {lat['p95'] * 1e3:.2f} ms  p99 {lat['p99'] * 1e3:.2f} ms  draws {r['rule_draws_mean']:.1f}  cap hits {r['cap_hits']}")
+    levels = result["levels"]
+    print(f"levels {levels['max_counts']}: separate {levels['separate_sec']:.2f}s  shared {levels['shared_sec']:.2f}s")
+    for name, r in result["multipattern"].items():
+        print(f"{name:>8} ({r['keys']} keys): loop {r['legacy_chars_per_sec']:>12,.0f} chars/sec  "
+              f"alternation {r['chars_per_sec']:>12,.0f} chars/sec  differs {r['differs_from_legacy']:.1%}")
+    latin = result["latin_backend"]
+    print(f"8-1 rule backend: {latin['sentences_per_sec']:,.0f} sent/sec  {latin['chars_per_sec']:,.0f} chars/sec  changed {latin['changed']:.1%}")
+    symbols = result["symbols"]
+    print(f"13-2 symbols: passes {symbols['legacy_sentences_per_sec']:,.0f} sent/sec  fused pairs {symbols['pair_sentences_per_sec']:,.0f} sent/sec  "
+          f"fused batch {symbols['batch_sentences_per_sec']:,.0f} sent/sec")
+    for rule, r in result["transducers"].items():
+        print(f"rule {rule:>5} ({r['pair_chars']:.0f} chars/pair, min_chars {r['min_chars']}): loop {r['loop_chars_per_sec']:>10,.0f}  "
+              f"run_batch per pair {r['pair_vectorized_chars_per_sec']:>10,.0f}  batch per pair {r['pair_batch_chars_per_sec']:>10,.0f}  "
+              f"corpus batch {r['corpus_batch_chars_per_sec']:>10,.0f} chars/sec")
+    print(f"peak RSS {result['peak_rss_kib'] / 1024:.1f} MiB -> {args.output}")
+
+    if args.compare:
+        compare(result, args.compare)
+
+
+if __name__ == "__main__":
+    main()
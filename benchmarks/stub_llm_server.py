@@ -0,0 +1,144 @@
+"""
+Local OpenAI-compatible stub server
+LLM rule을 네트워크 없이 시험하기 위한 chat completions stub 서버
+
+Serves POST /v1/chat/completions like the OpenAI API. The reply content is
+{"input": ..., "output": ...} JSON whose output reverses the word order of the
+last message (the same as StubChatClient in bench_augmentation.py). A message
+that is a JSON array of {"id", "input"} objects (a multi-sentence request) is
+answered with a JSON array of {"id", "input", "output"} objects. Latency, 429
+rate-limit replies and 500 errors can be injected to exercise the concurrency,
+rate limiting and retries of AsyncLLMClient, and bad items (a wrong id) to
+exercise the single-sentence fallback of multi-sentence requests.
+
+    $ python benchmarks/stub_llm_server.py --port 8765 --latency 0.2 --fail-rate 0.1
+    $ API_KEY=stub python augmentation.py -c 2 --llm-concurrency 16 --llm-base-url http://127.0.0.1:8765/v1
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except ConnectionError:
+            # client가 timeout으로 먼저 끊은 경우
+            self.close_connection = True
+
+    @staticmethod
+    def _reverse(text):
+        return " ".join(reversed(text.split()))
+
+    def _reply(self, text):
+        try:
+            items = json.loads(text)
+        except ValueError:
+            items = None
+        if not isinstance(items, list):
+            return {"input": text, "output": self._reverse(text)}
+        replies = []
+        for item in items:
+            with self.server.lock:
+                bad = self.server.random.random() < self.server.bad_item_rate
+                self.server.bad_items += bad
+            # 잘못된 원소는 범위 밖 id로 돌려준다
+            replies.append({"id": -1 if bad else item["id"], "input": item["input"], "output": self._reverse(item["input"])})
+        return replies
+
+    def do_POST(self):
+        server = self.server
+        request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        with server.lock:
+            server.requests += 1
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            roll = server.random.random()
+        try:
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._send(404, {"error": {"message": f"unknown path {self.path}"}})
+                return
+            time.sleep(server.latency)
+            if roll < server.fail_rate:
+                # 절반은 429, 절반은 500
+                status = 429 if roll < server.fail_rate / 2 else 500
+                with server.lock:
+                    server.failures += 1
+                self._send(status, {"error": {"message": "injected failure", "type": "stub", "code": status}})
+                return
+            text = request["messages"][-1]["content"]
+            content = json.dumps(self._reply(text), ensure_ascii=False)
+            self._send(200, {
+                "id": f"stub-{server.requests}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get("model", "stub"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+            })
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, fail_rate=0.0, seed=0, bad_item_rate=0.0):
+        super().__init__(address, StubHandler)
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.bad_item_rate = bad_item_rate
+        self.bad_items = 0
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    @property
+    def base_url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+
+def start_server(port=0, latency=0.0, fail_rate=0.0, seed=0, bad_item_rate=0.0) -> StubServer:
+    """
+    background thread에서 서버를 띄운다. port 0이면 빈 port를 쓴다. 끝나면 server.shutdown().
+    """
+    server = StubServer(("127.0.0.1", port), latency, fail_rate, seed, bad_item_rate)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OpenAI-compatible chat completions stub")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds slept per request")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of requests answered with 429 or 500")
+    parser.add_argument("--bad-item-rate", type=float, default=0.0, help="fraction of multi-sentence reply items given a wrong id")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = StubServer(("127.0.0.1", args.port), args.latency, args.fail_rate, args.seed, args.bad_item_rate)
+    print(f"serving {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
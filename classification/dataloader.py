@@ -3,13 +3,17 @@ import torch
 from torch.utils.data import Dataset, DataLoader
 
 class CustomDataset(Dataset):
-    def __init__(self, csv_file, tokenizer):
+    def __init__(self, csv_file, tokenizer, normalizer=None):
         if 'ihc' in csv_file:
             self.data = pd.read_csv(csv_file, delimiter='\t')
         else:
             self.data = pd.read_csv(csv_file)
         self.csv_file = csv_file
         self.tokenizer = tokenizer
+        # 분류기에 넣을 문장. normalizer가 있으면 tokenize 전에 한 번에 정규화해 둔다
+        self.model_texts = self.data["text"].tolist()
+        if normalizer is not None:
+            self.model_texts = normalizer.normalize_batch(self.model_texts)
 
     def __len__(self):
         return len(self.data)
@@ -17,12 +21,12 @@ class CustomDataset(Dataset):
     def __getitem__(self, idx):
         row = self.data.iloc[idx]
         if 'KObfus' in self.csv_file and 'test' in self.csv_file:
-            text, label, obfuscated_label, difficulty = row["text"], row["label"], row["obfuscated_labels"], row['difficulty']
+            label, obfuscated_label, difficulty = row["label"], row["obfuscated_labels"], row['difficulty']
         else:    
-            text, label = row["text"], row["label"]
+            label = row["label"]
 
         encoding = self.tokenizer(
-            text, 
+            self.model_texts[idx], 
             padding="max_length", 
             max_length=256, 
             truncation=True,
@@ -72,9 +76,9 @@ def collate_fn(batch):
             "attention_mask": attention_mask,
         }
 
-def get_dataloader(csv_file, tokenizer, batch_size=16, shuffle=True):
+def get_dataloader(csv_file, tokenizer, batch_size=16, shuffle=True, normalizer=None):
     print("---Start dataload---")
-    dataset = CustomDataset(csv_file, tokenizer)
+    dataset = CustomDataset(csv_file, tokenizer, normalizer=normalizer)
     dataloader = DataLoader(dataset, batch_size=batch_size, shuffle=shuffle, collate_fn=collate_fn)
     print("---End dataload---")
     
@@ -1,4 +1,5 @@
 import os
+import sys
 import torch
 import numpy as np
 import pandas as pd
@@ -111,7 +112,14 @@ def evaluate(log):
         print(f"Model file not found: {model_path}")
         return
     
-    test_loader = get_dataloader(f"../data/{log.param.dataset}/test.csv", tokenizer, batch_size=log.param.eval_batch_size)
+    # rule 기반 역 대치로 입력을 정규화한 뒤 분류
+    normalizer = None
+    if log.param.normalize:
+        sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+        from augment_funtions.normalizer import Normalizer
+        normalizer = Normalizer(**log.param.normalizer_options)
+
+    test_loader = get_dataloader(f"../data/{log.param.dataset}/test.csv", tokenizer, batch_size=log.param.eval_batch_size, normalizer=normalizer)
     
     # initialize and load model
     model = CustomBERT(log.param.model_type, hidden_dim=log.param.hidden_size).to(device)
@@ -128,7 +136,8 @@ def evaluate(log):
     print(f"Recall:    {results['recall']:.4f}")
     
     # save results to CSV
-    save_results_to_csv(results, log.param.dataset, log.param.model_type, log.param.SEED)
+    model_type = log.param.model_type + ("_normalized" if log.param.normalize else "")
+    save_results_to_csv(results, log.param.dataset, model_type, log.param.SEED)
 
 
 if __name__ == '__main__':
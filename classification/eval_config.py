@@ -14,11 +14,17 @@ model_path = f"./save/KObfus/easy/{model_type}/{SEED}/best_model.pth"  # trained
 eval_batch_size = 16
 hidden_size = 768
 
+# CustomBERT 앞에서 rule 기반 de-obfuscation normalizer 적용 (augment_funtions/normalizer.py)
+normalize = False
+normalizer_options = {"strip_symbols": True, "fold_power": False, "undo_liaison": False}
+
 param = {
     "dataset": dataset,
     "model_path": model_path,
     "eval_batch_size": eval_batch_size,
     "hidden_size": hidden_size,
     "model_type": model_type,
-    "SEED": SEED
+    "SEED": SEED,
+    "normalize": normalize,
+    "normalizer_options": normalizer_options
 }
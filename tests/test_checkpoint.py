@@ -0,0 +1,71 @@
+"""
+Checkpoint header and resume checks
+체크포인트 header와 이어 쓰기 테스트
+"""
+
+import pytest
+
+from augment_funtions.checkpoint import CheckpointMismatch, CheckpointWriter, read_checkpoint
+
+
+def _writer(tmp_path, settings):
+    return CheckpointWriter(str(tmp_path / "out.jsonl"), str(tmp_path / "out_failed.jsonl"), 1, settings)
+
+
+def test_resume_with_same_settings(tmp_path):
+    settings = {"seed": 42, "cnts": [2, 3]}
+    with _writer(tmp_path, settings) as writer:
+        writer.write(0, {"origin": "a"})
+        writer.fail(1, {"origin": "b"})
+    with _writer(tmp_path, settings) as writer:
+        assert writer.resume_index() == 2
+    assert read_checkpoint(str(tmp_path / "out.jsonl")) == [{"index": 0, "origin": "a"}]
+
+
+@pytest.mark.parametrize("settings", [{"seed": 7, "cnts": [2, 3]}, {"seed": 42, "cnts": [2]}])
+def test_refuse_other_settings(tmp_path, settings):
+    with _writer(tmp_path, {"seed": 42, "cnts": [2, 3]}) as writer:
+        writer.write(0, {"origin": "a"})
+    with pytest.raises(CheckpointMismatch):
+        _writer(tmp_path, settings)
+
+
+def test_partial_header_is_rewritten(tmp_path):
+    (tmp_path / "out.jsonl").write_text('{"header": {"se', encoding="utf-8")
+    with _writer(tmp_path, {"seed": 42, "cnts": [2]}) as writer:
+        assert writer.resume_index() == 0
+    with _writer(tmp_path, {"seed": 42, "cnts": [2]}):
+        pass
+
+
+class _Crash:
+    # rows 파일 write 도중 process가 죽은 것처럼 예외를 낸다
+    def write(self, data):
+        raise OSError("crash")
+
+
+def test_resume_after_crash_between_failure_and_row_writes(tmp_path):
+    settings = {"seed": 42, "cnts": [2]}
+    outcome = {0: "ok", 1: "fail", 2: "ok", 3: "fail", 4: "ok"}
+    writer = CheckpointWriter(str(tmp_path / "out.jsonl"), str(tmp_path / "out_failed.jsonl"), 100, settings)
+    for index, result in outcome.items():
+        (writer.write if result == "ok" else writer.fail)(index, {"origin": str(index)})
+    rows_file, writer._file = writer._file, _Crash()
+    with pytest.raises(OSError):
+        writer.flush()
+    rows_file.close()
+    writer._failure_file.close()
+
+    # failure 파일에는 index 3까지 있지만 본 파일에는 아무 row도 없다
+    with _writer(tmp_path, settings) as writer:
+        resume = writer.resume_index()
+        assert resume == 0
+        for index in range(resume, len(outcome)):
+            if writer.is_committed(index):
+                continue
+            (writer.write if outcome[index] == "ok" else writer.fail)(index, {"origin": str(index)})
+
+    rows = read_checkpoint(str(tmp_path / "out.jsonl"))
+    failures = read_checkpoint(str(tmp_path / "out_failed.jsonl"))
+    assert sorted(record["index"] for record in rows) == [0, 2, 4]
+    assert sorted(record["index"] for record in failures) == [1, 3]
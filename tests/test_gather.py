@@ -0,0 +1,76 @@
+"""
+Gathering LLM requests across rows
+여러 row의 LLM 요청을 모아 보내는 gather_rows 테스트
+
+gather_rows runs the rows of a chunk offline, requests every missing LLM
+input of the chunk at once and regenerates the rows that stopped. With a
+deterministic model the reports must equal those of row-by-row generation,
+and exactly the inputs that generation needs are requested.
+"""
+
+import json
+import types
+
+import pytest
+
+import augmentation
+from augment_funtions.rng import make_rng
+from augment_funtions.rule import TransliterationalObfuscation, make_llm_caches
+
+ROWS = [
+    (0, "오늘 날씨가 정말 좋아서 산책을 다녀왔다", "오늘 날씨가 정말 좋아서 산책을 다녀왔다 진짜 멍청한 놈"),
+    (1, "회의 자료는 내일 아침까지 보내 주세요", "회의 자료는 내일 아침까지 보내 이 바보야"),
+    (2, "주말에 가족과 함께 영화를 봤어요", "주말에 가족과 함께 영화를 봤는데 감독이 미친 놈이다"),
+    (3, "점심은 학교 앞 식당에서 먹자", "점심은 학교 앞 식당에서 먹자 꺼져 병신아"),
+    (4, "비가 와서 우산을 챙겼다", "비가 와서 우산을 챙겼다 이 멍청아"),
+]
+CNTS = [2, 3]
+
+
+class ReverseChatClient:
+    """
+    OpenAI chat client stub: 입력 문장을 글자 단위로 뒤집어 {"output": ...} JSON으로 돌려준다.
+    """
+    def __init__(self):
+        self.inputs = []
+        self.chat = types.SimpleNamespace(completions=types.SimpleNamespace(create=self._create))
+
+    def _create(self, model, messages, **kwargs):
+        text = messages[-1]["content"]
+        self.inputs.append(text)
+        content = json.dumps({"input": text, "output": text[::-1]}, ensure_ascii=False)
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=types.SimpleNamespace(content=content))])
+
+
+def _worker(offline):
+    worker = augmentation.Augmentation(make_rng(0), llm_offline=offline)
+    # G2P가 필요한 rule
+    del worker.MAP.specs["1-5"]
+    client = ReverseChatClient()
+    worker.MAP.instance("TransliterationalObfuscation").client = client
+    return worker, client
+
+
+def test_gathered_rows_match_row_by_row(monkeypatch):
+    worker, client = _worker(offline=False)
+    monkeypatch.setattr(augmentation, "_worker_augmentation", worker)
+    expected = [augmentation._augment_row((*row, CNTS, 42, None)) for row in ROWS]
+    assert client.inputs
+
+    worker, _ = _worker(offline=True)
+    monkeypatch.setattr(augmentation, "_worker_augmentation", worker)
+    requester = TransliterationalObfuscation(llm_caches=make_llm_caches())
+    requester.client = ReverseChatClient()
+    gathered = list(augmentation.gather_rows(ROWS, CNTS, 42, requester, 3, map))
+
+    assert [{cnt: report for cnt, (report, _) in row.items()} for row in gathered] == \
+           [{cnt: report for cnt, (report, _) in row.items()} for row in expected]
+    assert sorted(requester.client.inputs) == sorted(client.inputs)
+
+
+def test_offline_miss_reports_every_missing_input():
+    worker, _ = _worker(offline=True)
+    rule = worker.MAP["8-3"]
+    with pytest.raises(augmentation.LLMCacheMiss) as miss:
+        rule.batch(["가나 다", "라마"], make_rng(0))
+    assert miss.value.name == "korean" and miss.value.texts == ["가나 다", "라마"]
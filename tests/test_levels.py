@@ -0,0 +1,50 @@
+"""
+Level independence of the augmentation pipeline
+난이도별 결과가 함께 요청한 다른 난이도와 무관한지 확인하는 테스트
+
+A row's output for one level must depend only on (seed, row, cnt), so running
+`-c 2` and `-c 1 2` has to produce the same cnt=2 file. The scheduler runs
+offline here: rules that need G2P or an LLM are removed from the registry.
+"""
+
+import pytest
+
+import augmentation
+from augment_funtions.rng import make_rng
+
+ROWS = [
+    ("오늘 날씨가 정말 좋아서 산책을 다녀왔다", "오늘 날씨가 정말 좋아서 산책을 다녀왔다 진짜 멍청한 놈"),
+    ("회의 자료는 내일 아침까지 보내 주세요", "회의 자료는 내일 아침까지 보내 이 바보야"),
+    ("주말에 가족과 함께 영화를 봤어요", "주말에 가족과 함께 영화를 봤는데 감독이 미친 놈이다"),
+    ("점심은 학교 앞 식당에서 먹자", "점심은 학교 앞 식당에서 먹자 꺼져 병신아"),
+]
+
+# G2P(1-5)나 LLM(8-1, 8-3)이 필요한 rule. 8-1은 latin_backend="rule"로 LLM 없이 돌린다
+ONLINE_RULES = ("1-5", "8-3")
+
+
+@pytest.fixture
+def offline_worker(monkeypatch):
+    worker = augmentation.Augmentation(make_rng(0), llm_offline=True, latin_backend="rule")
+    for rule in ONLINE_RULES:
+        del worker.MAP.specs[rule]
+    monkeypatch.setattr(augmentation, "_worker_augmentation", worker)
+    return worker
+
+
+@pytest.mark.parametrize("seed", [0, 42])
+def test_level_does_not_depend_on_other_levels(offline_worker, seed):
+    for index, (neutral, toxic) in enumerate(ROWS):
+        alone = augmentation._augment_row((index, neutral, toxic, [2], seed, None))
+        together = augmentation._augment_row((index, neutral, toxic, [1, 2], seed, None))
+        assert alone[2][0] == together[2][0]
+        assert alone[2][0]["obfuscated_rules"]
+
+
+def test_prepared_spans_are_not_changed(offline_worker):
+    neutral, toxic = ROWS[0]
+    spans = offline_worker.prepare([neutral, toxic])
+    offline_worker.set_rng(make_rng(1, 0, 3))
+    offline_worker.augmentation([neutral, toxic], 3, 0.4, spans=spans)
+    assert not any(spans[0].known) and not any(spans[1].known)
+    assert spans[0].text == neutral
@@ -0,0 +1,78 @@
+"""
+Fused symbol insertion (rule 13-2)
+SymbolInserter의 batch / 문장 단위 결과와 기존 pass 순회와의 분포 비교 테스트
+"""
+
+import math
+
+import pytest
+
+from augment_funtions import symbols
+from augment_funtions.rng import make_rng
+from augment_funtions.rule import SymbolAddition
+
+TEXTS = ["가나 다라마 바 사아자차", "한", "", "오늘 날씨가 정말 좋아서 산책을 다녀왔다", "a bc def ghij klmno"]
+
+
+@pytest.fixture(scope="module")
+def rule():
+    return SymbolAddition(make_rng(0))
+
+
+def legacy(rule, text, rng):
+    # SymbolInserter 이전의 pass 순회 (benchmarks/bench_augmentation.py의 legacy_symbol_addition)
+    rule.rng = rng
+    text = rule.add_hearts(text, 0.2)
+    text = rule.add_stars(text, 0.15)
+    text = rule.add_circles(text, 0.1)
+    text = rule.add_brackets(text, 0.15)
+    text = rule.add_punctuation(text, 0.2)
+    text = rule.add_emotions(text, 0.1)
+    text = rule.add_decorations(text, 0.05)
+    text = rule.add_special_chars(text, 0.05)
+    return " ".join(text.split())
+
+
+@pytest.mark.parametrize("repeat", [1, 20])
+def test_batch_matches_calls(rule, repeat):
+    # repeat = 20이면 VECTORIZE_MIN_WORDS를 넘어 NumPy 경로를 쓴다
+    texts = TEXTS * repeat
+    batch = rule.inserter.insert_batch(texts, make_rng(3))
+    rng = make_rng(3)
+    assert batch == [rule.inserter(text, rng) for text in texts]
+
+
+def test_loop_and_vectorized_paths_agree(rule, monkeypatch):
+    texts = TEXTS * 4
+    monkeypatch.setattr(symbols, "VECTORIZE_MIN_WORDS", 0)
+    vectorized = rule.inserter.insert_batch(texts, make_rng(5))
+    monkeypatch.setattr(symbols, "VECTORIZE_MIN_WORDS", 10 ** 9)
+    assert rule.inserter.insert_batch(texts, make_rng(5)) == vectorized
+
+
+def _features(rule, output):
+    tables = {
+        "hearts": rule.hearts, "stars": rule.stars, "circles": rule.circles, "brackets": rule.brackets,
+        "punctuation": rule.punctuation, "decorations": rule.decorations, "special": rule.special,
+    }
+    counts = {name: sum(output.count(symbol) for symbol in table) for name, table in tables.items()}
+    counts["emotions"] = sum(output.count(emotion) for emotion in rule.emotions)
+    counts["tokens"] = len(output.split())
+    return counts
+
+
+@pytest.mark.parametrize("text", ["가나 다라마 바 사아자차", "한"])
+def test_distribution_matches_legacy_passes(rule, text):
+    n = 4000
+    rng = make_rng(11)
+    fused = [_features(rule, output) for output in rule.inserter.insert_batch([text] * n, rng)]
+    rng = make_rng(12)
+    old = [_features(rule, legacy(rule, text, rng)) for _ in range(n)]
+    for name in fused[0]:
+        a = [f[name] for f in fused]
+        b = [f[name] for f in old]
+        mean_a, mean_b = sum(a) / n, sum(b) / n
+        var = (sum((x - mean_a) ** 2 for x in a) + sum((x - mean_b) ** 2 for x in b)) / (n - 1)
+        # 두 표본 평균 차이의 z 값
+        z = (mean_a - mean_b) / math.sqrt(var / n) if var else 0.0
+        assert abs(z) < 4.5, (name, mean_a, mean_b)